@@ -0,0 +1,112 @@
+# Stand-in for the ctypes ODBC class, with SQLDrivers() and SQLDataSources() listing a synthetic set of drivers and
+# data source names. Used for the data source catalog benchmark, and to load odbc-client.py where the Driver Manager
+# can not be loaded
+
+from ctypes import c_short, c_ushort, c_void_p, memmove, string_at, sizeof
+
+class ODBC:
+    SQLSMALLINT = c_short
+    SQLWCHAR = c_ushort
+    SQLHANDLE = c_void_p
+    SQLPOINTER = c_void_p
+
+    SQL_SUCCESS = 0
+    SQL_SUCCESS_WITH_INFO = 1
+    SQL_NO_DATA = 100
+    SQL_ERROR = -1
+
+    SQL_HANDLE_ENV = 1
+    SQL_NULL_HANDLE = None
+    SQL_ATTR_ODBC_VERSION = 200
+    SQL_OV_ODBC3 = 3
+    SQL_OV_ODBC3_80 = 380
+
+    SQL_FETCH_NEXT = 1
+    SQL_FETCH_FIRST = 2
+    SQL_FETCH_FIRST_USER = 31
+    SQL_FETCH_FIRST_SYSTEM = 32
+
+    dataSourceCount = 100                   # user and system data sources each
+    driverCount = 20
+    position = None                         # [ entries, index ] of the running enumeration
+
+    @staticmethod
+    def Init():
+        pass
+
+    @staticmethod
+    def dataSourceNames(direction):
+        prefix = 'System' if direction == ODBC.SQL_FETCH_FIRST_SYSTEM else 'User'
+
+        return [ [ '{} data source {}'.format(prefix, index + 1), 'Benchmark ODBC Driver {}'.format(index % 4 + 1) ] for index in range(ODBC.dataSourceCount) ]
+
+    @staticmethod
+    def driverNames():
+        return [ [ 'Benchmark ODBC Driver {}'.format(index + 1), 'Driver=/usr/lib/libbenchmark{}.so\0Setup=/usr/lib/libbenchmarkS.so\0UsageCount=1\0'.format(index + 1) ]
+                for index in range(ODBC.driverCount) ]
+
+    @staticmethod
+    def fromWideString(buffer, length):
+        return string_at(buffer, length * sizeof(ODBC.SQLWCHAR)).decode('utf-16-le', 'surrogatepass')
+
+    @staticmethod
+    def nextEntry(entries, direction, nameBuffer, bufferLength1, nameLength1Ptr, description, bufferLength2, nameLength2Ptr):
+        # Copies the next entry as UTF-16 into the SQLWCHAR buffers, with the lengths in characters like the Driver Manager
+        if direction == ODBC.SQL_FETCH_NEXT and ODBC.position:
+            ODBC.position[1] += 1
+        else:
+            ODBC.position = [ entries(), 0 ]
+
+        entries, index = ODBC.position
+
+        if index >= len(entries):
+            return ODBC.SQL_NO_DATA
+
+        sqlReturn = ODBC.SQL_SUCCESS
+
+        for text, buffer, bufferLength, lengthPtr in [ [ entries[index][0], nameBuffer, bufferLength1, nameLength1Ptr ], [ entries[index][1], description, bufferLength2, nameLength2Ptr ] ]:
+            data = text.encode('utf-16-le')
+            lengthPtr._obj.value = len(data) // 2
+
+            if buffer is not None and bufferLength > 0:
+                size = min(len(data), (bufferLength - 1) * 2)
+                memmove(buffer, data[ : size] + b'\0\0', size + 2)
+
+                if size < len(data):
+                    sqlReturn = ODBC.SQL_SUCCESS_WITH_INFO
+
+        return sqlReturn
+
+    @staticmethod
+    def SQLAllocHandle(handleType, inputHandle, outputHandlePtr):
+        outputHandlePtr._obj.value = 1
+        return ODBC.SQL_SUCCESS
+
+    @staticmethod
+    def SQLSetEnvAttr(hEnv, attribute, value, length):
+        return ODBC.SQL_SUCCESS
+
+    @staticmethod
+    def SQLFreeHandle(handleType, handle):
+        return ODBC.SQL_SUCCESS
+
+    @staticmethod
+    def SQLDataSources(hEnv, direction, serverName, bufferLength1, nameLength1Ptr, description, bufferLength2, nameLength2Ptr):
+        return ODBC.nextEntry(lambda: ODBC.dataSourceNames(direction), direction, serverName, bufferLength1, nameLength1Ptr, description, bufferLength2, nameLength2Ptr)
+
+    @staticmethod
+    def SQLDrivers(hEnv, direction, driverDescription, bufferLength1, descriptionLengthPtr, driverAttributes, bufferLength2, attributesLengthPtr):
+        return ODBC.nextEntry(ODBC.driverNames, direction, driverDescription, bufferLength1, descriptionLengthPtr, driverAttributes, bufferLength2, attributesLengthPtr)
+
+class ODBCInst:
+    ODBC_ADD_DSN = 1
+    ODBC_CONFIG_DSN = 2
+    ODBC_REMOVE_DSN = 3
+
+    @staticmethod
+    def SQLConfigDataSource(hwndParent, request, driver, attributes):
+        return False
+
+    @staticmethod
+    def SQLManageDataSources(hwndParent):
+        return False
@@ -0,0 +1,159 @@
+# Stand-in for the pyodbc module, with a synthetic catalog and result sets of configurable size.
+# run-benchmarks.py installs it as sys.modules['pyodbc'] before the client modules are imported
+
+import datetime, decimal, itertools
+
+SQL_DATA_SOURCE_READ_ONLY = 25
+SQL_DATABASE_NAME = 16
+SQL_DBMS_NAME = 17
+SQL_DBMS_VER = 18
+SQL_IDENTIFIER_QUOTE_CHAR = 29
+SQL_USER_NAME = 47
+
+pooling = True
+
+class Error(Exception):
+    pass
+
+class DatabaseError(Error):
+    pass
+
+class OperationalError(DatabaseError):
+    pass
+
+class ProgrammingError(DatabaseError):
+    pass
+
+class Catalog:
+    # Sizes of the synthetic data source, set with configure()
+    schemas = 4
+    tables = 500                            # per schema
+    procedures = 100                        # per schema
+    columns = 8                             # per table and per query result
+    rows = 100000                           # rows of each query result
+
+def configure(**sizes):
+    for name, value in sizes.items():
+        setattr(Catalog, name, value)
+
+COLUMN_TYPES = [
+    [ int, 10, lambda row: row ],
+    [ str, 40, lambda row: 'Row number {} of the result'.format(row) ],
+    [ float, 15, lambda row: row / 7 ],
+    [ decimal.Decimal, 12, lambda row: decimal.Decimal(row) / 100 ],
+    [ datetime.datetime, 26, lambda row: datetime.datetime(2020, 1, 1) + datetime.timedelta(seconds = row) ],
+    [ str, 10, lambda row: None if row % 5 == 0 else 'v' + str(row % 1000) ]
+]
+
+ROW_BLOCK = 4096                            # distinct rows generated, the result repeats them
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.messages = [ ]
+        self.fast_executemany = False
+        self.rows = iter(())
+
+    def execute(self, sql, *params):
+        if self.connection.closed:
+            raise OperationalError('08003', '[08003] Connection is closed')
+
+        if sql.lstrip()[:6].lower() in [ 'select', 'values' ] or sql.lstrip()[:4].lower() == 'with':
+            columnTypes = [ COLUMN_TYPES[col % len(COLUMN_TYPES)] for col in range(Catalog.columns) ]
+            block = [ tuple(value(row) for typeCode, size, value in columnTypes) for row in range(min(ROW_BLOCK, Catalog.rows)) ]
+
+            self.description = [ ('col{}'.format(col + 1), typeCode, None, size, size, 2 if typeCode is decimal.Decimal else 0, True)
+                    for col, [ typeCode, size, value ] in enumerate(columnTypes) ]
+            self.rowcount = -1
+            self.rows = itertools.islice(itertools.cycle(block), Catalog.rows) if block else iter(())
+        else:
+            self.description = None
+            self.rowcount = 0
+            self.rows = iter(())
+
+        return self
+
+    def executemany(self, sql, paramRows):
+        for params in paramRows:
+            self.execute(sql, *params)
+
+    def fetchone(self):
+        return next(self.rows, None)
+
+    def fetchmany(self, size = 1):
+        return list(itertools.islice(self.rows, size))
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def __iter__(self):
+        return self.rows
+
+    def nextset(self):
+        self.rows = iter(())
+        return False
+
+    def cancel(self):
+        self.rows = iter(())
+
+    def close(self):
+        self.rows = iter(())
+
+    def tables(self, table = None, catalog = None, schema = None, tableType = None):
+        schemaNames = [ 'schema{}'.format(index + 1) for index in range(Catalog.schemas) ]
+
+        if table == '' and catalog == '' and schema == '%':
+            self.rows = iter([ ('bench', name, None, None, None) for name in schemaNames ])       # SQL_ALL_SCHEMAS
+        else:
+            self.rows = iter([ ('bench', name, 'table{}'.format(index + 1), 'VIEW' if index % 10 == 9 else 'TABLE', None)
+                    for name in schemaNames if schema in [ None, '%', name ] for index in range(Catalog.tables) ])
+
+        return self
+
+    def procedures(self, procedure = None, catalog = None, schema = None):
+        self.rows = iter([ ('bench', 'schema{}'.format(index + 1), 'procedure{}'.format(proc + 1), 1, 0, 0, None, 1 + proc % 2)
+                for index in range(Catalog.schemas) if schema in [ None, '%', 'schema{}'.format(index + 1) ] for proc in range(Catalog.procedures) ])
+
+        return self
+
+    def columns(self, table = None, catalog = None, schema = None, column = None):
+        self.rows = iter([ ('bench', schema, table, 'col{}'.format(col + 1), 12, 'VARCHAR', 40, 40, 0, 10, 1) for col in range(Catalog.columns) ])
+
+        return self
+
+class Connection:
+    def __init__(self, connectionString, autocommit = False, **kwArgs):
+        self.connectionString = connectionString
+        self.autocommit = autocommit
+        self.timeout = 0
+        self.closed = False
+
+    def cursor(self):
+        return Cursor(self)
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def getinfo(self, infoType):
+        return { SQL_DATA_SOURCE_READ_ONLY: False, SQL_DATABASE_NAME: 'bench', SQL_DBMS_NAME: 'Benchmark', SQL_DBMS_VER: '1.0',
+                SQL_IDENTIFIER_QUOTE_CHAR: '"', SQL_USER_NAME: 'bench' }[infoType]
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+def connect(connectionString, autocommit = False, **kwArgs):
+    return Connection(connectionString, autocommit, **kwArgs)
+
+def drivers():
+    return [ 'Benchmark' ]
+
+def dataSources():
+    return { 'benchmark': 'Benchmark' }
@@ -0,0 +1,345 @@
+# Headless benchmarks for the client hot paths: query results, the schema tree, script files and the data source list.
+# Runs under the Qt offscreen platform against a synthetic pyodbc stand-in (FakePyODBC), or a real ODBC data source
+# given with --connection-string, like the SQLite ODBC driver. Reports throughput and peak Python memory (tracemalloc),
+# and compares them with a baseline saved by an earlier run with --save-baseline on the same machine, a run without a
+# baseline for its benchmarks fails. Saving with --only updates the results of those benchmarks and keeps the others.
+#
+#   python benchmarks/run-benchmarks.py [--rows 100000] [--only query,catalog] [--save-baseline]
+
+import os, sys, time, json, argparse, tempfile, tracemalloc
+
+benchmarkDirectory = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(benchmarkDirectory))
+
+parser = argparse.ArgumentParser(description = 'ODBC Client benchmarks')
+parser.add_argument('--connection-string', help = 'ODBC connection string of a data source to use instead of the synthetic pyodbc stand-in')
+parser.add_argument('--rows', type = int, default = 100000, help = 'rows of the query result')
+parser.add_argument('--columns', type = int, default = 8, help = 'columns of the query result')
+parser.add_argument('--schemas', type = int, default = 4, help = 'schemas in the synthetic catalog')
+parser.add_argument('--tables', type = int, default = 500, help = 'tables per schema in the synthetic catalog')
+parser.add_argument('--procedures', type = int, default = 100, help = 'procedures per schema in the synthetic catalog')
+parser.add_argument('--data-sources', type = int, default = 200, help = 'user and system data source names to enumerate')
+parser.add_argument('--script-size', type = float, default = 4, help = 'size of the SQL script file in MB')
+parser.add_argument('--repeat', type = int, default = 3, help = 'timed runs of each benchmark, the fastest one is reported')
+parser.add_argument('--only', help = 'comma separated benchmark names')
+parser.add_argument('--baseline', default = os.path.join(benchmarkDirectory, 'baseline.json'), help = 'baseline results file')
+parser.add_argument('--save-baseline', action = 'store_true', help = 'store the results as the new baseline')
+parser.add_argument('--tolerance', type = float, default = 0.2, help = 'relative change reported as a regression')
+args = parser.parse_args()
+
+if not args.connection_string:
+    from benchmarks import FakePyODBC
+
+    FakePyODBC.configure(rows = args.rows, columns = args.columns, schemas = args.schemas, tables = args.tables, procedures = args.procedures)
+    sys.modules['pyodbc'] = FakePyODBC
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ['APPDATA'] = tempfile.mkdtemp(prefix = 'odbc-client-benchmark-')        # settings, caches and scripts of the benchmark views
+
+import pyodbc
+from PySide6.QtCore import QCoreApplication, QEventLoop
+from PySide6.QtWidgets import QApplication
+
+from src.ConnectionPool import ConnectionPool
+from src.DatabaseView import DatabaseView, SQLEditorWidget
+from src.SQLFileView import SQLFileView
+from src.ScriptAutosave import ScriptAutosave
+from benchmarks import FakeODBC
+
+def waitUntil(condition, timeout = 600):
+    deadline = time.perf_counter() + timeout
+
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError('Benchmark did not finish in {} seconds'.format(timeout))
+
+        QCoreApplication.processEvents(QEventLoop.AllEvents, 50)
+
+def newView():
+    return DatabaseView(ConnectionPool.forConnection(args.connection_string or 'DSN=benchmark', { }).checkout(), 'benchmark', '')
+
+def closeView(view):
+    view.mainWindow.close()                 # saves settings and stops the workers
+    view.mainWindow.deleteLater()
+    QCoreApplication.processEvents()
+
+def createBenchmarkTable():
+    # Result set of --rows rows for a real data source, the synthetic stand-in answers any SELECT
+    connection = pyodbc.connect(args.connection_string, autocommit = True)
+
+    try:
+        connection.execute('DROP TABLE bench_rows')
+    except pyodbc.Error:
+        pass
+
+    connection.execute('CREATE TABLE bench_rows(id INTEGER, name VARCHAR(40), amount FLOAT, code VARCHAR(10))')
+    cursor = connection.cursor()
+
+    for start in range(0, args.rows, 10000):
+        cursor.executemany('INSERT INTO bench_rows VALUES (?, ?, ?, ?)',
+                [ (row, 'Row number {} of the result'.format(row), row / 7, 'v' + str(row % 1000)) for row in range(start, min(start + 10000, args.rows)) ])
+
+    connection.close()
+
+class QueryBenchmark:
+    # DatabaseView.runQuery() and scrolling the result to the end, rows per second through fetch, conversion and model updates
+    unit = 'rows/s'
+
+    def setUp(self):
+        self.view = newView()
+        self.editor = self.view.sqlScripts[0]
+
+    def run(self):
+        view = self.view
+        view.runQuery(self.editor, 'SELECT * FROM bench_rows', False)
+
+        def fetchedAll():
+            model = view.queryResult.model()
+
+            if model is None or model.queryId != view.queryId:
+                return False
+
+            if model.canFetchMore():
+                model.fetchMore()
+
+            return model.fetchedAll
+
+        waitUntil(fetchedAll)
+
+        return view.queryResult.model().rowCount()
+
+    def tearDown(self):
+        closeView(self.view)
+
+class CatalogBenchmark:
+    # populateDatabaseObjects() and expanding every schema, tree items per second, from the driver or the metadata cache
+    unit = 'items/s'
+
+    def __init__(self, cached):
+        self.cached = cached
+
+    def setUp(self):
+        self.view = newView()
+        self.run()                          # the first load fills the metadata cache
+
+        if not self.cached:
+            self.view.metadataCache = None
+            self.view.metadataWorker.metadataCache = None
+
+    def run(self):
+        view = self.view
+        view.dbTree.clear()
+        view.populateDatabaseObjects()
+
+        def loaded():
+            if view.allObjectsLoaded:
+                return True
+
+            if not view.schemaNodes:
+                return False
+
+            for schemaNode in view.schemaNodes.values():
+                if not schemaNode['item'].isExpanded():
+                    schemaNode['item'].setExpanded(True)
+
+            return all(schemaNode['objectsLoaded'] for schemaNode in view.schemaNodes.values())
+
+        waitUntil(loaded)
+
+        itemCount = 0
+        items = [ view.dbTree.invisibleRootItem() ]
+
+        while items:
+            item = items.pop()
+            itemCount += item.childCount()
+            items.extend(item.child(index) for index in range(item.childCount()))
+
+        return itemCount
+
+    def tearDown(self):
+        closeView(self.view)
+
+class ScriptFileBenchmark:
+    # Autosave of a large script (the editor text and ScriptAutosave.saveScript()), loadSqlFile(), or opening it in
+    # SQLFileView and painting the first, middle and last page, bytes per second
+    unit = 'bytes/s'
+
+    def __init__(self, mode):
+        self.mode = mode
+
+    def setUp(self):
+        self.view = newView()
+        self.editor = SQLEditorWidget()
+        self.autosave = ScriptAutosave()
+        self.fileName = os.path.join(os.environ['APPDATA'], 'benchmark-script.sql')
+        self.journalFileName = os.path.join(os.environ['APPDATA'], 'benchmark-script.jsonl')
+
+        line = "SELECT id, name, amount FROM bench_rows WHERE name LIKE 'Row number %' AND amount > 12.5 ORDER BY id;\n"
+        text = line * max(1, int(args.script_size * 1024 * 1024 / len(line)))
+        self.size = len(text.encode())
+        self.editor.setPlainText(text)
+        self.autosave.saveScript(self.fileName, self.journalFileName, text, 0)
+
+    def run(self):
+        if self.mode == 'load':
+            self.editor.clear()
+            self.view.loadSqlFile(self.fileName, self.editor)
+        elif self.mode == 'view':
+            fileView = SQLFileView(self.fileName)
+            fileView.resize(800, 600)
+
+            for position in [ 0, 0.5, 1 ]:
+                fileView.verticalScrollBar().setValue(int(fileView.verticalScrollBar().maximum() * position))
+                fileView.viewport().grab()
+
+            fileView.closeFile()
+            fileView.deleteLater()
+        else:
+            self.autosave.saveScript(self.fileName, self.journalFileName, self.editor.toPlainText(), 0)
+
+        return self.size
+
+    def tearDown(self):
+        self.editor.deleteLater()
+        closeView(self.view)
+
+class DataSourceBenchmark:
+    # DataSourceCatalog.refresh() over synthetic SQLDrivers() and SQLDataSources() lists, names per second
+    unit = 'names/s'
+
+    def setUp(self):
+        try:
+            import src.ODBC
+        except (ImportError, OSError):
+            sys.modules['src.ODBC'] = FakeODBC      # no Driver Manager library, the catalog module only needs the class to load
+
+        import src.DataSourceCatalog
+
+        src.DataSourceCatalog.ODBC = FakeODBC.ODBC
+        FakeODBC.ODBC.dataSourceCount = args.data_sources
+        self.catalog = src.DataSourceCatalog.DataSourceCatalog()
+
+    def run(self):
+        repeats = max(1, 20000 // max(1, args.data_sources))
+
+        for repeat in range(repeats):
+            self.catalog.dataSources = { }          # each refresh lists every name as added
+            self.catalog.refresh()
+
+        return (len(self.catalog.drivers) + len(self.catalog.dataSources)) * repeats
+
+    def tearDown(self):
+        self.catalog.deleteLater()
+
+BENCHMARKS = {
+    'query': lambda: QueryBenchmark(),
+    'catalog': lambda: CatalogBenchmark(False),
+    'catalog-cached': lambda: CatalogBenchmark(True),
+    'script-save': lambda: ScriptFileBenchmark('save'),
+    'script-load': lambda: ScriptFileBenchmark('load'),
+    'script-view': lambda: ScriptFileBenchmark('view'),
+    'data-sources': lambda: DataSourceBenchmark()
+}
+
+def runBenchmark(name):
+    bestTime = None
+
+    for repeat in range(args.repeat):
+        benchmark = BENCHMARKS[name]()
+        benchmark.setUp()
+
+        try:
+            start = time.perf_counter()
+            count = benchmark.run()
+            elapsed = time.perf_counter() - start
+        finally:
+            benchmark.tearDown()
+
+        if bestTime is None or elapsed < bestTime:
+            bestTime = elapsed
+
+    # One more run for the memory peak, tracemalloc slows down allocations too much for the timed runs
+    benchmark = BENCHMARKS[name]()
+    benchmark.setUp()
+    tracemalloc.start()
+
+    try:
+        benchmark.run()
+        peakMemory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        benchmark.tearDown()
+
+    return { 'count': count, 'seconds': bestTime, 'throughput': count / bestTime if bestTime else 0.0, 'unit': benchmark.unit, 'peakMemory': peakMemory }
+
+def compare(name, result, baseline):
+    # Returns the regression messages of one benchmark
+    messages = [ ]
+    reference = baseline.get(name)
+
+    if not reference:
+        return [ '{}: no baseline in {}, run with --save-baseline to store one'.format(name, args.baseline) ]
+
+    if reference['throughput'] and result['throughput'] < reference['throughput'] * (1 - args.tolerance):
+        messages.append('{}: throughput {:,.0f} {} down from {:,.0f}'.format(name, result['throughput'], result['unit'], reference['throughput']))
+
+    if reference['peakMemory'] and result['peakMemory'] > reference['peakMemory'] * (1 + args.tolerance):
+        messages.append('{}: peak memory {:,} bytes up from {:,}'.format(name, result['peakMemory'], reference['peakMemory']))
+
+    return messages
+
+def main():
+    app = QApplication(sys.argv)
+    app.setApplicationName('ODBC Client Benchmark')
+
+    if args.connection_string:
+        createBenchmarkTable()
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [ name for name in names if name not in BENCHMARKS ]
+
+    if unknown:
+        parser.error('Unknown benchmark: ' + ', '.join(unknown) + ', available: ' + ', '.join(BENCHMARKS))
+
+    baseline = { }
+
+    if not os.path.exists(args.baseline):
+        if not args.save_baseline:
+            parser.error('No baseline results file {}, run with --save-baseline to store one'.format(args.baseline))
+    else:
+        with open(args.baseline, 'r', encoding = 'utf-8') as baselineFile:
+            baseline = json.load(baselineFile)
+
+    results = { }
+    regressions = [ ]
+
+    print('{:16} {:>12} {:>10} {:>18} {:>14} {:>10}'.format('benchmark', 'count', 'seconds', 'throughput', 'peak memory', 'baseline'))
+
+    for name in names:
+        result = runBenchmark(name)
+        results[name] = result
+        regressions.extend(compare(name, result, baseline) if not args.save_baseline else [ ])
+
+        reference = baseline.get(name)
+        change = '{:+.1%}'.format(result['throughput'] / reference['throughput'] - 1) if reference and reference['throughput'] else '-'
+
+        print('{:16} {:>12,} {:>10.3f} {:>12,.0f} {:5} {:>14,} {:>10}'.format(name, result['count'], result['seconds'], result['throughput'], result['unit'],
+                result['peakMemory'], change))
+
+    if args.save_baseline:
+        baseline.update(results)
+
+        with open(args.baseline, 'w', encoding = 'utf-8') as baselineFile:
+            json.dump(baseline, baselineFile, indent = 4)
+
+        print('Baseline saved to ' + args.baseline)
+
+    for message in regressions:
+        print('Regression: ' + message)
+
+    ConnectionPool.closeAll()
+
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,9 @@
-import sys, ctypes
+import sys, time
+
+startupTime = time.perf_counter()          # start of the startup phases reported with --startup-timing
+
 from PySide6 import QtGui
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QObject, Slot, QTimer, QThread
 from PySide6.QtWidgets import (
         QApplication,
         QMainWindow,
@@ -18,9 +21,10 @@ import traits
 import pyodbc
 import keyring
 
-from src.ODBC import ODBC
 from src.ODBCInst import ODBCInst
+from src.ConnectionPool import ConnectionPool, ConnectionPoolError
 from src.DatabaseView import DatabaseView
+from src.DataSourceCatalog import DataSourceCatalog
 
 def readDataSourceName(connectionString):
     for prop in connectionString.split(';'):
@@ -50,6 +54,16 @@ def splitConnectionString(connectionString):
 
     return dsn, ';'.join(properties)
 
+def loadODBCInst(mainWindow):
+    # The ODBC installer library is loaded when a data source is first added, configured or removed
+    try:
+        ODBCInst.Init()
+    except OSError as ex:
+        QMessageBox.warning(mainWindow, mainWindow.tr('ODBC Client'), mainWindow.tr('Unable to load the ODBC installer library: {}').format(str(ex)), QMessageBox.Ok)
+        return False
+
+    return True
+
 def updateDataSource(mainWindow, dataSourceName, connectionString, username, password, credentialsCheckbox):
     if dataSourceName and connectionString:
         DriverName = None
@@ -63,7 +77,7 @@ def updateDataSource(mainWindow, dataSourceName, connectionString, username, pas
             else:
                 connection[key.lstrip()] = val.lstrip()
 
-        if DriverName is not None:
+        if DriverName is not None and loadODBCInst(mainWindow):
             connectionString = ''
 
             if username:
@@ -90,6 +104,9 @@ def updateDataSource(mainWindow, dataSourceName, connectionString, username, pas
             if credentialsCheckbox:
                 keyring.set_password('odbc:' + dataSourceName, username, password)
 
+            dataSourceCatalog.refreshRequested.emit()
+
+dataSourceCatalog = None            # drivers and data source names listed in the dialog, refreshed on the catalog thread
 dbViews = [ ]
 autoLoadCredentials = True
 
@@ -117,7 +134,13 @@ def newConnection(mainWindow, dataSourceName, connectionString, username, passwo
         if password:
             kwArgs['PWD'] = password
 
-        connection = pyodbc.connect(connectionString, autocommit=True, **kwArgs)
+        try:
+            # Reuses an idle connection from a previous window, without waiting on the GUI thread for one to be returned
+            session = ConnectionPool.forConnection(connectionString, kwArgs).checkout(timeout = 0)
+        except ConnectionPoolError as ex:
+            QMessageBox.warning(mainWindow, mainWindow.tr('ODBC Client'), str(ex) + '\n' + mainWindow.tr('Close a window or wait for a query to finish'),
+                    QMessageBox.Ok)
+            return
 
         global autoLoadCredentials
         global dbViews
@@ -130,7 +153,7 @@ def newConnection(mainWindow, dataSourceName, connectionString, username, passwo
 
         dsn, extraConnectionString = splitConnectionString(connectionString)
 
-        dbViews.append(DatabaseView(connection, dsn, extraConnectionString))
+        dbViews.append(DatabaseView(session, dsn, extraConnectionString))
         dbViews[-1].closeView.connect(lambda databaseView: closeDbView(databaseView))
 
 def replaceDriverAndDsn(connectionString, newKey, newVal):
@@ -253,32 +276,33 @@ def fillDriverName(connectionString, driverList, dsnList):
         if driverList.currentItem():
             removeDriverOrDsn(connectionString, 'Driver', driverList.currentItem().text())
 
-def updateListWidget(listWidget, newItemList):
-    modified = not listWidget.count() == len(newItemList)
+def applyListChanges(listWidget, added, removed):
+    # Takes out the removed names and inserts the new ones, the items kept stay selected
+    for name in removed:
+        for item in listWidget.findItems(name, Qt.MatchExactly):
+            listWidget.takeItem(listWidget.row(item))
 
-    if not modified:
-        for row in range(listWidget.count()):
-            if not listWidget.item(row).text() == newItemList[row]:
-                modified = True
-                break
+    for index, name, description in added:
+        listWidget.insertItem(index, name)
 
-    if modified:
-        listWidget.clear()
-        listWidget.addItems(newItemList)
+        if description:
+            listWidget.item(index).setToolTip(description)
 
 def odbcAdministrator(mainWindow, driverList, dsnList):
+    if not loadODBCInst(mainWindow):
+        return
 
     if not ODBCInst.SQLManageDataSources(int(mainWindow.effectiveWinId())):
         QMessageBox.warning(mainWindow, mainWindow.tr('ODBC Client'), mainWindow.tr('Unable to run ODBC Data Source Administrator'), QMessageBox.Ok)
 
-    updateListWidget(driverList, pyodbc.drivers())
-    updateListWidget(dsnList, [ val for key, val in enumerate(pyodbc.dataSources()) ])
+    dataSourceCatalog.refresh()
 
 def removeDsn(mainWindow, dsnList):
     dataSourceName = dsnList.currentItem().text()
 
-    if QMessageBox.warning(mainWindow, mainWindow.tr('ODBC Client'), mainWindow.tr('Delete data source {} ?').format(dsnList.currentItem().text()), QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
-        driverDescription = pyodbc.dataSources()[dataSourceName]
+    if QMessageBox.warning(mainWindow, mainWindow.tr('ODBC Client'), mainWindow.tr('Delete data source {} ?').format(dsnList.currentItem().text()), QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes \
+            and loadODBCInst(mainWindow):
+        driverDescription = dataSourceCatalog.driverName(dataSourceName)
 
         if driverDescription:
             result = ODBCInst.SQLConfigDataSource(int(mainWindow.effectiveWinId()), ODBCInst.ODBC_REMOVE_DSN, driverDescription, 'DSN=' + dataSourceName)
@@ -286,11 +310,9 @@ def removeDsn(mainWindow, dsnList):
             if not result:
                 QMessageBox.warning(mainWindow, mainWindow.tr('ODBC Client'), mainWindow.tr('Unable to remove data source.\nTry the system ODBC Data Source Administrator (Manage DSNs ... button)'), QMessageBox.Ok)
 
-        newDataSourceList = [ val for key, val in enumerate(pyodbc.dataSources()) ]
-
-        updateListWidget(dsnList, newDataSourceList)
+        dataSourceCatalog.refresh()
 
-        if not dataSourceName in newDataSourceList:
+        if not dataSourceName in dataSourceCatalog.dataSources:
             credential = keyring.get_credential('odbc:' + dataSourceName, None)
 
             if credential:
@@ -299,12 +321,12 @@ def removeDsn(mainWindow, dsnList):
 def configureDsn(mainWindow, dsnList):
     dataSourceName = dsnList.currentItem().text()
 
-    driverDescription = pyodbc.dataSources()[dataSourceName]
+    driverDescription = dataSourceCatalog.driverName(dataSourceName)
 
-    if driverDescription:
+    if driverDescription and loadODBCInst(mainWindow):
         result = ODBCInst.SQLConfigDataSource(int(mainWindow.effectiveWinId()), ODBCInst.ODBC_CONFIG_DSN, driverDescription, 'DSN=' + dataSourceName)
 
-    updateListWidget(dsnList, [ val for key, val in enumerate(pyodbc.dataSources()) ])
+    dataSourceCatalog.refresh()
 
 
 MAIN_WINDOW_WIDTH = 700                 # Windows 10 system requirements include monitor resolution of 800x600
@@ -331,75 +353,60 @@ class MainPanel(QWidget):
 
         super().keyPressEvent(ev)
 
-def enumerateDataSourceNames(hEnv, enumerationType, targetDict):
-    dsn_names = [ ]
-    dsn_drivers = [ ]
+class StartupTimer:
+    # Prints the duration of each startup phase, with the --startup-timing command line option
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.lastTime = startupTime
 
-    dsn_name_len = ODBC.SQLSMALLINT()
-    driver_name_len = ODBC.SQLSMALLINT()
+    def phase(self, name, elapsed = None):
+        if self.enabled:
+            now = time.perf_counter()
 
-    sqlResult = ODBC.SQLDataSources(hEnv, enumerationType, None, 0, ctypes.byref(dsn_name_len), None, 0, ctypes.byref(driver_name_len))
+            if elapsed is None:
+                elapsed = now - self.lastTime
+                self.lastTime = now
 
-    while sqlResult == ODBC.SQL_SUCCESS or sqlResult == ODBC.SQL_SUCCESS_WITH_INFO:
-        dsn_names.append(ctypes.create_unicode_buffer(dsn_name_len.value + 1))
-        dsn_drivers.append(ctypes.create_unicode_buffer(driver_name_len.value + 1))
-        sqlResult = ODBC.SQLDataSources(hEnv, ODBC.SQL_FETCH_NEXT, None, 0, ctypes.byref(dsn_name_len), None, 0, ctypes.byref(driver_name_len))
+            print('Startup: {:<32} {:8.3f} s, {:8.3f} s since start'.format(name, elapsed, now - startupTime))
 
-    if sqlResult != ODBC.SQL_NO_DATA:
-        print('Error {} enumerating Data Source Names'.format(sqlResult), file = sys.stderr)
-    else:
-        index = 0
-        sqlResult = ODBC.SQLDataSources(hEnv, enumerationType, dsn_names[index] , ctypes.sizeof(dsn_names[index]), ctypes.byref(dsn_name_len), dsn_drivers[index], ctypes.sizeof(dsn_drivers[index]), ctypes.byref(driver_name_len))
-
-        while sqlResult == ODBC.SQL_SUCCESS or sqlResult == ODBC.SQL_SUCCESS_WITH_INFO:
-            targetDict[dsn_names[index].value[:dsn_name_len.value]] = dsn_drivers[index].value[:driver_name_len.value]
-            index = index + 1
+class DataSourceLists(QObject):
+    # Applies the catalog changes to the dialog lists on the GUI thread
+    def __init__(self, startupTimer, driverList, dsnList):
+        super().__init__()
 
-            if index < len(dsn_names):
-                sqlResult = ODBC.SQLDataSources(hEnv, ODBC.SQL_FETCH_NEXT, dsn_names[index] , ctypes.sizeof(dsn_names[index]), ctypes.byref(dsn_name_len), dsn_drivers[index], ctypes.sizeof(dsn_drivers[index]), ctypes.byref(driver_name_len))
-            else:
-                break
+        self.startupTimer = startupTimer
+        self.driverList = driverList
+        self.dsnList = dsnList
+        self.listed = False
 
-def dataSourceNames():
-    hEnv = ODBC.SQLHANDLE()
+    @Slot(object, object)
+    def showDrivers(self, added, removed):
+        applyListChanges(self.driverList, added, removed)
 
-    sqlReturn = ODBC.SQLAllocHandle(ODBC.SQL_HANDLE_ENV, ODBC.SQL_NULL_HANDLE, ctypes.byref(hEnv))
+    @Slot(object, object)
+    def showDataSources(self, added, removed):
+        applyListChanges(self.dsnList, added, removed)
 
-    if sqlReturn != ODBC.SQL_SUCCESS and sqlReturn != ODBC.SQL_SUCCESS_WITH_INFO:
-        print('Error allocating ODBC environment handle\n', file = sys.stderr)
-    else:
-        try:
-            sqlReturn = ODBC.SQLSetEnvAttr(hEnv, ODBC.SQL_ATTR_ODBC_VERSION, ctypes.cast(ODBC.SQL_OV_ODBC3_80, ODBC.SQLPOINTER), 0)
-
-            if sqlReturn != ODBC.SQL_SUCCESS and sqlReturn != ODBC.SQL_SUCCESS_WITH_INFO:
-                print('Error {} setting ODBC environment attributes\n'.format(sqlReturn), file = sys.stderr)
-            else:
-                result = { 'user': { }, 'system': { } }
+    @Slot(float)
+    def showRefreshed(self, elapsed):
+        if not self.listed:
+            self.listed = True
+            self.startupTimer.phase('drivers and data sources listed', elapsed)
 
-                enumerateDataSourceNames(hEnv, ODBC.SQL_FETCH_FIRST_USER, result['user'])
-
-                for name, driver in result['user'].items():
-                    print('User DSN: {}, Driver: {}'.format(name, driver))
-
-                enumerateDataSourceNames(hEnv, ODBC.SQL_FETCH_FIRST_SYSTEM, result['system'])
-
-                for name, driver in result['system'].items():
-                    print('System DSN: {}, Driver: {}'.format(name, driver))
-
-                return result
-        finally:
-            sqlReturn = ODBC.SQLFreeHandle(ODBC.SQL_HANDLE_ENV, hEnv)
+def main(argv):
+    global dataSourceCatalog
 
-            if sqlReturn != ODBC.SQL_SUCCESS and sqlReturn != ODBC.SQL_SUCCESS_WITH_INFO:
-                print('Error deallocating ODBC environment handle\n', file = sys.stderr)
+    startupTimer = StartupTimer('--startup-timing' in argv)
+    startupTimer.phase('imports')
 
-def main(argv):
     mainApp = QApplication(argv)
     mainApp.setOrganizationName('')
     mainApp.setOrganizationDomain('org.free-and-open-source-software')
     mainApp.setApplicationName('ODBC Client')
     mainApp.setApplicationDisplayName(mainApp.tr('ODBC Client'))
 
+    startupTimer.phase('application')
+
     mainWindow = QMainWindow()
     mainWindow.setCentralWidget(MainPanel(mainWindow))
     mainWindow.setWindowTitle(mainWindow.tr('ODBC Client'))
@@ -409,12 +416,24 @@ def main(argv):
 
     resizeMainWindow(mainWindow)
 
-    pyodbc.pooling = False
-
-    driverList.addItems(pyodbc.drivers())
-    dsnList.addItems(val for key, val in enumerate(pyodbc.dataSources()))
-
-    dataSourceNames()
+    pyodbc.pooling = False          # connections are pooled by ConnectionPool instead of the Driver Manager
+
+    poolTimer = QTimer(mainApp)
+    poolTimer.timeout.connect(lambda: ConnectionPool.evictIdleConnections())
+    poolTimer.start(60 * 1000)
+    mainApp.aboutToQuit.connect(lambda: ConnectionPool.closeAll())
+
+    # The lists are filled when the background enumeration finishes, the dialog is usable before that
+    dataSourceLists = DataSourceLists(startupTimer, driverList, dsnList)
+    dataSourceThread = QThread()
+    dataSourceCatalog = DataSourceCatalog()
+    dataSourceCatalog.moveToThread(dataSourceThread)
+    dataSourceCatalog.driversChanged.connect(dataSourceLists.showDrivers)
+    dataSourceCatalog.dataSourcesChanged.connect(dataSourceLists.showDataSources)
+    dataSourceCatalog.refreshed.connect(dataSourceLists.showRefreshed)
+    dataSourceThread.start()
+    mainApp.aboutToQuit.connect(lambda: dataSourceThread.quit())
+    mainApp.aboutToQuit.connect(lambda: dataSourceThread.wait())
 
     grid = QGridLayout(mainWindow.centralWidget())
 
@@ -499,7 +518,16 @@ def main(argv):
     dsnRemoveButton.clicked.connect(lambda: removeDsn(mainWindow, dsnList))
     dsnConfigButton.clicked.connect(lambda: configureDsn(mainWindow, dsnList))
 
+    startupTimer.phase('connection dialog')
+
     mainWindow.show()
+
+    def windowShown():
+        startupTimer.phase('window shown')
+        dataSourceCatalog.refreshRequested.emit()
+
+    QTimer.singleShot(0, windowShown)   # runs once the event loop has shown the window
+
     sys.exit(mainApp.exec())
 
 if __name__ == "__main__":
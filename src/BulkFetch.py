@@ -0,0 +1,492 @@
+import array, datetime, threading
+from ctypes import byref, cast, sizeof, addressof, string_at, c_ubyte
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from src.ODBC import ODBC
+except ImportError:
+    ODBC = None
+
+from src.ResultStore import ResultChunk, EPOCH_ORDINAL, newColumnForType
+
+class BulkFetchError(Exception):
+    pass
+
+class BulkFetchUnsupported(BulkFetchError):
+    # The result has columns that can not be bound to fixed size arrays, like long text or binary data
+    pass
+
+def succeeded(sqlReturn):
+    return sqlReturn == ODBC.SQL_SUCCESS or sqlReturn == ODBC.SQL_SUCCESS_WITH_INFO
+
+def diagnostics(handleType, handle):
+    messages = [ ]
+    sqlState = (ODBC.SQLWCHAR * 6)()
+    nativeError = ODBC.SQLINTEGER()
+    messageText = (ODBC.SQLWCHAR * ODBC.SQL_MAX_MESSAGE_LENGTH)()
+    textLength = ODBC.SQLSMALLINT()
+    recNumber = 1
+
+    while succeeded(ODBC.SQLGetDiagRec(handleType, handle, recNumber, sqlState, byref(nativeError), messageText, len(messageText), byref(textLength))):
+        messages.append('[{}] {}'.format(ODBC.fromWideString(sqlState, 5), ODBC.fromWideString(messageText, min(textLength.value, len(messageText) - 1))))
+        recNumber += 1
+
+    return '\n'.join(messages)
+
+def check(sqlReturn, handleType, handle, action):
+    if not succeeded(sqlReturn):
+        raise BulkFetchError('Error {} {}: {}'.format(sqlReturn, action, diagnostics(handleType, handle) if handle else ''))
+
+def nullBitmap(indicators, rowCount):
+    # Same layout as ResultColumn.nulls, bit (row & 7) of byte (row >> 3) set for NULL values
+    if numpy is not None:
+        flags = numpy.frombuffer(indicators, dtype = 'i{}'.format(sizeof(ODBC.SQLLEN)), count = rowCount) == ODBC.SQL_NULL_DATA
+        return numpy.packbits(flags, bitorder = 'little').tobytes()
+
+    nulls = bytearray((rowCount + 7) >> 3)
+
+    for row in range(rowCount):
+        if indicators[row] == ODBC.SQL_NULL_DATA:
+            nulls[row >> 3] |= 1 << (row & 7)
+
+    return nulls
+
+class BoundColumn:
+    MAX_TEXT_LENGTH = 4000                  # characters or bytes, longer and unlimited columns are not bound
+
+    def __init__(self, name, sqlType, columnSize, decimalDigits, nullable):
+        self.name = name
+        self.sqlType = sqlType
+        self.columnSize = columnSize
+        self.decimalDigits = decimalDigits
+        self.nullable = nullable
+        self.buffer = None
+        self.indicators = None
+
+        if sqlType == ODBC.SQL_BIT:
+            self.cType, self.elementSize, self.pythonType = ODBC.SQL_C_BIT, 1, bool
+        elif sqlType in [ ODBC.SQL_TINYINT, ODBC.SQL_SMALLINT, ODBC.SQL_INTEGER, ODBC.SQL_BIGINT ]:
+            self.cType, self.elementSize, self.pythonType = ODBC.SQL_C_SBIGINT, 8, int
+        elif sqlType in [ ODBC.SQL_REAL, ODBC.SQL_FLOAT, ODBC.SQL_DOUBLE ]:
+            self.cType, self.elementSize, self.pythonType = ODBC.SQL_C_DOUBLE, 8, float
+        elif sqlType == ODBC.SQL_TYPE_DATE:
+            self.cType, self.elementSize, self.pythonType = ODBC.SQL_C_TYPE_DATE, sizeof(ODBC.SQL_DATE_STRUCT), datetime.date
+        elif sqlType == ODBC.SQL_TYPE_TIME:
+            self.cType, self.elementSize, self.pythonType = ODBC.SQL_C_TYPE_TIME, sizeof(ODBC.SQL_TIME_STRUCT), datetime.time
+        elif sqlType == ODBC.SQL_TYPE_TIMESTAMP:
+            self.cType, self.elementSize, self.pythonType = ODBC.SQL_C_TYPE_TIMESTAMP, sizeof(ODBC.SQL_TIMESTAMP_STRUCT), datetime.datetime
+        elif sqlType in [ ODBC.SQL_BINARY, ODBC.SQL_VARBINARY ] and 0 < columnSize <= BoundColumn.MAX_TEXT_LENGTH:
+            self.cType, self.elementSize, self.pythonType = ODBC.SQL_C_BINARY, columnSize, bytes
+        elif sqlType in [ ODBC.SQL_CHAR, ODBC.SQL_VARCHAR, ODBC.SQL_WCHAR, ODBC.SQL_WVARCHAR, ODBC.SQL_NUMERIC, ODBC.SQL_DECIMAL, ODBC.SQL_GUID ] \
+                and 0 < columnSize <= BoundColumn.MAX_TEXT_LENGTH:
+            # Decimal numbers are kept exact as text, with room for the sign and the decimal point
+            length = columnSize + 2 if sqlType in [ ODBC.SQL_NUMERIC, ODBC.SQL_DECIMAL ] else columnSize
+            self.cType, self.elementSize, self.pythonType = ODBC.SQL_C_WCHAR, (length + 1) * sizeof(ODBC.SQLWCHAR), str
+        else:
+            raise BulkFetchUnsupported('Column {} of SQL type {} and size {} can not be fetched in bulk'.format(name, sqlType, columnSize))
+
+    def bind(self, hStmt, columnNumber, rowArraySize):
+        self.buffer = (c_ubyte * (self.elementSize * rowArraySize))()
+        self.indicators = (ODBC.SQLLEN * rowArraySize)()
+
+        check(ODBC.SQLBindCol(hStmt, columnNumber, self.cType, self.buffer, self.elementSize, self.indicators), ODBC.SQL_HANDLE_STMT, hStmt,
+                'binding column ' + self.name)
+
+    def array(self, rowCount):
+        # NumPy view of the fetched values, without copying, valid until the next fetch
+        if self.pythonType is int:
+            return numpy.frombuffer(self.buffer, dtype = 'i8', count = rowCount)
+
+        if self.pythonType is float:
+            return numpy.frombuffer(self.buffer, dtype = 'f8', count = rowCount)
+
+        if self.pythonType is bool:
+            return numpy.frombuffer(self.buffer, dtype = 'bool', count = rowCount)
+
+        if self.cType in [ ODBC.SQL_C_TYPE_DATE, ODBC.SQL_C_TYPE_TIME, ODBC.SQL_C_TYPE_TIMESTAMP ]:
+            structType = { ODBC.SQL_C_TYPE_DATE: ODBC.SQL_DATE_STRUCT, ODBC.SQL_C_TYPE_TIME: ODBC.SQL_TIME_STRUCT, ODBC.SQL_C_TYPE_TIMESTAMP: ODBC.SQL_TIMESTAMP_STRUCT }[self.cType]
+            return numpy.ctypeslib.as_array((structType * rowCount).from_buffer(self.buffer))
+
+        return None
+
+    def encodeTemporal(self, rowCount, nulls):
+        # Dates, times and timestamps as days or microseconds since the epoch, the ResultStore encoding
+        if numpy is not None:
+            values = self.array(rowCount)
+
+            if self.cType == ODBC.SQL_C_TYPE_TIME:
+                encoded = ((values['hour'].astype('i8') * 60 + values['minute']) * 60 + values['second']) * 1000000
+            else:
+                months = (values['year'].astype('i8') - 1970) * 12 + values['month'] - 1
+                encoded = months.astype('datetime64[M]').astype('datetime64[D]').astype('i8') + values['day'] - 1
+
+                if self.cType == ODBC.SQL_C_TYPE_TIMESTAMP:
+                    encoded = ((encoded * 24 + values['hour']) * 60 + values['minute']) * 60 + values['second']
+                    encoded = encoded * 1000000 + values['fraction'] // 1000
+
+            return encoded.astype('i8').tobytes()
+
+        encoded = array.array('q', bytes(8 * rowCount))
+        structType = { ODBC.SQL_C_TYPE_DATE: ODBC.SQL_DATE_STRUCT, ODBC.SQL_C_TYPE_TIME: ODBC.SQL_TIME_STRUCT, ODBC.SQL_C_TYPE_TIMESTAMP: ODBC.SQL_TIMESTAMP_STRUCT }[self.cType]
+
+        for row, value in enumerate((structType * rowCount).from_buffer(self.buffer)):
+            if nulls[row >> 3] & (1 << (row & 7)):
+                continue
+
+            if self.cType == ODBC.SQL_C_TYPE_TIME:
+                encoded[row] = ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000
+            else:
+                days = datetime.date(value.year, value.month, value.day).toordinal() - EPOCH_ORDINAL
+
+                if self.cType == ODBC.SQL_C_TYPE_TIMESTAMP:
+                    encoded[row] = (((days * 24 + value.hour) * 60 + value.minute) * 60 + value.second) * 1000000 + value.fraction // 1000
+                else:
+                    encoded[row] = days
+
+        return encoded.tobytes()
+
+    def toColumn(self, rowCount):
+        # Copies the fetched arrays into a new ResultStore column, fixed width values without any per row conversion
+        column = newColumnForType(self.pythonType)
+        nulls = nullBitmap(self.indicators, rowCount)
+
+        if self.pythonType in [ int, float, bool ]:
+            column.appendBuffer(memoryview(self.buffer)[ : rowCount * self.elementSize], nulls, rowCount)
+        elif self.pythonType in [ datetime.date, datetime.time, datetime.datetime ]:
+            column.appendBuffer(self.encodeTemporal(rowCount, nulls), nulls, rowCount)
+        else:
+            values = [ ]
+            address = addressof(self.buffer)
+            maxLength = self.elementSize if self.cType == ODBC.SQL_C_BINARY else self.elementSize - sizeof(ODBC.SQLWCHAR)
+
+            for row in range(rowCount):
+                length = self.indicators[row]
+
+                if length == ODBC.SQL_NULL_DATA:
+                    values.append(None)
+                else:
+                    if length < 0 or length > maxLength:
+                        length = maxLength          # SQL_NO_TOTAL or truncated
+
+                    data = string_at(address + row * self.elementSize, length)
+                    values.append(data if self.cType == ODBC.SQL_C_BINARY else data.decode('utf-16-le', 'surrogatepass'))
+
+            column.append(values)
+
+        return column
+
+class GetDataColumn:
+    # Column read value by value with SQLGetData, for a result that can not be bound once its statement has run
+    BUFFER_LENGTH = 32768                   # bytes per SQLGetData() call, longer values are read in parts
+
+    def __init__(self, name, sqlType, columnSize, decimalDigits, nullable):
+        self.name = name
+        self.sqlType = sqlType
+        self.columnSize = columnSize
+        self.decimalDigits = decimalDigits
+        self.nullable = nullable
+
+        if sqlType in [ ODBC.SQL_BINARY, ODBC.SQL_VARBINARY, ODBC.SQL_LONGVARBINARY ]:
+            self.cType, self.pythonType = ODBC.SQL_C_BINARY, bytes
+        elif sqlType == ODBC.SQL_BIT:
+            self.cType, self.pythonType = ODBC.SQL_C_WCHAR, bool
+        elif sqlType in [ ODBC.SQL_TINYINT, ODBC.SQL_SMALLINT, ODBC.SQL_INTEGER, ODBC.SQL_BIGINT ]:
+            self.cType, self.pythonType = ODBC.SQL_C_WCHAR, int
+        elif sqlType in [ ODBC.SQL_REAL, ODBC.SQL_FLOAT, ODBC.SQL_DOUBLE ]:
+            self.cType, self.pythonType = ODBC.SQL_C_WCHAR, float
+        else:
+            self.cType, self.pythonType = ODBC.SQL_C_WCHAR, str     # dates and times as the driver formats them
+
+    def read(self, hStmt, columnNumber, buffer, indicator):
+        parts = [ ]
+        available = len(buffer) if self.cType == ODBC.SQL_C_BINARY else len(buffer) - sizeof(ODBC.SQLWCHAR)
+
+        while True:
+            sqlReturn = ODBC.SQLGetData(hStmt, columnNumber, self.cType, buffer, len(buffer), byref(indicator))
+
+            if sqlReturn == ODBC.SQL_NO_DATA:
+                break
+
+            check(sqlReturn, ODBC.SQL_HANDLE_STMT, hStmt, 'reading column ' + self.name)
+
+            if indicator.value == ODBC.SQL_NULL_DATA:
+                return None
+
+            if sqlReturn == ODBC.SQL_SUCCESS_WITH_INFO and (indicator.value == ODBC.SQL_NO_TOTAL or indicator.value > available):
+                parts.append(string_at(buffer, available))      # truncated, the rest comes with the next call
+                continue
+
+            parts.append(string_at(buffer, indicator.value))
+            break
+
+        data = b''.join(parts)
+
+        if self.cType == ODBC.SQL_C_BINARY:
+            return data
+
+        value = data.decode('utf-16-le', 'surrogatepass')
+
+        try:
+            if self.pythonType is bool:
+                return value not in [ '0', '' ]
+
+            if self.pythonType is int or self.pythonType is float:
+                return self.pythonType(value)
+        except ValueError:
+            pass                            # kept as text, as ResultChunk does for values that do not fit the type
+
+        return value
+
+class BulkStatement:
+    # Statement handle with column wise bound arrays, used in place of a pyodbc Cursor by the query worker.
+    # The statement is prepared and its result described before it runs: statements without a result (DML, DDL, SET,
+    # transactions) and results that can not be bound raise BulkFetchUnsupported, to run once through pyodbc on the
+    # session connection instead. Once executed a statement is never run again, a later result that can not be bound
+    # is read row by row with SQLGetData.
+    GET_DATA_ROWS = 1024                    # rows per fetch() for a result read with SQLGetData
+
+    def __init__(self, bulkFetch, queryStr):
+        self.hStmt = ODBC.SQLHANDLE()
+        self.handleLock = threading.Lock()  # cancel() runs on the GUI thread, the handle must not be freed meanwhile
+        self.columns = [ ]
+        self.description = None
+        self.rowcount = -1
+        self.messages = [ ]                 # as pyodbc Cursor.messages, informational messages are not read
+        self.rowArraySize = 1
+        self.rowsFetched = ODBC.SQLULEN()
+        self.fetchedAll = False
+        self.getData = False                # columns read with SQLGetData instead of bound arrays
+        self.rows = [ ]                     # rows read by the last fetch() with SQLGetData
+
+        check(ODBC.SQLAllocHandle(ODBC.SQL_HANDLE_STMT, bulkFetch.hDbc, byref(self.hStmt)), ODBC.SQL_HANDLE_DBC, bulkFetch.hDbc, 'allocating statement handle')
+
+        try:
+            try:
+                check(ODBC.SQLPrepare(self.hStmt, ODBC.wideString(queryStr), ODBC.SQL_NTS), ODBC.SQL_HANDLE_STMT, self.hStmt, 'preparing query')
+                columns = self.describeColumns(BoundColumn)
+            except BulkFetchUnsupported:
+                raise
+            except BulkFetchError as ex:
+                # Like temporary tables of the session, not visible to the bulk connection
+                raise BulkFetchUnsupported(str(ex))
+
+            if not columns:
+                raise BulkFetchUnsupported('Query without a result set')
+
+            sqlReturn = ODBC.SQLExecute(self.hStmt)
+
+            if sqlReturn != ODBC.SQL_NO_DATA:       # searched UPDATE or DELETE with no rows
+                check(sqlReturn, ODBC.SQL_HANDLE_STMT, self.hStmt, 'executing query')
+
+            self.openResult()
+        except:
+            self.close()
+            raise
+
+    def describeColumns(self, columnType):
+        # Columns of the prepared statement or of the current result, created as columnType
+        columnCount = ODBC.SQLSMALLINT()
+        check(ODBC.SQLNumResultCols(self.hStmt, byref(columnCount)), ODBC.SQL_HANDLE_STMT, self.hStmt, 'counting result columns')
+
+        nameBuffer = (ODBC.SQLWCHAR * 256)()
+        nameLength = ODBC.SQLSMALLINT()
+        dataType = ODBC.SQLSMALLINT()
+        columnSize = ODBC.SQLULEN()
+        decimalDigits = ODBC.SQLSMALLINT()
+        nullable = ODBC.SQLSMALLINT()
+        columns = [ ]
+
+        for columnNumber in range(1, columnCount.value + 1):
+            check(ODBC.SQLDescribeCol(self.hStmt, columnNumber, nameBuffer, len(nameBuffer), byref(nameLength), byref(dataType), byref(columnSize),
+                    byref(decimalDigits), byref(nullable)), ODBC.SQL_HANDLE_STMT, self.hStmt, 'describing result column')
+
+            name = ODBC.fromWideString(nameBuffer, min(nameLength.value, len(nameBuffer) - 1))
+            columns.append(columnType(name, dataType.value, columnSize.value, decimalDigits.value, nullable.value))
+
+        return columns
+
+    def openResult(self):
+        # Rows affected, or for a result set the rows some drivers know of before the fetch, -1 otherwise
+        rowCount = ODBC.SQLLEN()
+
+        if succeeded(ODBC.SQLRowCount(self.hStmt, byref(rowCount))):
+            self.rowcount = rowCount.value
+
+        try:
+            self.columns = self.describeColumns(BoundColumn)
+            self.getData = False
+        except BulkFetchUnsupported as ex:
+            print('Bulk fetch not used for result: ' + str(ex))
+            self.columns = self.describeColumns(GetDataColumn)
+            self.getData = True
+
+        if not self.columns:
+            return
+
+        if self.getData:
+            # One row per SQLFetchScroll() call and no bound columns, for SQLGetData()
+            self.rowArraySize = BulkStatement.GET_DATA_ROWS
+
+            check(ODBC.SQLSetStmtAttr(self.hStmt, ODBC.SQL_ATTR_ROW_ARRAY_SIZE, cast(1, ODBC.SQLPOINTER), 0), ODBC.SQL_HANDLE_STMT, self.hStmt,
+                    'setting row array size')
+        else:
+            # As many rows per SQLFetchScroll() call as fit in the buffer budget
+            rowSize = sum(column.elementSize + sizeof(ODBC.SQLLEN) for column in self.columns)
+            self.rowArraySize = max(1, min(BulkFetch.ROW_ARRAY_SIZE, BulkFetch.BUFFER_SIZE // rowSize))
+
+            check(ODBC.SQLSetStmtAttr(self.hStmt, ODBC.SQL_ATTR_ROW_BIND_TYPE, cast(ODBC.SQL_BIND_BY_COLUMN, ODBC.SQLPOINTER), 0), ODBC.SQL_HANDLE_STMT, self.hStmt,
+                    'setting column wise binding')
+            check(ODBC.SQLSetStmtAttr(self.hStmt, ODBC.SQL_ATTR_ROW_ARRAY_SIZE, cast(self.rowArraySize, ODBC.SQLPOINTER), 0), ODBC.SQL_HANDLE_STMT, self.hStmt,
+                    'setting row array size')
+
+            for columnNumber, column in enumerate(self.columns, 1):
+                column.bind(self.hStmt, columnNumber, self.rowArraySize)
+
+        check(ODBC.SQLSetStmtAttr(self.hStmt, ODBC.SQL_ATTR_ROWS_FETCHED_PTR, addressof(self.rowsFetched), 0), ODBC.SQL_HANDLE_STMT, self.hStmt,
+                'setting rows fetched pointer')
+
+        self.description = [ (column.name, column.pythonType, None, column.columnSize, column.columnSize, column.decimalDigits, column.nullable == 1)
+                for column in self.columns ]
+
+    def fetchGetData(self):
+        buffer = (c_ubyte * GetDataColumn.BUFFER_LENGTH)()
+        indicator = ODBC.SQLLEN()
+        self.rows = [ ]
+
+        while len(self.rows) < self.rowArraySize:
+            sqlReturn = ODBC.SQLFetchScroll(self.hStmt, ODBC.SQL_FETCH_NEXT, 0)
+
+            if sqlReturn == ODBC.SQL_NO_DATA:
+                self.fetchedAll = True
+                break
+
+            check(sqlReturn, ODBC.SQL_HANDLE_STMT, self.hStmt, 'fetching rows')
+
+            self.rows.append(tuple(column.read(self.hStmt, columnNumber, buffer, indicator) for columnNumber, column in enumerate(self.columns, 1)))
+
+        return len(self.rows)
+
+    def fetch(self):
+        # Fills the bound arrays with the next rows, returns the number of rows fetched
+        if self.fetchedAll:
+            return 0
+
+        if self.getData:
+            return self.fetchGetData()
+
+        sqlReturn = ODBC.SQLFetchScroll(self.hStmt, ODBC.SQL_FETCH_NEXT, 0)
+
+        if sqlReturn == ODBC.SQL_NO_DATA:
+            self.fetchedAll = True
+            return 0
+
+        check(sqlReturn, ODBC.SQL_HANDLE_STMT, self.hStmt, 'fetching rows')
+
+        if self.rowsFetched.value < self.rowArraySize:
+            self.fetchedAll = True
+
+        return self.rowsFetched.value
+
+    def nextset(self):
+        # Moves to the next result of a batch or procedure like pyodbc Cursor.nextset(), the driver discards the rows
+        # not fetched from the current one
+        sqlReturn = ODBC.SQLMoreResults(self.hStmt)
+
+        if sqlReturn == ODBC.SQL_NO_DATA:
+            self.description = None
+            return False
+
+        check(sqlReturn, ODBC.SQL_HANDLE_STMT, self.hStmt, 'moving to the next result')
+        check(ODBC.SQLFreeStmt(self.hStmt, ODBC.SQL_UNBIND), ODBC.SQL_HANDLE_STMT, self.hStmt, 'unbinding result columns')
+
+        self.columns = [ ]
+        self.description = None
+        self.rowcount = -1
+        self.fetchedAll = False
+        self.rows = [ ]
+        self.openResult()
+
+        return True
+
+    def newChunk(self, rowCount):
+        if self.getData:
+            return ResultChunk.fromRows([ newColumnForType(column.pythonType) for column in self.columns ], self.rows[ : rowCount])
+
+        chunk = ResultChunk([ column.toColumn(rowCount) for column in self.columns ])
+        chunk.rowCount = rowCount
+
+        return chunk
+
+    def cancel(self):
+        with self.handleLock:
+            if self.hStmt:
+                check(ODBC.SQLCancel(self.hStmt), ODBC.SQL_HANDLE_STMT, self.hStmt, 'cancelling query')
+
+    def close(self):
+        with self.handleLock:
+            if self.hStmt:
+                ODBC.SQLFreeHandle(ODBC.SQL_HANDLE_STMT, self.hStmt)
+                self.hStmt = None
+
+class BulkFetch:
+    # Separate ctypes connection to the data source, fetching result sets in blocks of rows into column arrays
+    ROW_ARRAY_SIZE = 4096
+    BUFFER_SIZE = 16 * 1024 * 1024          # bytes for the bound arrays of one statement
+
+    @staticmethod
+    def available():
+        if ODBC is None:
+            return False
+
+        try:
+            ODBC.Init()                     # the Driver Manager library is loaded with the first bulk fetch check
+        except OSError:
+            return False
+
+        return True
+
+    def __init__(self, connectionString, kwArgs):
+        self.hEnv = ODBC.SQLHANDLE()
+        self.hDbc = ODBC.SQLHANDLE()
+        self.connected = False
+
+        check(ODBC.SQLAllocHandle(ODBC.SQL_HANDLE_ENV, ODBC.SQL_NULL_HANDLE, byref(self.hEnv)), ODBC.SQL_HANDLE_ENV, None, 'allocating environment handle')
+
+        try:
+            check(ODBC.SQLSetEnvAttr(self.hEnv, ODBC.SQL_ATTR_ODBC_VERSION, cast(ODBC.SQL_OV_ODBC3, ODBC.SQLPOINTER), 0), ODBC.SQL_HANDLE_ENV, self.hEnv,
+                    'setting ODBC version')
+            check(ODBC.SQLAllocHandle(ODBC.SQL_HANDLE_DBC, self.hEnv, byref(self.hDbc)), ODBC.SQL_HANDLE_ENV, self.hEnv, 'allocating connection handle')
+
+            # Credentials in braces, so they may contain ';'
+            for key, val in kwArgs.items():
+                connectionString += ';' + key + '={' + val.replace('}', '}}') + '}'
+
+            check(ODBC.SQLDriverConnect(self.hDbc, None, ODBC.wideString(connectionString), ODBC.SQL_NTS, None, 0, None, ODBC.SQL_DRIVER_NOPROMPT),
+                    ODBC.SQL_HANDLE_DBC, self.hDbc, 'connecting')
+            self.connected = True
+
+            check(ODBC.SQLSetConnectAttr(self.hDbc, ODBC.SQL_ATTR_AUTOCOMMIT, cast(ODBC.SQL_AUTOCOMMIT_ON, ODBC.SQLPOINTER), 0), ODBC.SQL_HANDLE_DBC, self.hDbc,
+                    'setting autocommit')
+        except:
+            self.close()
+            raise
+
+    def execute(self, queryStr):
+        return BulkStatement(self, queryStr)
+
+    def close(self):
+        if self.connected:
+            ODBC.SQLDisconnect(self.hDbc)
+            self.connected = False
+
+        if self.hDbc:
+            ODBC.SQLFreeHandle(ODBC.SQL_HANDLE_DBC, self.hDbc)
+            self.hDbc = ODBC.SQLHANDLE()
+
+        if self.hEnv:
+            ODBC.SQLFreeHandle(ODBC.SQL_HANDLE_ENV, self.hEnv)
+            self.hEnv = ODBC.SQLHANDLE()
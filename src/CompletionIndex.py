@@ -0,0 +1,190 @@
+import re, bisect
+from operator import itemgetter
+
+from src.SQLScript import SQLLexer
+
+PLAIN_NAME = re.compile(r'[A-Za-z_][\w@#$]*$')
+TABLE_KEYWORDS = { 'from', 'join', 'update', 'into' }
+ALIAS_STOPWORDS = {
+    'where', 'on', 'using', 'join', 'inner', 'left', 'right', 'full', 'outer', 'cross', 'natural', 'group', 'order',
+    'having', 'union', 'intersect', 'except', 'minus', 'limit', 'set', 'values', 'select', 'with', 'window' }
+
+def unquoteName(text):
+    return text[1 : -1] if text[ : 1] in '"[`' and len(text) > 1 else text
+
+def quoteName(name, dialect):
+    if PLAIN_NAME.match(name):
+        return name
+
+    if dialect.backtickQuotes and not dialect.bracketQuotes:
+        return '`' + name.replace('`', '``') + '`'
+
+    if dialect.batchSeparator:
+        return '[' + name.replace(']', ']]') + ']'
+
+    return '"' + name.replace('"', '""') + '"'
+
+def referencedTables(statementText, dialect):
+    # [ name parts, alias ] of the tables after FROM, JOIN, UPDATE and INTO in the statement, and after the commas
+    # of a FROM list
+    lexer = SQLLexer(dialect)
+    state = SQLLexer.STATE_NORMAL
+    words = [ ]                             # [ token type, text ] without comments
+
+    for line in statementText.split('\n'):
+        tokens, state = lexer.lexLine(line, state)
+        words.extend([ tokenType, line[start : end] ] for tokenType, start, end in tokens if tokenType != SQLLexer.TOKEN_COMMENT)
+
+    references = [ ]
+    pos = 0
+    inFromList = False
+
+    while pos < len(words):
+        tokenType, text = words[pos]
+        pos += 1
+
+        if tokenType == SQLLexer.TOKEN_WORD and text.lower() in TABLE_KEYWORDS:
+            inFromList = text.lower() in ('from', 'join')
+        elif not (inFromList and text == ','):
+            if tokenType == SQLLexer.TOKEN_WORD and text.lower() in ALIAS_STOPWORDS:
+                inFromList = False
+
+            continue
+
+        parts = [ ]
+
+        while pos < len(words) and words[pos][0] in (SQLLexer.TOKEN_WORD, SQLLexer.TOKEN_IDENTIFIER):
+            parts.append(unquoteName(words[pos][1]))
+            pos += 1
+
+            if pos < len(words) and words[pos][1] == '.':
+                pos += 1
+            else:
+                break
+
+        if not parts:
+            continue
+
+        alias = None
+
+        if pos < len(words) and words[pos][0] == SQLLexer.TOKEN_WORD and words[pos][1].lower() == 'as':
+            pos += 1
+
+        if pos < len(words) and words[pos][0] in (SQLLexer.TOKEN_WORD, SQLLexer.TOKEN_IDENTIFIER) and not words[pos][1].lower() in ALIAS_STOPWORDS | TABLE_KEYWORDS:
+            alias = unquoteName(words[pos][1])
+            pos += 1
+
+        references.append([ parts, alias ])
+
+    return references
+
+class CompletionIndex:
+    # Prefix index over the catalog, schema, table and procedure names of a data source, built by the metadata worker.
+    # Entries are kept in arrays sorted by lower case name, one by the plain names, one by the names qualified with
+    # their schema or catalog and one by those qualified with both, so a lookup is two bisections whatever the number
+    # of objects. An index is not changed once built, the worker sends a new one when the names change
+    KIND_CATALOG = 0
+    KIND_SCHEMA = 1
+    KIND_TABLE = 2
+    KIND_PROCEDURE = 3
+
+    MAX_MATCHES = 500                       # entries returned by one lookup
+
+    def __init__(self, schemas = [ ], objectEntries = [ ]):
+        # schemas as [ catalog, schema ] pairs, objectEntries as lists of ( kind, catalog, schema, name ) entries
+        names, qualifiedNames = CompletionIndex.indexNames(schemas, objectEntries)
+        self.keys, self.entries = CompletionIndex.sortedArrays(names)
+        self.qualifiedArrays = [ CompletionIndex.sortedArrays(qualified) for qualified in qualifiedNames ]
+
+    @staticmethod
+    def indexNames(schemas, objectEntries):
+        # ( lower case key, entry ) pairs of the plain names and of the names by one and by two qualifiers
+        names = [ ]
+        qualifiedNames = [ [ ], [ ] ]
+        catalogs = set()
+
+        for catalog, schema in schemas:
+            entry = (CompletionIndex.KIND_SCHEMA, catalog, schema, schema)
+            names.append((schema.lower(), entry))
+
+            if catalog:
+                catalogs.add(catalog)
+                qualifiedNames[0].append(((catalog + '.' + schema).lower(), entry))
+
+        for catalog in catalogs:
+            names.append((catalog.lower(), (CompletionIndex.KIND_CATALOG, catalog, None, catalog)))
+
+        for entries in objectEntries:
+            for entry in entries:
+                names.append((entry[3].lower(), entry))
+
+                if entry[2]:
+                    qualifiedNames[0].append(((entry[2] + '.' + entry[3]).lower(), entry))
+
+                    if entry[1]:
+                        qualifiedNames[1].append(((entry[1] + '.' + entry[2] + '.' + entry[3]).lower(), entry))
+                elif entry[1]:
+                    qualifiedNames[0].append(((entry[1] + '.' + entry[3]).lower(), entry))
+
+        return names, qualifiedNames
+
+    @staticmethod
+    def sortedArrays(names):
+        names.sort(key = itemgetter(0))
+
+        return [ key for key, entry in names ], [ entry for key, entry in names ]
+
+    @staticmethod
+    def mergedArrays(keys, entries, names, removedEntries):
+        # Sorted arrays with the entries in removedEntries left out and names merged in. The kept pairs and the new
+        # ones are two sorted runs, which the sort merges in one pass
+        merged = [ pair for pair in zip(keys, entries) if not pair[1] in removedEntries ] if removedEntries else list(zip(keys, entries))
+        names.sort(key = itemgetter(0))
+        merged.extend(names)
+
+        return CompletionIndex.sortedArrays(merged)
+
+    def replacedObjects(self, oldEntries, newEntries):
+        # New index with the object entries oldEntries replaced by newEntries, for schemas listed after the index was
+        # built
+        names, qualifiedNames = CompletionIndex.indexNames([ ], [ newEntries ])
+        removedEntries = set(oldEntries)
+        index = CompletionIndex()
+        index.keys, index.entries = CompletionIndex.mergedArrays(self.keys, self.entries, names, removedEntries)
+        index.qualifiedArrays = [ CompletionIndex.mergedArrays(keys, entries, qualified, removedEntries)
+                for [ keys, entries ], qualified in zip(self.qualifiedArrays, qualifiedNames) ]
+
+        return index
+
+    def __len__(self):
+        return len(self.keys)
+
+    @staticmethod
+    def objectEntries(tables, procedures):
+        # Entries of the table and procedure rows of a metadata worker listing
+        entries = [ (CompletionIndex.KIND_TABLE, row[0], row[1], row[2]) for row in tables ]
+        entries.extend((CompletionIndex.KIND_PROCEDURE, row[0], row[1], row[2].split(';')[0]) for row in procedures)     # SQL Server 'name;1'
+
+        return entries
+
+    def lookup(self, prefix, qualifiers = None):
+        # Entries whose name starts with prefix, in the schema or catalog qualifiers ([ schema ] or [ catalog, schema ])
+        if qualifiers:
+            qualifiers = qualifiers[-2 : ]
+            keys, entries = self.qualifiedArrays[len(qualifiers) - 1]
+            prefix = '.'.join(qualifiers) + '.' + prefix
+        else:
+            keys, entries = self.keys, self.entries
+
+        prefix = prefix.lower()
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + '\U0010ffff', start, min(len(keys), start + CompletionIndex.MAX_MATCHES))
+
+        return entries[start : end]
+
+    def tables(self, parts):
+        # Table entries named by [ ..., schema, table ] name parts
+        entries = self.lookup(parts[-1], parts[ : -1])
+        name = parts[-1].lower()
+
+        return [ entry for entry in entries if entry[0] == CompletionIndex.KIND_TABLE and entry[3].lower() == name ]
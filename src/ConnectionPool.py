@@ -0,0 +1,195 @@
+import threading, time, hashlib
+import pyodbc
+
+class ConnectionPoolError(Exception):
+    pass
+
+class PooledConnection:
+    # A connection checked out of a ConnectionPool, returned with release() or at the end of a with block
+    def __init__(self, pool, connection):
+        self.pool = pool
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, excType, excValue, traceback):
+        self.release()
+
+    def release(self):
+        if self.connection is not None:
+            connection = self.connection
+            self.connection = None
+            self.pool.checkin(connection)
+
+    def discard(self):
+        # For a connection known to be broken, closes it instead of returning it to the pool
+        if self.connection is not None:
+            connection = self.connection
+            self.connection = None
+            self.pool.discard(connection)
+
+class ConnectionPool:
+    MIN_SIZE = 1                            # idle connections kept open after the idle timeout
+    MAX_SIZE = 8                            # open connections (idle and checked out) per pool
+    IDLE_TIMEOUT = 300                      # seconds before an idle connection above MIN_SIZE is closed
+    HEALTH_CHECK_AGE = 30                   # connections idle for longer are checked before checkout
+    CHECKOUT_TIMEOUT = 60
+
+    PING_STATEMENTS = { 'Oracle': 'SELECT 1 FROM DUAL', 'DB2': 'VALUES 1', 'Mimer SQL': 'VALUES 1', 'ACCESS': None, 'EXCEL': None, 'DBASE': None, 'TEXT': None }
+
+    pools = { }
+    poolsLock = threading.Lock()
+
+    @classmethod
+    def forConnection(cls, connectionString, kwArgs):
+        # One pool per connection string and credentials, the password only enters the key as a digest
+        credentials = [ [ key, hashlib.sha256(val.encode()).hexdigest() if key == 'PWD' else val ] for key, val in sorted(kwArgs.items()) ]
+        poolKey = connectionString + repr(credentials)
+
+        with cls.poolsLock:
+            if not poolKey in cls.pools:
+                cls.pools[poolKey] = ConnectionPool(connectionString, kwArgs)
+
+            return cls.pools[poolKey]
+
+    @classmethod
+    def evictIdleConnections(cls):
+        with cls.poolsLock:
+            pools = list(cls.pools.values())
+
+        for pool in pools:
+            pool.evictIdle()
+
+    @classmethod
+    def closeAll(cls):
+        with cls.poolsLock:
+            pools = list(cls.pools.values())
+            cls.pools.clear()
+
+        for pool in pools:
+            pool.close()
+
+    def __init__(self, connectionString, kwArgs, minSize = MIN_SIZE, maxSize = MAX_SIZE, idleTimeout = IDLE_TIMEOUT):
+        self.connectionString = connectionString
+        self.kwArgs = kwArgs
+        self.minSize = minSize
+        self.maxSize = maxSize
+        self.idleTimeout = idleTimeout
+        self.idle = [ ]                     # [ connection, time returned to the pool ], most recently used last
+        self.openCount = 0
+        self.pingStatement = 'SELECT 1'
+        self.condition = threading.Condition()
+
+    def connect(self):
+        connection = pyodbc.connect(self.connectionString, autocommit = True, **self.kwArgs)
+        dbmsName = connection.getinfo(pyodbc.SQL_DBMS_NAME)
+        self.pingStatement = ConnectionPool.PING_STATEMENTS.get(dbmsName, 'SELECT 1')
+
+        return connection
+
+    def isHealthy(self, connection):
+        if connection.closed:
+            return False
+
+        if not self.pingStatement:
+            return True                     # file based data sources, nothing to lose
+
+        try:
+            connection.cursor().execute(self.pingStatement).close()
+        except pyodbc.Error:
+            return False
+
+        return True
+
+    def closeConnection(self, connection):
+        try:
+            connection.close()
+        except pyodbc.Error as ex:
+            print('Error closing pooled connection: ' + str(ex))
+
+    def checkout(self, timeout = CHECKOUT_TIMEOUT):
+        # Returns a PooledConnection, opening a new connection if none is idle and the pool is not full
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self.condition:
+                while not self.idle and self.openCount >= self.maxSize:
+                    remaining = deadline - time.monotonic()
+
+                    if remaining <= 0 or not self.condition.wait(remaining):
+                        raise ConnectionPoolError('All {} connections to the data source are in use'.format(self.maxSize))
+
+                if self.idle:
+                    connection, returnTime = self.idle.pop()
+                else:
+                    connection, returnTime = None, None
+                    self.openCount += 1
+
+            if connection is None:
+                try:
+                    connection = self.connect()
+                except:
+                    with self.condition:
+                        self.openCount -= 1
+                        self.condition.notify()
+
+                    raise
+
+                return PooledConnection(self, connection)
+
+            if time.monotonic() - returnTime < ConnectionPool.HEALTH_CHECK_AGE or self.isHealthy(connection):
+                return PooledConnection(self, connection)
+
+            self.discard(connection)        # broken connection, try the next one
+
+    def checkin(self, connection):
+        try:
+            if not connection.closed and not connection.autocommit:
+                connection.rollback()
+                connection.autocommit = True
+
+            if not connection.closed:
+                connection.timeout = 0
+        except pyodbc.Error:
+            self.discard(connection)
+            return
+
+        if connection.closed:
+            self.discard(connection)
+            return
+
+        with self.condition:
+            self.idle.append([ connection, time.monotonic() ])
+            self.condition.notify()
+
+        self.evictIdle()
+
+    def discard(self, connection):
+        self.closeConnection(connection)
+
+        with self.condition:
+            self.openCount -= 1
+            self.condition.notify()
+
+    def evictIdle(self):
+        now = time.monotonic()
+        evicted = [ ]
+
+        with self.condition:
+            # oldest idle connections first
+            while len(self.idle) > self.minSize and now - self.idle[0][1] > self.idleTimeout:
+                evicted.append(self.idle.pop(0)[0])
+                self.openCount -= 1
+
+        for connection in evicted:
+            self.closeConnection(connection)
+
+    def close(self):
+        with self.condition:
+            connections = [ connection for connection, returnTime in self.idle ]
+            self.openCount -= len(connections)
+            self.idle = [ ]
+
+        for connection in connections:
+            self.closeConnection(connection)
@@ -0,0 +1,244 @@
+import csv, json, time, datetime, decimal
+import pyodbc
+
+from PySide6.QtCore import (
+        QObject,
+        Signal,
+        Slot)
+
+from src.ConnectionPool import ConnectionPoolError
+
+IMPORT_FORMATS = [ [ 'CSV', '*.csv' ], [ 'Tab separated', '*.tsv *.tab *.txt' ], [ 'JSON Lines', '*.jsonl *.ndjson' ] ]
+
+def readCsvFile(file, delimiter):
+    # Yields the header row, then the data rows as lists of strings, blank lines (like a newline after the last row) give none
+    return (record for record in csv.reader(file, delimiter = delimiter) if record)
+
+def readJsonLinesFile(file):
+    columnNames = None
+
+    for lineNumber, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+
+        record = json.loads(line)
+
+        if not isinstance(record, dict):
+            raise ValueError('Line {}: JSON object expected'.format(lineNumber))
+
+        if columnNames is None:
+            columnNames = list(record.keys())
+            yield columnNames
+
+        yield [ record.get(name) for name in columnNames ]
+
+def parseBool(value):
+    if value.strip().lower() in [ '1', 'true', 't', 'yes', 'y', 'on' ]:
+        return True
+
+    if value.strip().lower() in [ '0', 'false', 'f', 'no', 'n', 'off' ]:
+        return False
+
+    raise ValueError('Not a boolean value: ' + value)
+
+def parseBinary(value):
+    return bytes.fromhex(value[2:] if value[:2].lower() == '0x' else value)
+
+# Conversion of file text to the Python type pyodbc binds for the column SQL type (SQLColumns() DATA_TYPE)
+TEXT_CONVERTERS = {
+    -7: parseBool,                                                          # SQL_BIT
+    -6: int, 5: int, 4: int, -5: int,                                       # SQL_TINYINT, SQL_SMALLINT, SQL_INTEGER, SQL_BIGINT
+    6: float, 7: float, 8: float,                                           # SQL_FLOAT, SQL_REAL, SQL_DOUBLE
+    2: decimal.Decimal, 3: decimal.Decimal,                                 # SQL_NUMERIC, SQL_DECIMAL
+    9: datetime.date.fromisoformat, 91: datetime.date.fromisoformat,        # SQL_DATE, SQL_TYPE_DATE
+    10: datetime.time.fromisoformat, 92: datetime.time.fromisoformat,       # SQL_TIME, SQL_TYPE_TIME
+    11: datetime.datetime.fromisoformat, 93: datetime.datetime.fromisoformat,   # SQL_TIMESTAMP, SQL_TYPE_TIMESTAMP
+    -2: parseBinary, -3: parseBinary, -4: parseBinary                       # SQL_BINARY, SQL_VARBINARY, SQL_LONGVARBINARY
+}
+
+TEXT_TYPES = [ 1, 12, -1, -8, -9, -10, -11 ]   # SQL_CHAR, SQL_VARCHAR, SQL_LONGVARCHAR, SQL_WCHAR, SQL_WVARCHAR, SQL_WLONGVARCHAR, SQL_GUID
+
+def valueConverter(dataType):
+    # An empty field is NULL, except for character columns where CSV can not tell it from an empty string
+    convert = TEXT_CONVERTERS.get(dataType)
+    emptyIsNull = dataType not in TEXT_TYPES
+
+    def convertValue(value):
+        if isinstance(value, str):
+            if not value and emptyIsNull:
+                return None
+
+            if convert:
+                return convert(value)
+
+            return value
+
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii = False)                  # nested JSON kept as text
+
+        return value
+
+    return convertValue
+
+class ImportWorker(QObject):
+    # Streams a CSV or JSON Lines file into a table on its own pooled connection, with batched parameter arrays
+    BATCH_SIZE = 5000                       # rows per executemany() call
+    COMMIT_INTERVAL = 50000                 # rows per transaction, 0 to commit once at the end
+    PROGRESS_INTERVAL = 0.25
+
+    importRequested = Signal()
+    importProgress = Signal(int, float)     # rows inserted, elapsed seconds
+    importFinished = Signal(int, float, bool)           # rows committed, elapsed seconds, cancelled
+    importFailed = Signal(int, str)         # rows committed before the error, error message
+
+    def __init__(self, connectionPool, fileName, tableName, commitInterval = COMMIT_INTERVAL):
+        super().__init__()
+
+        self.connectionPool = connectionPool
+        self.fileName = fileName
+        self.tableName = tableName
+        self.commitInterval = commitInterval
+        self.cursor = None
+        self.cancelled = False
+
+        self.importRequested.connect(self.runImport)
+
+    def splitTableName(self):
+        # [ catalog ., ] [ schema . ] table, names are matched as stored by the data source
+        names = [ name.strip().strip('"[]`') for name in self.tableName.split('.') ]
+
+        return [ None ] * (3 - len(names)) + names[-3 : ]
+
+    def tableColumns(self, connection, catalog, schema, table):
+        # Names as given, then in upper and lower case. Table and schema names are patterns, '_' matches any character,
+        # and without a schema the tables of that name in every schema are listed
+        for tableName, schemaName in [ [ table, schema ], [ table.upper(), schema and schema.upper() ], [ table.lower(), schema and schema.lower() ] ]:
+            tables = { }                    # (catalog, schema, table): column rows
+
+            for row in connection.cursor().columns(table = tableName, catalog = catalog, schema = schemaName):
+                if row[2] == tableName and (schemaName is None or row[1] == schemaName):
+                    tables.setdefault((row[0], row[1], row[2]), [ ]).append(row)
+
+            if len(tables) > 1:
+                raise pyodbc.ProgrammingError('Table {} is found in more than one schema ({}), qualify it with its schema name'.format(self.tableName,
+                        ', '.join('.'.join(name for name in key if name) for key in tables)))
+
+            if tables:
+                return list(tables.values())[0]
+
+        raise pyodbc.ProgrammingError('Table {} not found'.format(self.tableName))
+
+    def insertStatement(self, connection, tableColumns, fileColumns):
+        # Matches the file columns to the table columns, returns the INSERT statement and a converter for each file column
+        columnsByName = { row[3].lower(): row for row in tableColumns }
+        missing = [ name for name in fileColumns if name.lower() not in columnsByName ]
+
+        if missing:
+            raise pyodbc.ProgrammingError('Columns not found in table {}: {}'.format(self.tableName, ', '.join(missing)))
+
+        quote = (connection.getinfo(pyodbc.SQL_IDENTIFIER_QUOTE_CHAR) or '').strip()
+        quoteName = lambda name: quote + name.replace(quote, quote + quote) + quote if quote else name
+        row = tableColumns[0]
+        qualifiedName = '.'.join(quoteName(name) for name in [ row[0], row[1], row[2] ] if name)
+        columns = [ columnsByName[name.lower()] for name in fileColumns ]
+
+        statement = 'INSERT INTO {} ({}) VALUES ({})'.format(qualifiedName, ', '.join(quoteName(column[3]) for column in columns), ', '.join('?' for column in columns))
+
+        return statement, [ valueConverter(column[4]) for column in columns ]
+
+    @Slot()
+    def runImport(self):
+        start = time.perf_counter()
+        lastProgress = start
+        insertedCount = 0
+        committedCount = 0
+        recordNumber = 0
+
+        try:
+            fileName = self.fileName.lower()
+
+            with self.connectionPool.checkout() as connection, open(self.fileName, 'r', newline = '', encoding = 'utf-8-sig') as file:
+                if fileName.endswith('.jsonl') or fileName.endswith('.ndjson'):
+                    records = readJsonLinesFile(file)
+                else:
+                    records = readCsvFile(file, '\t' if fileName.endswith('.tsv') or fileName.endswith('.tab') or fileName.endswith('.txt') else ',')
+
+                fileColumns = next(records, None)
+
+                if not fileColumns:
+                    raise ValueError('No columns in ' + self.fileName)
+
+                catalog, schema, table = self.splitTableName()
+                statement, converters = self.insertStatement(connection, self.tableColumns(connection, catalog, schema, table), fileColumns)
+
+                connection.autocommit = False       # the pool restores autocommit when the connection is returned
+                self.cursor = connection.cursor()
+                self.cursor.fast_executemany = True # parameter arrays (SQL_ATTR_PARAMSET_SIZE) instead of one round trip per row
+
+                try:
+                    batch = [ ]
+
+                    for record in records:
+                        recordNumber += 1
+
+                        if len(record) != len(converters):
+                            raise ValueError('Record {}: {} values for {} columns'.format(recordNumber, len(record), len(converters)))
+
+                        try:
+                            batch.append([ convert(value) for convert, value in zip(converters, record) ])
+                        except (ValueError, decimal.InvalidOperation) as ex:
+                            raise ValueError('Record {}: {}'.format(recordNumber, ex))
+
+                        if len(batch) >= ImportWorker.BATCH_SIZE:
+                            self.cursor.executemany(statement, batch)
+                            insertedCount += len(batch)
+                            batch = [ ]
+
+                            if self.commitInterval and insertedCount - committedCount >= self.commitInterval:
+                                connection.commit()
+                                committedCount = insertedCount
+
+                            now = time.perf_counter()
+
+                            if now - lastProgress >= ImportWorker.PROGRESS_INTERVAL:
+                                lastProgress = now
+                                self.importProgress.emit(insertedCount, now - start)
+
+                            if self.cancelled:
+                                break
+
+                    if batch and not self.cancelled:
+                        self.cursor.executemany(statement, batch)
+                        insertedCount += len(batch)
+
+                    if self.cancelled:
+                        connection.rollback()
+                    else:
+                        connection.commit()
+                        committedCount = insertedCount
+                except:
+                    connection.rollback()
+                    raise
+                finally:
+                    self.cursor = None
+        except (pyodbc.Error, ConnectionPoolError, OSError, csv.Error, ValueError, TypeError, decimal.InvalidOperation) as ex:
+            # ValueError covers malformed JSON, numbers and dates
+            if self.cancelled:
+                self.importFinished.emit(committedCount, time.perf_counter() - start, True)
+            else:
+                self.importFailed.emit(committedCount, str(ex))
+
+            return
+
+        self.importFinished.emit(committedCount, time.perf_counter() - start, self.cancelled)
+
+    def cancel(self):
+        # Runs on the GUI thread
+        self.cancelled = True
+        cursor = self.cursor
+
+        if cursor:
+            try:
+                cursor.cancel()
+            except pyodbc.Error as ex:
+                print('Error cancelling import: ' + str(ex))
@@ -0,0 +1,159 @@
+import threading, time
+from ctypes import byref, cast
+import pyodbc
+
+from PySide6.QtCore import (
+        QObject,
+        Signal,
+        Slot)
+
+from src.ODBC import ODBC
+
+class DataSourceCatalogError(Exception):
+    pass
+
+def listChanges(oldEntries, newEntries):
+    # Changes from one { name: description } dict to the next, as [ index, name, description ] entries to insert
+    # in ascending index order after the removed names are taken out
+    removed = [ name for name in oldEntries if oldEntries[name] != newEntries.get(name) ]
+    keptOld = [ name for name in oldEntries if oldEntries[name] == newEntries.get(name) ]
+    keptNew = [ name for name in newEntries if oldEntries.get(name) == newEntries[name] ]
+
+    if keptOld != keptNew:
+        removed = list(oldEntries)          # the remaining names changed order, the list is rebuilt
+        keptNew = [ ]
+
+    kept = set(keptNew)
+    added = [ [ index, name, newEntries[name] ] for index, name in enumerate(newEntries) if name not in kept ]
+
+    return added, removed
+
+class DataSourceCatalog(QObject):
+    # Installed drivers and user and system data source names, the one source of the connection dialog lists.
+    # Each entry takes one SQLDriversW() / SQLDataSourcesW() call into buffers kept between refreshes. A truncated
+    # entry grows the buffers and restarts that enumeration
+    NAME_LENGTH = 256                       # initial buffer sizes, in characters
+    ATTRIBUTES_LENGTH = 4096                # driver attributes are a list of 'key=value' strings
+
+    refreshRequested = Signal()
+    driversChanged = Signal(object, object)             # [ index, name, description ] entries added, names removed
+    dataSourcesChanged = Signal(object, object)         # [ index, name, description ] entries added, names removed
+    refreshed = Signal(float)               # elapsed seconds
+
+    def __init__(self):
+        super().__init__()
+
+        self.lock = threading.Lock()        # refresh() runs on the catalog thread, or on the GUI thread after changes made there
+        self.drivers = { }                  # driver name: { attribute: value }
+        self.dataSources = { }              # data source name: [ driver name, 'User' or 'System' ]
+        self.nameBuffer = None
+        self.descriptionBuffer = None
+
+        self.refreshRequested.connect(self.refresh)
+
+    def driverName(self, dataSourceName):
+        entry = self.dataSources.get(dataSourceName)
+
+        return entry[0] if entry else None
+
+    def driverDescriptions(self, drivers):
+        return { name: '\n'.join(key + '=' + value for key, value in attributes.items()) for name, attributes in drivers.items() }
+
+    def dataSourceDescriptions(self, dataSources):
+        return { name: driver + (' (' + scope + ' DSN)' if scope else '') for name, [ driver, scope ] in dataSources.items() }
+
+    def enumerate(self, hEnv, function, firstDirection):
+        # Returns the [ name, description ] pairs of one SQLDriversW() or SQLDataSourcesW() enumeration
+        nameLength = ODBC.SQLSMALLINT()
+        descriptionLength = ODBC.SQLSMALLINT()
+
+        while True:
+            if self.nameBuffer is None:
+                self.nameBuffer = (ODBC.SQLWCHAR * DataSourceCatalog.NAME_LENGTH)()
+                self.descriptionBuffer = (ODBC.SQLWCHAR * DataSourceCatalog.ATTRIBUTES_LENGTH)()
+
+            nameBuffer, descriptionBuffer = self.nameBuffer, self.descriptionBuffer
+            entries = [ ]
+            truncated = False
+            sqlReturn = function(hEnv, firstDirection, nameBuffer, len(nameBuffer), byref(nameLength), descriptionBuffer, len(descriptionBuffer), byref(descriptionLength))
+
+            while sqlReturn == ODBC.SQL_SUCCESS or sqlReturn == ODBC.SQL_SUCCESS_WITH_INFO:
+                if nameLength.value >= len(nameBuffer) or descriptionLength.value >= len(descriptionBuffer):
+                    # SQLSTATE 01004, string data right truncated, the lengths are those of the full strings
+                    self.nameBuffer = (ODBC.SQLWCHAR * max(len(nameBuffer), nameLength.value + 1))()
+                    self.descriptionBuffer = (ODBC.SQLWCHAR * max(len(descriptionBuffer), descriptionLength.value + 1))()
+                    truncated = True
+                    break
+
+                entries.append([ ODBC.fromWideString(nameBuffer, nameLength.value), ODBC.fromWideString(descriptionBuffer, descriptionLength.value) ])
+                sqlReturn = function(hEnv, ODBC.SQL_FETCH_NEXT, nameBuffer, len(nameBuffer), byref(nameLength), descriptionBuffer, len(descriptionBuffer), byref(descriptionLength))
+
+            if truncated:
+                continue
+
+            if sqlReturn != ODBC.SQL_NO_DATA:
+                raise DataSourceCatalogError('Error {} enumerating {}'.format(sqlReturn, 'drivers' if function is ODBC.SQLDrivers else 'Data Source Names'))
+
+            return entries
+
+    def enumerateODBC(self):
+        ODBC.Init()
+
+        hEnv = ODBC.SQLHANDLE()
+        sqlReturn = ODBC.SQLAllocHandle(ODBC.SQL_HANDLE_ENV, ODBC.SQL_NULL_HANDLE, byref(hEnv))
+
+        if sqlReturn != ODBC.SQL_SUCCESS and sqlReturn != ODBC.SQL_SUCCESS_WITH_INFO:
+            raise DataSourceCatalogError('Error {} allocating ODBC environment handle'.format(sqlReturn))
+
+        try:
+            sqlReturn = ODBC.SQLSetEnvAttr(hEnv, ODBC.SQL_ATTR_ODBC_VERSION, cast(ODBC.SQL_OV_ODBC3_80, ODBC.SQLPOINTER), 0)
+
+            if sqlReturn != ODBC.SQL_SUCCESS and sqlReturn != ODBC.SQL_SUCCESS_WITH_INFO:
+                ODBC.SQLSetEnvAttr(hEnv, ODBC.SQL_ATTR_ODBC_VERSION, cast(ODBC.SQL_OV_ODBC3, ODBC.SQLPOINTER), 0)      # Driver Manager before ODBC 3.8
+
+            drivers = { }
+
+            for name, attributes in self.enumerate(hEnv, ODBC.SQLDrivers, ODBC.SQL_FETCH_FIRST):
+                drivers[name] = dict(attribute.split('=', 1) for attribute in attributes.split('\0') if '=' in attribute)
+
+            dataSources = { }
+
+            for scope, direction in [ [ 'User', ODBC.SQL_FETCH_FIRST_USER ], [ 'System', ODBC.SQL_FETCH_FIRST_SYSTEM ] ]:
+                for name, driver in self.enumerate(hEnv, ODBC.SQLDataSources, direction):
+                    dataSources.setdefault(name, [ driver, scope ])     # a user DSN hides the system DSN of the same name
+        finally:
+            ODBC.SQLFreeHandle(ODBC.SQL_HANDLE_ENV, hEnv)
+
+        return drivers, dataSources
+
+    def enumeratePyODBC(self):
+        # Without the Driver Manager library for ctypes, pyodbc still lists the names
+        return { name: { } for name in pyodbc.drivers() }, { name: [ driver, '' ] for name, driver in pyodbc.dataSources().items() }
+
+    @Slot()
+    def refresh(self):
+        start = time.perf_counter()
+
+        with self.lock:
+            try:
+                try:
+                    drivers, dataSources = self.enumerateODBC()
+                except OSError:
+                    drivers, dataSources = self.enumeratePyODBC()
+            except (DataSourceCatalogError, pyodbc.Error) as ex:
+                print('Error listing ODBC drivers and Data Source Names: ' + str(ex))
+                return
+
+            driverChanges = listChanges(self.driverDescriptions(self.drivers), self.driverDescriptions(drivers))
+            dataSourceChanges = listChanges(self.dataSourceDescriptions(self.dataSources), self.dataSourceDescriptions(dataSources))
+
+            self.drivers = drivers
+            self.dataSources = dataSources
+
+        if driverChanges[0] or driverChanges[1]:
+            self.driversChanged.emit(*driverChanges)
+
+        if dataSourceChanges[0] or dataSourceChanges[1]:
+            self.dataSourcesChanged.emit(*dataSourceChanges)
+
+        self.refreshed.emit(time.perf_counter() - start)
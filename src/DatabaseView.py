@@ -1,4 +1,4 @@
-import os, re
+import os, re, sqlite3, time, datetime
 from crc import Calculator, Crc64
 import pyodbc
 
@@ -7,31 +7,65 @@ from PySide6.QtCore import (
         QStringConverter,
         QObject,
         Signal,
+        Slot,
         QSettings,
+        QThread,
+        QTimer,
         QStandardPaths,
         QDir,
         QByteArray,
         QFileInfo,
         QFile,
-        QTextStream)
+        QTextStream,
+        QLocale,
+        QStringListModel)
 from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QTextOption
+from PySide6.QtGui import QTextOption, QTextCursor
 from PySide6.QtWidgets import (
         QWidget,
+        QVBoxLayout,
+        QLineEdit,
         QToolButton,
         QTreeWidget,
         QTreeWidgetItem,
         QTextEdit,
+        QPlainTextEdit,
         QTabBar,
         QTabWidget,
+        QTableView,
         QTableWidget,
         QTableWidgetItem,
+        QHeaderView,
         QAbstractItemView,
         QTextEdit,
+        QToolBar,
+        QLabel,
+        QSpinBox,
+        QFileDialog,
+        QInputDialog,
+        QProgressDialog,
+        QProgressBar,
+        QCompleter,
         QSplitter,
         QSplitterHandle,
         QMainWindow)
 
+from src.QueryResultModel import QueryResultModel
+from src.ResultStore import ResultStore
+from src.QueryWorker import QueryWorker
+from src.BulkFetch import BulkFetch
+from src.ResultExport import ExportWorker, EXPORT_FORMATS
+from src.DataImport import ImportWorker, IMPORT_FORMATS
+from src.MetadataWorker import MetadataWorker
+from src.MetadataCache import MetadataCache
+from src.QueryLog import QueryLog, QueryStatistics
+from src.ResultCache import ResultCache
+from src.SQLFileView import SQLFileView
+from src.ScriptAutosave import ScriptAutosave, readJournal
+from src.CompletionIndex import CompletionIndex, quoteName, referencedTables
+from src.SQLHighlighter import SQLHighlighter
+from src.SQLScript import SQLDialect, StatementIndex, bindParameters, normalizeQuery, parameterValue, splitStatements
+
 class DbViewMainWindow(QMainWindow):
     def __init__(self, parentObj):
         super().__init__()
@@ -41,18 +75,122 @@ class DbViewMainWindow(QMainWindow):
         self.parentObj.closeView.emit(self.parentObj)
         ev.accept()
 
-class SQLEditorWidget(QTextEdit):
+class SQLEditorWidget(QPlainTextEdit):
     executeStatement = None       # signal to execute current statement
     executeScript = None
 
+    COMPLETION_PREFIX = re.compile(r'((?:[\w@#$]+\.)*)([\w@#$]*)$')      # schema or alias qualifiers, name being typed
+
     def __init__(self, parent = None):
         super().__init__(parent)
         self.filename = ''
+        self.queryThread = None             # each editor tab runs its queries on its own thread and pooled connection
+        self.queryWorker = None
+        self.revision = 0                   # edits made, the autosave compares it with the revision saved
+        self.savedRevision = None
+        self.journalRecords = [ ]           # [ position, chars removed, text added ] edits not journaled yet
+        self.journalSize = 0                # characters journaled since the last save requested
+        self.completionSource = None        # function( editor, qualifiers, prefix ) returning the names to complete
+        self.setWordWrapMode(QTextOption.NoWrap)
+        self.highlighter = SQLHighlighter(self.document(), SQLDialect())
+        self.completer = QCompleter(QStringListModel(self), self)
+        self.completer.setWidget(self)
+        self.completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.completer.setModelSorting(QCompleter.CaseInsensitivelySortedModel)
+        self.completer.activated.connect(self.insertCompletion)
+        self.setSqlDialect(SQLDialect())
+        self.document().contentsChange.connect(self.updateStatementIndex)
+
+    def setSqlDialect(self, dialect):
+        self.sqlDialect = dialect
+        self.statementIndex = StatementIndex(dialect, self.lineText, self.document().blockCount())
+        # Scripts run as whole batches where 'GO' lines separate them, the statement under the cursor ends at a semicolon
+        self.batchIndex = StatementIndex(dialect, self.lineText, self.document().blockCount(), True) if dialect.batchSeparator else self.statementIndex
+        self.highlighter.setDialect(dialect)
+
+    def lineText(self, lineNumber):
+        return self.document().findBlockByNumber(lineNumber).text()
+
+    @Slot(int, int, int)
+    def updateStatementIndex(self, position, charsRemoved, charsAdded):
+        document = self.document()
+        lineDelta = document.blockCount() - self.statementIndex.lineCount
+        firstLine = document.findBlock(position).blockNumber()
+        newLastLine = document.findBlock(min(position + charsAdded, document.characterCount() - 1)).blockNumber()
+
+        self.statementIndex.update(firstLine, newLastLine - lineDelta, newLastLine)
+
+        if self.batchIndex is not self.statementIndex:
+            self.batchIndex.update(firstLine, newLastLine - lineDelta, newLastLine)
+
+    def currentStatement(self):
+        # Text of the statement under the cursor, or of the one before it
+        cursor = self.textCursor()
+        statement = self.statementIndex.statementAt(cursor.blockNumber(), cursor.positionInBlock())
+
+        return self.statementIndex.statementText(statement) if statement else ''
+
+    def statements(self):
+        document = self.document()
+
+        return self.batchIndex.statements(lambda lineNumber: document.findBlockByNumber(lineNumber).position())
+
+    def moveToStatement(self, statement):
+        if statement:
+            cursor = self.textCursor()
+            cursor.setPosition(self.document().findBlockByNumber(statement[0]).position() + statement[1])
+            self.setTextCursor(cursor)
+            self.ensureCursorVisible()
+
+    def selectedText(self):
+        # QTextCursor.selectedText() separates lines with U+2029 (paragraph separator)
+        return self.textCursor().selectedText().replace('\u2029', '\n')
+
+    def completionPrefix(self):
+        cursor = self.textCursor()
+        match = SQLEditorWidget.COMPLETION_PREFIX.search(cursor.block().text()[ : cursor.positionInBlock()])
+        qualifiers = match.group(1).rstrip('.')
+
+        return qualifiers.split('.') if qualifiers else [ ], match.group(2)
+
+    def showCompletions(self, explicit):
+        # Ctrl+Space lists the names for the word at the cursor, a '.' typed after a name those qualified by it
+        qualifiers, prefix = self.completionPrefix()
+        popup = self.completer.popup()
+        names = self.completionSource(self, qualifiers, prefix) if self.completionSource and (explicit or qualifiers or popup.isVisible()) else [ ]
+
+        if not names:
+            popup.hide()
+            return
+
+        self.completer.model().setStringList(sorted(names, key = str.lower))
+        self.completer.setCompletionPrefix(prefix)
+        popup.setCurrentIndex(self.completer.completionModel().index(0, 0))
+
+        rect = self.cursorRect()
+        rect.setWidth(popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width())
+        self.completer.complete(rect)
+
+    @Slot(str)
+    def insertCompletion(self, name):
+        cursor = self.textCursor()
+        cursor.movePosition(QTextCursor.Left, QTextCursor.KeepAnchor, len(self.completer.completionPrefix()))
+        cursor.insertText(quoteName(name, self.sqlDialect))
+        self.setTextCursor(cursor)
 
     def keyPressEvent(self, ev):
+        if self.completer.popup().isVisible() and ev.key() in (Qt.Key_Enter, Qt.Key_Return, Qt.Key_Escape, Qt.Key_Tab, Qt.Key_Backtab):
+            ev.ignore()                     # the completer takes these keys
+            return
+
+        if ev.key() == Qt.Key_Space and ev.modifiers() == Qt.ControlModifier:
+            self.showCompletions(True)
+            ev.accept()
+            return
+
         if ev.key() == Qt.Key_Enter or ev.key() == Qt.Key_Return:
             if ev.modifiers() == Qt.ControlModifier:
-                self.executeStatement.emit(self, self.textCursor().selectedText())
+                self.executeStatement.emit(self, self.selectedText() or self.currentStatement())
                 self.textCursor().setPosition(self.textCursor().selectionEnd())     # un-select query text
                 ev.accept()
             else:
@@ -60,20 +198,62 @@ class SQLEditorWidget(QTextEdit):
                     self.executeScript.emit(self, self.toPlainText())
                     ev.accept()
 
+        if (ev.key() == Qt.Key_Up or ev.key() == Qt.Key_Down) and ev.modifiers() == Qt.AltModifier:
+            cursor = self.textCursor()
+
+            if ev.key() == Qt.Key_Up:
+                self.moveToStatement(self.statementIndex.previousStatement(cursor.blockNumber(), cursor.positionInBlock()))
+            else:
+                self.moveToStatement(self.statementIndex.nextStatement(cursor.blockNumber(), cursor.positionInBlock()))
+
+            ev.accept()
+            return
+
         super().keyPressEvent(ev)
 
+        if ev.text() == '.' or (self.completer.popup().isVisible() and (ev.key() == Qt.Key_Backspace or re.match(r'[\w@#$]$', ev.text()))):
+            self.showCompletions(False)
+        elif ev.text():
+            self.completer.popup().hide()
+
 SQLEditorWidget.executeStatement = Signal(SQLEditorWidget, str)
 SQLEditorWidget.executeScript = Signal(SQLEditorWidget, str)
 
 class DatabaseView(QObject):
     MAIN_WINDOW_WIDTH = 700                 # Windows 10 system requirements include monitor resolution of 800x600
     MAIN_WINDOW_HEIGHT = 550                # Allow 50 pixels for Windows taskbar
+    AUTOSAVE_DELAY = 2000                   # milliseconds without edits before the modified tabs are saved
+    JOURNAL_DELAY = 250                     # milliseconds edits are kept before they are appended to the journal
+    AUTOSAVE_TEXT_SIZE = 1024 * 1024        # characters of a script from which on it is copied for saving only once its journal grew large
+    AUTOSAVE_JOURNAL_SIZE = 1024 * 1024     # characters journaled since the last save of a large script before it is saved again
+    STATUS_INTERVAL = 250                   # milliseconds between updates of the query status while a query runs
+    SESSION_CHECK_INTERVAL = 30000          # milliseconds between checks for editor tab sessions to return to the pool
+
+    PHASE_EXECUTING = 'executing'           # phases of the last query in the status bar
+    PHASE_SCRIPT = 'script'
+    PHASE_FETCHING = 'fetching'
+    PHASE_WAITING = 'waiting'               # more rows are fetched when the result is scrolled
+    PHASE_FINISHED = 'finished'
+    PHASE_FAILED = 'failed'
+    PHASE_CANCELLED = 'cancelled'
 
     closeView = None                        # Signal(DatabaseView)
-
-    def __init__(self, connection, dataSourceName, extraConnectionString):
+    schemasRequested = Signal()
+    objectsRequested = Signal(object, object)           # catalog, schema
+    columnsRequested = Signal(object, object, str)      # catalog, schema, table
+    journalRequested = Signal(str, str, object)         # script file, journal file, edit records
+    saveRequested = Signal(str, str, str, int)          # script file, journal file, text, revision
+    journalClosing = Signal()
+
+    def __init__(self, session, dataSourceName, extraConnectionString):
         super().__init__()
 
+        # The session checked out by newConnection() serves the schema tree, the editor tabs get their own connections from the pool
+        self.connectionPool = session.pool
+        self.metadataSession = session
+        self.resultCache = ResultCache.forPool(self.connectionPool)
+        connection = session.connection
+
         self.mainWindow = DbViewMainWindow(self)
         self.mainSplitter = QSplitter(Qt.Horizontal, self.mainWindow)
         self.resultSplitter = QSplitter(Qt.Vertical, self.mainSplitter)
@@ -86,13 +266,42 @@ class DatabaseView(QObject):
         self.sqlTab.setTabsClosable(True)
         self.sqlTab.setUsesScrollButtons(True)
         self.resultTab = QTabWidget(self.resultSplitter)
-        self.queryResult = QTableWidget(self.resultSplitter)
+        self.queryResult = QTableView(self.resultSplitter)
         self.queryResult.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.queryResult.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
         self.sqlOutput = QTextEdit(self.resultTab)
         self.sqlOutput.setReadOnly(True)
+        self.parameterTable = QTableWidget(0, 2, self.resultTab)           # values for the '?' and ':name' placeholders of the query
+        self.parameterTable.setHorizontalHeaderLabels([ self.mainWindow.tr('Parameter'), self.mainWindow.tr('Value') ])
+        self.parameterTable.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.parameterTable.verticalHeader().setVisible(False)
+        self.parameterTable.setToolTip(self.mainWindow.tr("NULL, a number, 'quoted text' or text"))
+        self.parameterTable.itemChanged.connect(lambda item: self.storeParameterValue(item))
 
         self.resultTab.addTab(self.sqlOutput, self.mainWindow.tr('Output', 'tab-title'))
         self.resultTab.addTab(self.queryResult, self.mainWindow.tr('Result', 'tab-title'))
+        self.historyPanel = QWidget(self.resultTab)                         # query log of the data source, with timings
+        self.historySearch = QLineEdit(self.historyPanel)
+        self.historySearch.setPlaceholderText(self.mainWindow.tr('Search query text'))
+        self.historySearch.setClearButtonEnabled(True)
+        self.historySearch.textChanged.connect(lambda text: self.refreshHistory())
+        self.historyTable = QTableWidget(0, len(QueryLog.COLUMNS), self.historyPanel)
+        self.historyTable.setHorizontalHeaderLabels([ self.mainWindow.tr('Started'), self.mainWindow.tr('Query'), self.mainWindow.tr('Status'),
+                self.mainWindow.tr('Execute s'), self.mainWindow.tr('First row s'), self.mainWindow.tr('Fetch s'), self.mainWindow.tr('Render s'),
+                self.mainWindow.tr('Rows'), self.mainWindow.tr('Bytes'), self.mainWindow.tr('Error') ])
+        self.historyTable.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.historyTable.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.historyTable.verticalHeader().setVisible(False)
+        self.historyTable.setSortingEnabled(True)
+        historyLayout = QVBoxLayout(self.historyPanel)
+        historyLayout.setContentsMargins(0, 0, 0, 0)
+        historyLayout.addWidget(self.historySearch)
+        historyLayout.addWidget(self.historyTable)
+
+        self.resultTab.addTab(self.parameterTable, self.mainWindow.tr('Parameters', 'tab-title'))
+        self.resultTab.addTab(self.historyPanel, self.mainWindow.tr('History', 'tab-title'))
+        self.resultTab.currentChanged.connect(lambda index: self.showResultTab())
+        self.resultSetViews = [ ]           # views of the result sets of a batch or procedure after the first, in the tabs after the Result tab
 
         self.resultSplitter.addWidget(self.sqlTab)
         self.resultSplitter.addWidget(self.resultTab)
@@ -106,10 +315,59 @@ class DatabaseView(QObject):
         self.mainSplitter.setStretchFactor(0, 1)
         self.mainSplitter.setStretchFactor(1, 2)
 
+        self.queryToolBar = QToolBar(self.mainWindow.tr('Query', 'toolbar-title'), self.mainWindow)
+        self.queryToolBar.setObjectName('queryToolBar')                     # needed by saveState() / restoreState()
+        self.cancelAction = self.queryToolBar.addAction(self.mainWindow.tr('Cancel', 'action'))
+        self.cancelAction.setToolTip(self.mainWindow.tr('Cancel the running query'))
+        self.cancelAction.setEnabled(False)
+        self.cancelAction.triggered.connect(lambda: self.cancelQuery())
+        self.nextResultAction = self.queryToolBar.addAction(self.mainWindow.tr('Next result', 'action'))
+        self.nextResultAction.setToolTip(self.mainWindow.tr('Skip the rows of the current result set not fetched yet and open the next result set '
+                'of the batch or procedure'))
+        self.nextResultAction.setEnabled(False)
+        self.nextResultAction.triggered.connect(lambda: self.skipResultSet())
+        self.stopOnErrorAction = self.queryToolBar.addAction(self.mainWindow.tr('Stop on error', 'action'))
+        self.stopOnErrorAction.setToolTip(self.mainWindow.tr('Stop running a script (Ctrl+Alt+Enter) at the first failed statement'))
+        self.stopOnErrorAction.setCheckable(True)
+        self.stopOnErrorAction.setChecked(True)
+        self.bulkFetchAction = self.queryToolBar.addAction(self.mainWindow.tr('Bulk fetch', 'action'))
+        self.bulkFetchAction.setToolTip(self.mainWindow.tr('Fetch query results in blocks of rows into column arrays, on a separate connection'))
+        self.bulkFetchAction.setCheckable(True)
+        self.bulkFetchAction.setEnabled(BulkFetch.available())
+        self.cacheResultsAction = self.queryToolBar.addAction(self.mainWindow.tr('Cache results', 'action'))
+        self.cacheResultsAction.setToolTip(self.mainWindow.tr('Show the complete result of a repeated read-only query from the cache, '
+                'until it expires or a statement that may change data runs'))
+        self.cacheResultsAction.setCheckable(True)
+        self.queryToolBar.addSeparator()
+        self.exportAction = self.queryToolBar.addAction(self.mainWindow.tr('Export results ...', 'action'))
+        self.exportAction.setToolTip(self.mainWindow.tr('Run the last query again and save all of its rows to a file'))
+        self.exportAction.setEnabled(False)
+        self.exportAction.triggered.connect(lambda: self.exportResults())
+        self.importAction = self.queryToolBar.addAction(self.mainWindow.tr('Import data ...', 'action'))
+        self.importAction.setToolTip(self.mainWindow.tr('Insert the rows of a CSV or JSON Lines file into a table'))
+        self.importAction.triggered.connect(lambda: self.importData())
+        self.queryToolBar.addSeparator()
+        self.queryToolBar.addWidget(QLabel(self.mainWindow.tr('Timeout:'), self.queryToolBar))
+        self.queryTimeout = QSpinBox(self.queryToolBar)
+        self.queryTimeout.setRange(0, 24 * 3600)
+        self.queryTimeout.setSuffix(self.mainWindow.tr(' s', 'seconds'))
+        self.queryTimeout.setSpecialValueText(self.mainWindow.tr('None', 'timeout'))
+        self.queryToolBar.addWidget(self.queryTimeout)
+        self.mainWindow.addToolBar(self.queryToolBar)
+
+        self.queryStatus = QLabel(self.mainWindow)
+        self.queryProgress = QProgressBar(self.mainWindow)      # part of the result set fetched, when the driver tells its row count
+        self.queryProgress.setMaximumWidth(160)
+        self.queryProgress.hide()
+        self.mainWindow.statusBar().addWidget(self.queryStatus, 1)
+        self.mainWindow.statusBar().addPermanentWidget(self.queryProgress)
+
         readOnly = connection.getinfo(pyodbc.SQL_DATA_SOURCE_READ_ONLY)
 
         self.dbmsName = connection.getinfo(pyodbc.SQL_DBMS_NAME)
+        self.sqlDialect = SQLDialect(self.dbmsName)
         self.dbmsVersion = connection.getinfo(pyodbc.SQL_DBMS_VER)
+        self.userName = connection.getinfo(pyodbc.SQL_USER_NAME)
 
         versionMatch = re.match('^([0-9.]+)\\s+([^0-9]+)\\s+([0-9.]+)$', self.dbmsVersion)   # '11.00.0007 Mimer SQL 10.0.7'
 
@@ -138,12 +396,88 @@ class DatabaseView(QObject):
 
         self.extraConnectionString = extraConnectionString
         self.conn = connection
-        self.populateDatabaseObjects()
 
         self.loadSettings(dataSourceName, extraConnectionString)
+
+        self.queryId = 0
+        self.activeWorker = None            # worker of the editor tab that ran the last query
+        self.cursorResultSet = None         # result set the cursor of the last query is on, None once its results are closed
+        self.lastQueryStr = None            # read-only query of the last result, run again on another connection to export it
+        self.lastQueryParameters = None
+        self.exportCandidate = None         # [ query id, query text, parameter values ] of a running read-only query
+        self.parameterValues = { }          # parameter name: value text, kept for the next queries with the same names
+        self.pendingCacheEntry = None       # [ query id, cache key, cache generation ] of the running read-only query
+        self.queryStatistics = None         # QueryStatistics of the current query
+        self.queryLogId = None              # query log entry of the current query
+        self.queryLogPending = False        # rows fetched since the log entry was written
+        self.exportThread = None
+        self.exportWorker = None
+        self.importThread = None
+        self.importWorker = None
+        self.queryTimer = QTimer(self)
+        self.queryTimer.setSingleShot(True)
+        self.queryTimer.setTimerType(Qt.PreciseTimer)      # paused and resumed with the time left
+        self.queryTimer.timeout.connect(lambda: self.queryTimedOut())
+        self.queryTimeLeft = None           # milliseconds of the timeout left while waiting for the result to be scrolled
+        self.queryPhase = None
+        self.queryStartTime = 0.0
+        self.queryElapsed = 0.0
+        self.fetchMetrics = None            # FetchMetrics of the last batch of the current query
+        self.scriptStatement = None         # [ statement number, statement count ] of the running script
+        self.statusTimer = QTimer(self)
+        self.statusTimer.setInterval(DatabaseView.STATUS_INTERVAL)
+        self.statusTimer.timeout.connect(lambda: self.showQueryStatus())
+        self.sessionTimer = QTimer(self)
+        self.sessionTimer.setInterval(DatabaseView.SESSION_CHECK_INTERVAL)
+        self.sessionTimer.timeout.connect(lambda: self.releaseIdleSessions())
+        self.sessionTimer.start()
+        self.completionIndex = CompletionIndex()
+        self.completionColumns = { }        # (catalog, schema, table): column names, None while loading
+        self.completionWaiting = None       # [ editor, cursor position ] of a completion waiting for names to load
+
+        # Metadata requests have their own thread and connection, so the schema tree loads while queries run
+        self.metadataThread = QThread()
+        self.metadataWorker = MetadataWorker(connection, self.dbmsName, self.metadataCache)
+        self.metadataWorker.moveToThread(self.metadataThread)
+        self.schemasRequested.connect(self.metadataWorker.loadSchemas)
+        self.objectsRequested.connect(self.metadataWorker.loadObjects)
+        self.columnsRequested.connect(self.metadataWorker.loadColumns)
+        self.metadataWorker.schemasLoaded.connect(self.addSchemasToDbTree)
+        self.metadataWorker.objectsLoaded.connect(self.addObjectsToDbTree)
+        self.metadataWorker.columnsLoaded.connect(self.addColumnsToCompletion)
+        self.metadataWorker.completionIndexBuilt.connect(self.replaceCompletionIndex)
+        self.metadataWorker.metadataFailed.connect(self.sqlOutput.append)
+        self.dbTree.itemExpanded.connect(lambda item: self.loadDbTreeItem(item))
+        self.metadataThread.start()
+
+        # Modified tabs are saved in the background once editing pauses, with the edits journaled in between
+        self.autosaveThread = QThread()
+        self.autosaveWorker = ScriptAutosave()
+        self.autosaveWorker.moveToThread(self.autosaveThread)
+        self.journalRequested.connect(self.autosaveWorker.appendJournal)
+        self.saveRequested.connect(self.autosaveWorker.saveScript)
+        self.autosaveWorker.scriptSaved.connect(self.markScriptSaved)
+        self.autosaveWorker.autosaveFailed.connect(self.sqlOutput.append)
+        self.journalClosing.connect(self.autosaveWorker.closeJournals, Qt.BlockingQueuedConnection)     # after the journal requests queued before
+        self.autosaveThread.start()
+
+        self.journalTimer = QTimer(self)
+        self.journalTimer.setSingleShot(True)
+        self.journalTimer.setInterval(DatabaseView.JOURNAL_DELAY)
+        self.journalTimer.timeout.connect(self.flushJournal)
+        self.autosaveTimer = QTimer(self)
+        self.autosaveTimer.setSingleShot(True)
+        self.autosaveTimer.setInterval(DatabaseView.AUTOSAVE_DELAY)
+        self.autosaveTimer.timeout.connect(self.autosaveScripts)
+
+        self.populateDatabaseObjects()
         self.loadSqlScripts()
 
         self.closeView.connect(lambda dbView: dbView.saveSettings())
+        self.closeView.connect(lambda dbView: dbView.stopWorkers())
+        self.closeView.connect(lambda dbView: dbView.closeMetadataCache())
+        self.closeView.connect(lambda dbView: dbView.closeQueryLog())
+        self.closeView.connect(lambda dbView: dbView.closeSqlFiles())
 
         self.mainWindow.show()
 
@@ -163,6 +497,7 @@ class DatabaseView(QObject):
     WIDGET_TYPE_TABLE_CATEGORY = 3
     WIDGET_TYPE_TABLE = 4
     WIDGET_TYPE_PROC = 5
+    WIDGET_TYPE_PLACEHOLDER = 6
 
     def getTypeNode(self, containerEntry, typeName):
         if not typeName in containerEntry['typeNodes']:
@@ -196,11 +531,24 @@ class DatabaseView(QObject):
         schemaNode = self.getContainerNode(catalogNode, schema, DatabaseView.WIDGET_TYPE_SCHEMA, 'Schema')
         procNode = self.getContainerNode(schemaNode, 'Procedure', DatabaseView.WIDGET_TYPE_STATIC_LABEL)
 
-        if not [ catalog, schema, name ] in listContainer:
+        if not (catalog, schema, name) in listContainer:
             QTreeWidgetItem(procNode['item'], [ name ], DatabaseView.WIDGET_TYPE_PROC)
-            listContainer.append([ catalog, schema, name ])
+            listContainer.add((catalog, schema, name))
+
+    def addSchemaToDbTree(self, catalog, schema):
+        catalogNode = self.getContainerNode(self.containerNodes, catalog, DatabaseView.WIDGET_TYPE_CATALOG, 'Catalog')
+        schemaNode = self.getContainerNode(catalogNode, schema, DatabaseView.WIDGET_TYPE_SCHEMA, 'Schema')
+
+        # Tables and procedures are listed when the schema node is first expanded
+        schemaNode['objectsLoaded'] = False
+        schemaNode['item'].setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        schemaNode['item'].setData(0, Qt.UserRole, [ catalog, schema ])
+        self.schemaNodes[(catalog, schema)] = schemaNode
 
     def expandDbTree(self, containerEntry):
+        if containerEntry.get('objectsLoaded') is False:
+            return                      # do not trigger loading of schemas the user did not open
+
         itemList = [ containerEntry['item'] ]
 
         if containerEntry['typeNodes']:
@@ -225,62 +573,961 @@ class DatabaseView(QObject):
         for name in containerEntry['containers']:
             self.expandDbTree(containerEntry['containers'][name])
 
+    def clearDbTreeNode(self, containerEntry, catalog, schema):
+        containerEntry['item'].takeChildren()
+        containerEntry['containers'] = { }
+        containerEntry['typeNodes'] = { }
+
+        if schema is None:
+            self.procedureNames = set()
+        else:
+            self.procedureNames = { name for name in self.procedureNames if name[0] != catalog or name[1] != schema }
+
     def populateDatabaseObjects(self):
         self.containerNodes = { 'item': self.dbTree.invisibleRootItem(), 'containers': { }, 'typeNodes': { } }
+        self.schemaNodes = { }
+        self.procedureNames = set()
+        self.allObjectsLoaded = None
+
+        # Show the cached catalog right away, the metadata worker refreshes it in the background
+        cachedSchemas = self.metadataCache.schemas() if self.metadataCache else None
+
+        if cachedSchemas is not None:
+            self.addSchemasToDbTree(cachedSchemas, True)
+
+        self.schemasRequested.emit()
+
+    @Slot(object, bool)
+    def addSchemasToDbTree(self, schemas, changed):
+        if not changed and (self.schemaNodes or self.allObjectsLoaded is not None):
+            return
+
+        if not schemas:
+            if self.allObjectsLoaded is None:
+                if self.schemaNodes:
+                    self.schemaNodes = { }
+                    self.clearDbTreeNode(self.containerNodes, None, None)
+
+                self.allObjectsLoaded = False
+                cachedObjects = self.metadataCache.objects(None, None) if self.metadataCache else None
+
+                if cachedObjects:
+                    self.addObjectsToDbTree(None, None, cachedObjects[0], cachedObjects[1], True)
+
+                self.objectsRequested.emit(None, None)          # no schema support, list all objects at once
+
+            return
+
+        if self.allObjectsLoaded is not None:
+            self.allObjectsLoaded = None
+            self.clearDbTreeNode(self.containerNodes, None, None)
+
+        firstLoad = not self.schemaNodes
+
+        for [ catalog, schema ] in list(self.schemaNodes):
+            if not [ catalog, schema ] in schemas:
+                schemaItem = self.schemaNodes.pop((catalog, schema))['item']
+                (schemaItem.parent() or self.dbTree.invisibleRootItem()).removeChild(schemaItem)
+                del self.getContainerNode(self.containerNodes, catalog, DatabaseView.WIDGET_TYPE_CATALOG, 'Catalog')['containers'][schema]
+
+        for catalog, schema in schemas:
+            if not (catalog, schema) in self.schemaNodes:
+                self.addSchemaToDbTree(catalog, schema)
+
+        if firstLoad:
+            self.expandDbTree(self.containerNodes)
+
+            defaultSchemas = [ 'dbo', 'public', (self.userName or '').lower() ]
+
+            for [ catalog, schema ], schemaNode in self.schemaNodes.items():
+                if len(schemas) == 1 or schema.lower() in defaultSchemas:
+                    schemaNode['item'].setExpanded(True)
+
+    def loadDbTreeItem(self, item):
+        if item.type() == DatabaseView.WIDGET_TYPE_SCHEMA and item.data(0, Qt.UserRole):
+            catalog, schema = item.data(0, Qt.UserRole)
+            schemaNode = self.schemaNodes.get((catalog, schema))
+
+            if schemaNode and schemaNode['objectsLoaded'] is False:
+                cachedObjects = self.metadataCache.objects(catalog, schema) if self.metadataCache else None
 
-        for catalog, schema, name, typ, desc in self.conn.cursor().tables():
-            self.addTableToDbTree(catalog, schema, typ, name, desc)
+                if cachedObjects:
+                    self.addObjectsToDbTree(catalog, schema, cachedObjects[0], cachedObjects[1], True)
+                else:
+                    schemaNode['objectsLoaded'] = None              # loading
+                    schemaNode['placeholder'] = QTreeWidgetItem(item, [ self.mainWindow.tr('Loading ...', 'tree-item') ], DatabaseView.WIDGET_TYPE_PLACEHOLDER)
+
+                self.objectsRequested.emit(catalog, schema)
+
+    @Slot(object, object, object, object, bool)
+    def addObjectsToDbTree(self, catalog, schema, tables, procedures, changed):
+        schemaNode = self.schemaNodes.get((catalog, schema))
 
-        listContainer = [ ]
+        if schemaNode:
+            if schemaNode['objectsLoaded'] and not changed:
+                return                                          # the cached objects shown are still current
+
+            if schemaNode['objectsLoaded']:
+                self.clearDbTreeNode(schemaNode, catalog, schema)
+            else:
+                if 'placeholder' in schemaNode:
+                    schemaNode['item'].removeChild(schemaNode.pop('placeholder'))
+        else:
+            if schema is not None:
+                return                                          # schema removed from the tree in the meantime
 
-        if self.dbmsName != 'DBASE':
-            rows = self.conn.cursor().procedures()
+            if self.allObjectsLoaded and not changed:
+                return
 
-            for row in rows:
-                self.addProcToDbTree(row, listContainer)
+            if self.allObjectsLoaded:
+                self.clearDbTreeNode(self.containerNodes, None, None)
 
-        self.expandDbTree(self.containerNodes)
+        for catalogName, schemaName, name, typ, desc in tables:
+            if schemaNode:
+                catalogName, schemaName = catalog, schema       # keep objects under the node that was expanded
 
-    def runQuery(self, queryStr, isFullScript, conn, outputWidget, resultWidget):
+            self.addTableToDbTree(catalogName, schemaName, typ, name, desc)
+
+        for row in procedures:
+            if schemaNode:
+                row = (catalog, schema) + tuple(row[2:])
+
+            self.addProcToDbTree(row, self.procedureNames)
+
+        if schemaNode:
+            schemaNode['item'].setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+            schemaNode['objectsLoaded'] = True
+
+            self.expandDbTree(schemaNode)
+        else:
+            self.allObjectsLoaded = True
+            self.expandDbTree(self.containerNodes)
+
+    @Slot(object)
+    def replaceCompletionIndex(self, completionIndex):
+        self.completionIndex = completionIndex
+        self.refreshCompletions()
+
+    def refreshCompletions(self):
+        # Shows the names that were still loading when the completion was asked for, unless the cursor moved since
+        if self.completionWaiting:
+            sqlEditor, position = self.completionWaiting
+
+            if sqlEditor is self.sqlTab.currentWidget() and sqlEditor.textCursor().position() == position:
+                sqlEditor.showCompletions(True)
+
+    def tableColumns(self, catalog, schema, table):
+        # Columns are listed the first time a table is referenced, from the cache until the worker has them
+        key = (catalog, schema, table)
+
+        if not key in self.completionColumns:
+            cachedColumns = self.metadataCache.columns(catalog, schema, table) if self.metadataCache else None
+            self.completionColumns[key] = [ column[0] for column in cachedColumns ] if cachedColumns is not None else None
+            self.columnsRequested.emit(catalog, schema, table)
+
+        return self.completionColumns[key]
+
+    @Slot(object, object, str, object, bool)
+    def addColumnsToCompletion(self, catalog, schema, table, columns, changed):
+        self.completionColumns[(catalog, schema, table)] = [ column[0] for column in columns ]
+        self.refreshCompletions()
+
+    def completions(self, sqlEditor, qualifiers, prefix):
+        # Columns of the tables referenced by the statement at the cursor, then the indexed names
+        references = referencedTables(sqlEditor.currentStatement(), self.sqlDialect)
+        loading = False
+
+        if qualifiers:
+            aliased = [ parts for parts, alias in references if (alias or parts[-1]).lower() == qualifiers[-1].lower() ]
+            references = aliased or [ qualifiers ]
+            entries = self.completionIndex.lookup(prefix, qualifiers)
+
+            if not entries:
+                names = [ name.lower() for name in qualifiers ]
+
+                for (catalog, schema), schemaNode in self.schemaNodes.items():
+                    if names in ([ schema.lower() ], [ (catalog or '').lower(), schema.lower() ]) and schemaNode['objectsLoaded'] is not True:
+                        self.loadDbTreeItem(schemaNode['item'])     # objects of a schema not expanded yet
+                        loading = True
+        else:
+            references = [ parts for parts, alias in references ]
+            entries = self.completionIndex.lookup(prefix)
+
+        names = [ ]
+        prefix = prefix.lower()
+
+        for parts in references:
+            for entry in self.completionIndex.tables(parts)[ : 1]:
+                columns = self.tableColumns(entry[1], entry[2], entry[3])
+                loading = loading or columns is None
+                names.extend(name for name in columns or [ ] if name.lower().startswith(prefix))
+
+        names.extend(entry[3] for entry in entries)
+        self.completionWaiting = [ sqlEditor, sqlEditor.textCursor().position() ] if loading else None
+
+        return list(dict.fromkeys(names))
+
+    def startQueryWorker(self, sqlEditor):
+        sqlEditor.queryThread = QThread()
+        sqlEditor.queryWorker = QueryWorker(self.connectionPool)
+        sqlEditor.queryWorker.spillDirectory = self.appDataPath or None
+        sqlEditor.queryWorker.memoryBudget = self.resultMemoryLimit * 1024 * 1024
+        sqlEditor.queryWorker.moveToThread(sqlEditor.queryThread)
+        sqlEditor.queryWorker.resultReady.connect(self.showQueryResult)
+        sqlEditor.queryWorker.rowsReady.connect(self.appendQueryRows)
+        sqlEditor.queryWorker.batchFetched.connect(self.storeFetchMetrics)
+        sqlEditor.queryWorker.messagesReady.connect(self.showQueryMessages)
+        sqlEditor.queryWorker.rowCountReady.connect(self.showResultRowCount)
+        sqlEditor.queryWorker.resultSetSkipped.connect(self.markResultSetSkipped)
+        sqlEditor.queryWorker.resultsFinished.connect(self.finishResults)
+        sqlEditor.queryWorker.queryFinished.connect(self.finishQuery)
+        sqlEditor.queryWorker.queryFailed.connect(self.failQuery)
+        sqlEditor.queryWorker.statementCacheUsed.connect(self.showStatementCacheUse)
+        sqlEditor.queryWorker.statisticsReady.connect(self.updateQueryStatistics)
+        sqlEditor.queryWorker.statementStarted.connect(self.startScriptStatement)
+        sqlEditor.queryWorker.statementFinished.connect(self.finishScriptStatement)
+        sqlEditor.queryWorker.scriptFinished.connect(self.finishScript)
+        sqlEditor.queryThread.start()
+
+    def runQuery(self, sqlEditor, queryStr, isFullScript):
         print("Run query " + queryStr)
 
+        self.flushQueryLog()
+        parameters = None
+
         if not isFullScript:
-            cursor = conn.cursor()
-            cursor.execute(queryStr)
+            queryStr, parameterNames = bindParameters(queryStr, self.sqlDialect)
+
+            if parameterNames:
+                parameters = self.queryParameters(parameterNames)
+
+                if parameters is None:
+                    return
+
+        statements = None
 
-            if cursor.messages:
-                for [ msgType, msgLine ] in cursor.messages:
-                    outputWidget.append(msgType + ' ' + msgLine)
+        if isFullScript:
+            # Editor tabs keep the statements indexed as they are edited
+            statements = sqlEditor.statements() if isinstance(sqlEditor, SQLEditorWidget) else splitStatements(queryStr, self.sqlDialect)
 
-            if cursor.description:
-                resultWidget.setColumnCount(len(cursor.description))
-                resultWidget.setHorizontalHeaderLabels([ col[0] for col in cursor.description ])
+        cacheKey = self.resultCacheKey(queryStr, parameters, statements)
 
-                rowNumber = 0
-                columnRange = range(len(cursor.description))
+        cached = self.resultCache.lookup(cacheKey) if cacheKey and self.cacheResultsAction.isChecked() else None
 
-                for row in cursor:
-                    if rowNumber > 1000:
-                        self.resultTab.setTabText(1, self.mainWindow.tr('Result rows 1-1000', 'tab-title'))
-                        break
+        if cached:
+            self.showCachedResult(queryStr, parameters, *cached)
+            return
 
-                    if resultWidget.rowCount() <= rowNumber:
-                        resultWidget.insertRow(rowNumber)
+        if sqlEditor.queryWorker is None:
+            self.startQueryWorker(sqlEditor)
 
-                    for col in columnRange:
-                        resultWidget.setItem(rowNumber, col, QTableWidgetItem(str(row[col])))
+        self.queryId = self.queryId + 1
+        self.lastQueryStr = None
+        self.lastQueryParameters = None
+        self.exportAction.setEnabled(False)
 
-                    rowNumber = rowNumber + 1
+        # Export runs the query again on a pooled connection, only a query that reads and returns rows can be exported
+        self.exportCandidate = [ self.queryId, queryStr, parameters ] if not isFullScript and normalizeQuery(queryStr, self.sqlDialect)[1] else None
+        self.pendingCacheEntry = [ self.queryId, cacheKey, self.resultCache.generation ] if cacheKey and self.cacheResultsAction.isChecked() else None
+        self.queryStatistics = QueryStatistics(queryStr) if not isFullScript else None
+        self.queryLogId = None
+        self.activeWorker = sqlEditor.queryWorker
+        self.activeWorker.useBulkFetch = self.bulkFetchAction.isChecked()
+        self.cancelAction.setEnabled(True)
+        self.cursorResultSet = None
+        self.nextResultAction.setEnabled(False)
 
-                resultWidget.setRowCount(rowNumber if rowNumber <= 1000 else 1000)
+        self.queryTimeLeft = None
 
-            if cursor.description:
-                self.resultTab.setCurrentIndex(1)
+        if self.queryTimeout.value():
+            self.queryTimer.start(self.queryTimeout.value() * 1000)
+
+        if isFullScript:
+            self.startQueryStatus(DatabaseView.PHASE_SCRIPT, len(statements))
+            self.resultTab.setCurrentIndex(0)
+            self.activeWorker.scriptRequested.emit(self.queryId, statements, self.stopOnErrorAction.isChecked())
+        else:
+            self.startQueryStatus(DatabaseView.PHASE_EXECUTING)
+            self.activeWorker.executeRequested.emit(self.queryId, queryStr, parameters)
+
+    def resultCacheKey(self, queryStr, parameters, statements):
+        # Returns the key of a read-only query, a statement that may change data or schema invalidates the cached results.
+        # statements is the SQLStatement list of a script, None for a single query
+        if statements is not None:
+            readOnly = all(normalizeQuery(statement.text, self.sqlDialect)[1] for statement in statements)
+            normalizedQuery = None
+        else:
+            normalizedQuery, readOnly = normalizeQuery(queryStr, self.sqlDialect)
+
+        if not readOnly:
+            self.resultCache.invalidate()
+            return None
+
+        return normalizedQuery and (normalizedQuery, tuple(parameters or [ ]))
+
+    def showCachedResult(self, queryStr, parameters, resultStore, age):
+        self.queryId = self.queryId + 1
+        self.pendingCacheEntry = None
+        self.queryTimer.stop()
+        self.queryTimeLeft = None
+        self.cancelAction.setEnabled(False)
+        self.cursorResultSet = None
+        self.nextResultAction.setEnabled(False)
+        self.lastQueryStr = queryStr
+        self.lastQueryParameters = parameters
+        self.exportAction.setEnabled(self.exportWorker is None)
+
+        self.queryStatistics = QueryStatistics(queryStr)
+        self.queryStatistics.cached = True
+        self.queryStatistics.rowCount = resultStore.rowCount
+        self.queryStatistics.byteCount = resultStore.memorySize() + resultStore.spilledSize()
+        self.queryLogId = None
+
+        renderStart = time.perf_counter()
+        resultModel = QueryResultModel(self.queryId, resultStore, self.queryResult)
+        resultModel.fetchedAll = True
+        resultModel.fetchPending = False
+
+        self.replaceResultModel(resultModel)
+        self.resultTab.setTabText(1, self.mainWindow.tr('Result (cached, {:.0f} s old)', 'tab-title').format(age))
+        self.resultTab.setCurrentIndex(1)
+        self.queryStatistics.renderTime = time.perf_counter() - renderStart
+        self.sqlOutput.append(self.mainWindow.tr('Result from the cache: {:,} rows, {:.0f} s old').format(resultStore.rowCount, age))
+        self.logQuery()
+        self.startQueryStatus(DatabaseView.PHASE_FINISHED)
+
+    def replaceResultModel(self, resultModel):
+        previousModel = self.queryResult.model()
+
+        self.closeResultSets()
+        self.queryResult.setModel(resultModel)
+        self.resultTab.setTabText(1, self.mainWindow.tr('Result', 'tab-title'))
+
+        if isinstance(previousModel, QueryResultModel):
+            if not ResultCache.isShared(previousModel.resultStore):
+                previousModel.resultStore.close()
+
+            previousModel.deleteLater()
+
+    def closeResultSets(self):
+        # Removes the tabs of the result sets after the first, their stores are never cached
+        for resultView in self.resultSetViews:
+            self.resultTab.removeTab(self.resultTab.indexOf(resultView))
+
+            if isinstance(resultView.model(), QueryResultModel):
+                resultView.model().resultStore.close()
+                resultView.model().deleteLater()
+
+            resultView.deleteLater()
+
+        self.resultSetViews = [ ]
+
+    def resultSetTitle(self, resultSet):
+        if resultSet == 0:
+            return self.mainWindow.tr('Result', 'tab-title')
+
+        return self.mainWindow.tr('Result {}', 'tab-title').format(resultSet + 1)
+
+    def resultModel(self, queryId, resultSet):
+        # QueryResultModel of a result set of the current query, None if it was replaced
+        for resultView in [ self.queryResult ] + self.resultSetViews:
+            resultModel = resultView.model()
+
+            if isinstance(resultModel, QueryResultModel) and resultModel.queryId == queryId and resultModel.resultSet == resultSet:
+                return resultModel
+
+        return None
+
+    def showResultTab(self):
+        # The rows of a result set after the first are fetched when its tab is shown for the first time
+        self.refreshHistory()
+
+        if self.resultTab.currentWidget() in self.resultSetViews:
+            self.resultTab.currentWidget().model().fetchDeferred()
+
+    def startQueryStatus(self, phase, statementCount = 0):
+        self.queryStartTime = time.perf_counter()
+        self.queryElapsed = 0.0
+        self.fetchMetrics = None
+        self.scriptStatement = [ 0, statementCount ] if statementCount else None
+        self.setQueryPhase(phase)
+
+    def setQueryPhase(self, phase):
+        running = phase in [ DatabaseView.PHASE_EXECUTING, DatabaseView.PHASE_SCRIPT, DatabaseView.PHASE_FETCHING ]
+        self.queryPhase = phase
+
+        # The timeout counts the time of the server and the driver, not the time the user takes to scroll
+        if phase == DatabaseView.PHASE_WAITING and self.queryTimer.isActive():
+            self.queryTimeLeft = self.queryTimer.remainingTime()
+            self.queryTimer.stop()
+        elif phase == DatabaseView.PHASE_FETCHING and self.queryTimeLeft is not None:
+            self.queryTimer.start(max(1, self.queryTimeLeft))
+            self.queryTimeLeft = None
+
+        if running and not self.statusTimer.isActive():
+            self.statusTimer.start()
+
+        self.showQueryStatus()
+
+        if not running:
+            self.statusTimer.stop()
+
+    def showQueryStatus(self):
+        # Rows per second and bytes per second are those of the fetch calls, so the execute time shows a slow server and
+        # the rates a slow network or driver, whatever the time spent waiting for the result to be scrolled
+        if self.statusTimer.isActive():
+            self.queryElapsed = time.perf_counter() - self.queryStartTime
+
+        phaseTexts = {
+            DatabaseView.PHASE_EXECUTING: self.mainWindow.tr('Executing'),
+            DatabaseView.PHASE_SCRIPT: self.mainWindow.tr('Running statement {} of {}').format(*self.scriptStatement) if self.scriptStatement else '',
+            DatabaseView.PHASE_FETCHING: self.mainWindow.tr('Fetching'),
+            DatabaseView.PHASE_WAITING: self.mainWindow.tr('Scroll for more rows'),
+            DatabaseView.PHASE_FINISHED: self.mainWindow.tr('Finished'),
+            DatabaseView.PHASE_FAILED: self.mainWindow.tr('Failed'),
+            DatabaseView.PHASE_CANCELLED: self.mainWindow.tr('Cancelled') }
+        statusTexts = [ phaseTexts[self.queryPhase] ]
+        statistics = self.queryStatistics if self.queryPhase != DatabaseView.PHASE_SCRIPT else None
+        fraction = self.fetchMetrics.fraction() if self.fetchMetrics else None
+
+        if statistics and statistics.cached:
+            statusTexts.append(self.mainWindow.tr('{:,} rows from the cache').format(statistics.rowCount))
+        elif statistics and self.queryPhase != DatabaseView.PHASE_EXECUTING:
+            if fraction is not None:
+                statusTexts.append(self.mainWindow.tr('{:,} of {:,} rows').format(self.fetchMetrics.fetchedRows, self.fetchMetrics.expectedRows))
             else:
-                resultWidget.clear()
-                resultWidget.setColumnCount(0)
-                resultWidget.setRowCount(0)
-                self.resultTab.setCurrentIndex(0)
+                statusTexts.append(self.mainWindow.tr('{:,} rows').format(statistics.rowCount))
+
+            if statistics.fetchTime > 0:
+                statusTexts.append(self.mainWindow.tr('{:,.0f} rows/s, {}/s').format(statistics.rowCount / statistics.fetchTime,
+                        QLocale().formattedDataSize(int(statistics.byteCount / statistics.fetchTime))))
+
+            statusTexts.append(self.mainWindow.tr('execute {:.1f} s, fetch {:.1f} s').format(statistics.executeTime, statistics.fetchTime))
+
+        statusTexts.append(self.mainWindow.tr('elapsed {:.1f} s').format(self.queryElapsed))
+        self.queryStatus.setText(' | '.join(statusTexts))
+
+        if self.queryPhase in [ DatabaseView.PHASE_EXECUTING, DatabaseView.PHASE_SCRIPT ]:
+            self.queryProgress.setRange(0, 0)           # busy indicator, the server does not tell how far it is
+            self.queryProgress.show()
+        elif fraction is not None and self.queryPhase in [ DatabaseView.PHASE_FETCHING, DatabaseView.PHASE_WAITING ]:
+            self.queryProgress.setRange(0, 100)
+            self.queryProgress.setValue(int(fraction * 100))
+            self.queryProgress.show()
+        else:
+            self.queryProgress.hide()
+
+    @Slot(int, object)
+    def storeFetchMetrics(self, queryId, metrics):
+        if queryId == self.queryId:
+            self.fetchMetrics = metrics
+
+    def resumeQueryStatus(self, queryId):
+        # The result model asked for more rows
+        if queryId == self.queryId and self.queryPhase == DatabaseView.PHASE_WAITING:
+            self.setQueryPhase(DatabaseView.PHASE_FETCHING)
+
+    @Slot(int, object)
+    def updateQueryStatistics(self, queryId, statistics):
+        if queryId == self.queryId and self.queryStatistics:
+            statistics.renderTime = self.queryStatistics.renderTime
+            self.queryStatistics = statistics
+
+    def logQuery(self):
+        # Writes the timings of the current query to the Output tab and the query log
+        self.sqlOutput.append(self.queryStatistics.summary())
+        self.queryLogPending = False
+
+        if self.queryLog:
+            try:
+                if self.queryLogId is None:
+                    self.queryLogId = self.queryLog.add(self.queryStatistics)
+                else:
+                    self.queryLog.update(self.queryLogId, self.queryStatistics)
+            except sqlite3.Error as ex:
+                print('Error writing query log: ' + str(ex))
+
+        if self.resultTab.currentWidget() is self.historyPanel:
+            self.refreshHistory()
+
+    def flushQueryLog(self):
+        # Records the rows fetched by scrolling since the last log write
+        if self.queryLogPending and self.queryLog and self.queryLogId is not None:
+            self.queryLogPending = False
+
+            try:
+                self.queryLog.update(self.queryLogId, self.queryStatistics)
+            except sqlite3.Error as ex:
+                print('Error writing query log: ' + str(ex))
+
+    def refreshHistory(self):
+        if not self.queryLog or self.resultTab.currentWidget() is not self.historyPanel:
+            return
+
+        self.flushQueryLog()
+
+        try:
+            entries = self.queryLog.search(self.historySearch.text())
+        except sqlite3.Error as ex:
+            print('Error reading query log: ' + str(ex))
+            return
+
+        self.historyTable.setSortingEnabled(False)
+        self.historyTable.setRowCount(len(entries))
+
+        for row, entry in enumerate(entries):
+            for col, value in enumerate(entry):
+                item = QTableWidgetItem()
+
+                if col == 0:
+                    item.setText(datetime.datetime.fromtimestamp(value).isoformat(' ', 'seconds'))
+                elif isinstance(value, float):
+                    item.setData(Qt.DisplayRole, round(value, 4))         # numbers sort numerically
+                elif isinstance(value, int):
+                    item.setData(Qt.DisplayRole, value)
+                else:
+                    item.setText(' '.join((value or '').split()))
+
+                self.historyTable.setItem(row, col, item)
+
+        self.historyTable.setSortingEnabled(True)
+
+    def closeQueryLog(self):
+        self.flushQueryLog()
+
+        if self.queryLog:
+            self.queryLog.close()
+            self.queryLog = None
+
+    def queryParameters(self, parameterNames):
+        # Shows the placeholders in the Parameters tab, returns None while a value has not been entered yet
+        uniqueNames = list(dict.fromkeys(parameterNames))
+
+        self.parameterTable.blockSignals(True)
+        self.parameterTable.setRowCount(len(uniqueNames))
+
+        for row, name in enumerate(uniqueNames):
+            nameItem = QTableWidgetItem(name if name.startswith('?') else ':' + name)
+            nameItem.setFlags(nameItem.flags() & ~Qt.ItemIsEditable)
+            nameItem.setData(Qt.UserRole, name)
+            self.parameterTable.setItem(row, 0, nameItem)
+            self.parameterTable.setItem(row, 1, QTableWidgetItem(self.parameterValues.get(name, '')))
+
+        self.parameterTable.blockSignals(False)
+
+        missingNames = [ name for name in uniqueNames if name not in self.parameterValues ]
+
+        if missingNames:
+            self.sqlOutput.append(self.mainWindow.tr('Enter the values of {} in the Parameters tab and run the query again').format(', '.join(missingNames)))
+            self.resultTab.setCurrentWidget(self.parameterTable)
+            self.parameterTable.setCurrentCell(uniqueNames.index(missingNames[0]), 1)
+            self.parameterTable.editItem(self.parameterTable.currentItem())
+            return None
+
+        return [ parameterValue(self.parameterValues[name]) for name in parameterNames ]
+
+    def storeParameterValue(self, item):
+        if item.column() == 1:
+            self.parameterValues[self.parameterTable.item(item.row(), 0).data(Qt.UserRole)] = item.text()
+
+    @Slot(int, bool, int, int)
+    def showStatementCacheUse(self, queryId, cacheHit, hitCount, missCount):
+        self.sqlOutput.append((self.mainWindow.tr('Prepared statement reused') if cacheHit else self.mainWindow.tr('Statement prepared')) +
+                self.mainWindow.tr(' (statement cache: {} hits, {} misses)').format(hitCount, missCount))
+
+    def endQueryExecution(self, queryId):
+        if queryId == self.queryId:
+            self.queryTimer.stop()
+            self.queryTimeLeft = None
+            self.cancelAction.setEnabled(False)
+
+    def releaseIdleSessions(self):
+        for sqlEditor in self.sqlScripts:
+            if sqlEditor.queryWorker:
+                sqlEditor.queryWorker.idleCheckRequested.emit()
+
+    def cancelQuery(self):
+        if self.activeWorker:
+            self.activeWorker.cancel()
+            self.activeWorker.closeRequested.emit(self.queryId)
+
+    def queryTimedOut(self):
+        self.sqlOutput.append(self.mainWindow.tr('Query timeout after {} seconds, cancelling').format(self.queryTimeout.value()))
+        self.cancelQuery()
+
+    @Slot(int, int, object)
+    def showQueryResult(self, queryId, resultSet, resultStore):
+        # The timeout and the cancel action stay on while the rows and the later result sets are fetched
+        if queryId != self.queryId:
+            return
+
+        renderStart = time.perf_counter()
+        firstResult = not isinstance(self.queryResult.model(), QueryResultModel) or self.queryResult.model().queryId != queryId
+
+        if self.exportCandidate and self.exportCandidate[0] == queryId:
+            self.lastQueryStr, self.lastQueryParameters = self.exportCandidate[1 : ]
+            self.exportCandidate = None
+            self.exportAction.setEnabled(self.exportWorker is None)
+
+        if firstResult:
+            resultView = self.queryResult
+        else:
+            # Result sets after the first get their own tab, the worker only fetches their rows once the tab is shown
+            resultView = QTableView(self.resultTab)
+            resultView.setSelectionBehavior(QAbstractItemView.SelectRows)
+            resultView.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+
+        resultModel = QueryResultModel(queryId, resultStore, resultView, resultSet)
+        resultModel.fetchRequested.connect(self.activeWorker.fetch)
+        resultModel.fetchRequested.connect(lambda queryId, resultSet, rowCount: self.resumeQueryStatus(queryId))
+        resultModel.chunkAppended.connect(self.activeWorker.consumeRows)
+
+        if firstResult:
+            self.replaceResultModel(resultModel)
+            self.resultTab.setTabText(1, self.resultSetTitle(resultSet))
+            self.resultTab.setCurrentIndex(1)
+            self.setQueryPhase(DatabaseView.PHASE_FETCHING)
+        else:
+            resultModel.fetchPending = False
+            resultModel.deferred = True
+            resultView.setModel(resultModel)
+            self.resultTab.insertTab(self.resultTab.indexOf(self.queryResult) + len(self.resultSetViews) + 1, resultView, self.resultSetTitle(resultSet))
+            self.resultSetViews.append(resultView)
+
+        self.cursorResultSet = resultSet
+        self.nextResultAction.setEnabled(True)
+        self.queryStatistics.renderTime += time.perf_counter() - renderStart
+
+    @Slot(int, int, object, bool)
+    def appendQueryRows(self, queryId, resultSet, resultChunk, fetchedAll):
+        resultModel = self.resultModel(queryId, resultSet)
+
+        if resultModel:
+            renderStart = time.perf_counter()
+            resultModel.appendChunk(resultChunk, fetchedAll)
+            self.queryStatistics.renderTime += time.perf_counter() - renderStart
+
+            if self.queryLogId is None or fetchedAll:
+                self.logQuery()                 # the first rows, and again when all rows of a result set have been fetched
+            else:
+                self.queryLogPending = True
+
+            if queryId == self.queryId and self.queryPhase in [ DatabaseView.PHASE_FETCHING, DatabaseView.PHASE_WAITING ]:
+                self.setQueryPhase(DatabaseView.PHASE_FETCHING if resultModel.fetchPending else DatabaseView.PHASE_WAITING)
+
+    @Slot(int, int, int)
+    def showResultRowCount(self, queryId, resultSet, rowCount):
+        if rowCount >= 0:
+            self.sqlOutput.append(self.mainWindow.tr('Result {}: {:,} rows affected').format(resultSet + 1, rowCount))
+        else:
+            self.sqlOutput.append(self.mainWindow.tr('Result {}: no row count').format(resultSet + 1))
+
+    @Slot(int, int)
+    def markResultSetSkipped(self, queryId, resultSet):
+        resultModel = self.resultModel(queryId, resultSet)
+
+        if queryId == self.queryId:
+            self.pendingCacheEntry = None   # a partial result is not cached
+
+        if resultModel:
+            resultModel.fetchedAll = True
+            resultModel.fetchPending = False
+            title = self.resultSetTitle(resultSet)
+
+            if resultModel.rowCount():
+                title = self.mainWindow.tr('{} (skipped after {:,} rows)', 'tab-title').format(title, resultModel.rowCount())
+            else:
+                title = self.mainWindow.tr('{} (skipped)', 'tab-title').format(title)
+
+            self.resultTab.setTabText(self.resultTab.indexOf(resultModel.parent()), title)
+
+    @Slot(int)
+    def finishResults(self, queryId):
+        self.endQueryExecution(queryId)
+
+        if queryId != self.queryId:
+            return
+
+        self.cursorResultSet = None
+        self.nextResultAction.setEnabled(False)
+        self.setQueryPhase(DatabaseView.PHASE_FINISHED)
+        resultModel = self.resultModel(queryId, 0)
+
+        if self.pendingCacheEntry and self.pendingCacheEntry[0] == queryId and resultModel and resultModel.fetchedAll and not self.resultSetViews:
+            # Only complete results of a single result set are cached, a result still being scrolled is not
+            self.resultCache.store(self.pendingCacheEntry[1], resultModel.resultStore, self.pendingCacheEntry[2])
+            self.pendingCacheEntry = None
+
+    def skipResultSet(self):
+        if self.activeWorker and self.cursorResultSet is not None:
+            self.activeWorker.skipRequested.emit(self.queryId, self.cursorResultSet)
+
+    @Slot(int, object)
+    def showQueryMessages(self, queryId, messages):
+        for [ msgType, msgLine ] in messages:
+            self.sqlOutput.append(msgType + ' ' + msgLine)
+
+    @Slot(int, int)
+    def finishQuery(self, queryId, rowCount):
+        self.endQueryExecution(queryId)
+
+        if queryId == self.queryId:
+            self.cursorResultSet = None
+            self.nextResultAction.setEnabled(False)
+            self.setQueryPhase(DatabaseView.PHASE_FINISHED)
+            self.replaceResultModel(None)
+            self.resultTab.setCurrentIndex(0)
+
+            if self.queryStatistics:
+                self.logQuery()
+
+    @Slot(int, str)
+    def failQuery(self, queryId, message):
+        self.endQueryExecution(queryId)
+        self.sqlOutput.append(message)
+        self.resultTab.setCurrentIndex(0)
+
+        if queryId == self.queryId:
+            self.cursorResultSet = None
+            self.nextResultAction.setEnabled(False)
+            self.setQueryPhase(DatabaseView.PHASE_CANCELLED if self.activeWorker.cancelled else DatabaseView.PHASE_FAILED)
+
+        if queryId == self.queryId and self.queryStatistics:
+            self.logQuery()
+
+    @Slot(int, int)
+    def startScriptStatement(self, queryId, index):
+        if queryId == self.queryId and self.queryTimeout.value():
+            self.queryTimer.start(self.queryTimeout.value() * 1000)     # the timeout applies to each statement
+
+        if queryId == self.queryId and self.scriptStatement:
+            self.scriptStatement[0] = index + 1
+            self.showQueryStatus()
+
+    @Slot(int, int, int, str, str, int, float)
+    def finishScriptStatement(self, queryId, index, lineNumber, summary, errorMessage, rowCount, elapsed):
+        if errorMessage:
+            self.sqlOutput.append(self.mainWindow.tr('[{}] line {}: {}\nError: {}').format(index + 1, lineNumber, summary, errorMessage))
+        else:
+            if rowCount >= 0:
+                self.sqlOutput.append(self.mainWindow.tr('[{}] line {}: {} -- {} rows, {:.3f} s').format(index + 1, lineNumber, summary, rowCount, elapsed))
+            else:
+                self.sqlOutput.append(self.mainWindow.tr('[{}] line {}: {} -- OK, {:.3f} s').format(index + 1, lineNumber, summary, elapsed))
+
+    @Slot(int, int, int, int, float)
+    def finishScript(self, queryId, statementCount, executedCount, errorCount, elapsed):
+        self.endQueryExecution(queryId)
+        self.sqlOutput.append(self.mainWindow.tr('Script finished: {} of {} statements run, {} errors, {:.3f} s').format(executedCount, statementCount, errorCount, elapsed))
+
+        if queryId == self.queryId:
+            self.setQueryPhase(DatabaseView.PHASE_CANCELLED if self.activeWorker.cancelled else DatabaseView.PHASE_FINISHED)
+
+    def exportResults(self):
+        if self.exportWorker or not self.lastQueryStr:
+            return
+
+        fileFilters = [ self.mainWindow.tr(name) + ' (' + pattern + ')' for name, pattern, writerFactory in EXPORT_FORMATS ]
+        exportDirectory = self.settings.value('DatabaseView/exportDirectory', defaultValue = '', type = str)
+        fileName, selectedFilter = QFileDialog.getSaveFileName(self.mainWindow, self.mainWindow.tr('Export results'), exportDirectory, ';;'.join(fileFilters))
+
+        if not fileName:
+            return
+
+        self.settings.setValue('DatabaseView/exportDirectory', QFileInfo(fileName).absolutePath())
+
+        try:
+            writer = EXPORT_FORMATS[fileFilters.index(selectedFilter) if selectedFilter in fileFilters else 0][2](fileName)
+        except OSError as ex:
+            self.sqlOutput.append(self.mainWindow.tr('Export failed: {}').format(str(ex)))
+            return
+
+        self.exportFileName = fileName
+        self.exportAction.setEnabled(False)
+
+        self.exportThread = QThread()
+        self.exportWorker = ExportWorker(self.connectionPool, self.lastQueryStr, writer, self.lastQueryParameters)
+        self.exportWorker.moveToThread(self.exportThread)
+        self.exportWorker.exportProgress.connect(self.showExportProgress)
+        self.exportWorker.exportFinished.connect(self.finishExport)
+        self.exportWorker.exportFailed.connect(self.failExport)
+        self.exportThread.start()
+
+        self.exportProgressDialog = self.newProgressDialog(self.mainWindow.tr('Export results'),
+                self.mainWindow.tr('Exporting to {} ...').format(QFileInfo(fileName).fileName()), lambda: self.cancelExport())
+
+        self.exportWorker.exportRequested.emit()
+
+    def newProgressDialog(self, title, labelText, cancel):
+        progressDialog = QProgressDialog(labelText, self.mainWindow.tr('Cancel'), 0, 0, self.mainWindow)     # no maximum, shows a busy indicator
+        progressDialog.setWindowTitle(title)
+        progressDialog.setMinimumDuration(0)
+        progressDialog.canceled.connect(cancel)
+        progressDialog.show()
+
+        return progressDialog
+
+    def cancelExport(self):
+        if self.exportWorker:
+            self.exportWorker.cancel()
+
+    @Slot(int, float)
+    def showExportProgress(self, rowCount, elapsed):
+        if self.exportWorker:
+            self.exportProgressDialog.setLabelText(self.mainWindow.tr('Exporting to {} ...\n{:,} rows, {:,.0f} rows/s, {:.1f} s').format(
+                    QFileInfo(self.exportFileName).fileName(), rowCount, rowCount / elapsed if elapsed else 0, elapsed))
+
+    @Slot(int, float, bool)
+    def finishExport(self, rowCount, elapsed, cancelled):
+        self.stopExportWorker()
+
+        if cancelled:
+            self.sqlOutput.append(self.mainWindow.tr('Export to {} cancelled after {:,} rows').format(self.exportFileName, rowCount))
+        else:
+            self.sqlOutput.append(self.mainWindow.tr('Exported {:,} rows to {} in {:.3f} s, {:,.0f} rows/s').format(rowCount, self.exportFileName, elapsed,
+                    rowCount / elapsed if elapsed else 0))
+
+    @Slot(str)
+    def failExport(self, message):
+        self.stopExportWorker()
+        self.sqlOutput.append(self.mainWindow.tr('Export to {} failed: {}').format(self.exportFileName, message))
+        self.resultTab.setCurrentIndex(0)
+
+    def stopExportWorker(self):
+        if self.exportWorker:
+            exportWorker = self.exportWorker
+            self.exportWorker = None
+
+            exportWorker.cancel()
+            self.exportThread.quit()
+            self.exportThread.wait()
+            self.exportThread = None
+
+            self.exportProgressDialog.close()
+            self.exportAction.setEnabled(self.lastQueryStr is not None)
+
+    def selectedTableName(self):
+        # schema.table for the table selected in the tree, if any
+        item = self.dbTree.currentItem()
+
+        if not item or item.type() != DatabaseView.WIDGET_TYPE_TABLE:
+            return ''
+
+        parent = item.parent()
+
+        while parent and parent.type() != DatabaseView.WIDGET_TYPE_SCHEMA:
+            parent = parent.parent()
+
+        if parent:
+            return parent.text(0) + '.' + item.text(0)
+
+        return item.text(0)
+
+    def importData(self):
+        if self.importWorker:
+            return
+
+        fileFilters = [ self.mainWindow.tr(name) + ' (' + pattern + ')' for name, pattern in IMPORT_FORMATS ]
+        importDirectory = self.settings.value('DatabaseView/importDirectory', defaultValue = '', type = str)
+        fileName, selectedFilter = QFileDialog.getOpenFileName(self.mainWindow, self.mainWindow.tr('Import data'), importDirectory, ';;'.join(fileFilters))
+
+        if not fileName:
+            return
+
+        self.settings.setValue('DatabaseView/importDirectory', QFileInfo(fileName).absolutePath())
+
+        tableName, accepted = QInputDialog.getText(self.mainWindow, self.mainWindow.tr('Import data'),
+                self.mainWindow.tr('Insert the rows of {} into table:').format(QFileInfo(fileName).fileName()), text = self.selectedTableName() or QFileInfo(fileName).baseName())
+
+        if not accepted or not tableName.strip():
+            return
+
+        self.importFileName = fileName
+        self.importAction.setEnabled(False)
+        self.resultCache.invalidate()       # results of the table may change from the first committed rows on
+
+        self.importThread = QThread()
+        self.importWorker = ImportWorker(self.connectionPool, fileName, tableName.strip(), self.importCommitRows)
+        self.importWorker.moveToThread(self.importThread)
+        self.importWorker.importProgress.connect(self.showImportProgress)
+        self.importWorker.importFinished.connect(self.finishImport)
+        self.importWorker.importFailed.connect(self.failImport)
+        self.importThread.start()
+
+        self.importProgressDialog = self.newProgressDialog(self.mainWindow.tr('Import data'),
+                self.mainWindow.tr('Importing {} ...').format(QFileInfo(fileName).fileName()), lambda: self.cancelImport())
+
+        self.importWorker.importRequested.emit()
+
+    def cancelImport(self):
+        if self.importWorker:
+            self.importWorker.cancel()
+
+    @Slot(int, float)
+    def showImportProgress(self, rowCount, elapsed):
+        if self.importWorker:
+            self.importProgressDialog.setLabelText(self.mainWindow.tr('Importing {} ...\n{:,} rows, {:,.0f} rows/s, {:.1f} s').format(
+                    QFileInfo(self.importFileName).fileName(), rowCount, rowCount / elapsed if elapsed else 0, elapsed))
+
+    @Slot(int, float, bool)
+    def finishImport(self, rowCount, elapsed, cancelled):
+        self.stopImportWorker()
+
+        if cancelled:
+            self.sqlOutput.append(self.mainWindow.tr('Import of {} cancelled, {:,} rows committed').format(self.importFileName, rowCount))
+        else:
+            self.sqlOutput.append(self.mainWindow.tr('Imported {:,} rows from {} in {:.3f} s, {:,.0f} rows/s').format(rowCount, self.importFileName, elapsed,
+                    rowCount / elapsed if elapsed else 0))
+
+    @Slot(int, str)
+    def failImport(self, rowCount, message):
+        self.stopImportWorker()
+        self.sqlOutput.append(self.mainWindow.tr('Import of {} failed, {:,} rows committed: {}').format(self.importFileName, rowCount, message))
+        self.resultTab.setCurrentIndex(0)
+
+    def stopImportWorker(self):
+        if self.importWorker:
+            importWorker = self.importWorker
+            self.importWorker = None
+
+            importWorker.cancel()
+            self.importThread.quit()
+            self.importThread.wait()
+            self.importThread = None
+            self.resultCache.invalidate()   # and again for queries cached while the rows were inserted, also when cancelled or failed
+
+            self.importProgressDialog.close()
+            self.importAction.setEnabled(True)
+
+    def stopWorkers(self):
+        # Connections go back to the pool once their threads have stopped
+        self.sessionTimer.stop()
+        self.stopExportWorker()
+        self.stopImportWorker()
+
+        for sqlEditor in self.sqlScripts:
+            if sqlEditor.queryWorker:
+                sqlEditor.queryWorker.cancel()
+                sqlEditor.queryThread.quit()
+
+        self.metadataWorker.cancel()
+        self.metadataThread.quit()
+
+        for sqlEditor in self.sqlScripts:
+            if sqlEditor.queryWorker:
+                sqlEditor.queryThread.wait()
+                sqlEditor.queryWorker.releaseSession()
+
+        self.metadataThread.wait()
+        self.metadataSession.release()
+
+        self.journalClosing.emit()
+        self.autosaveThread.quit()
+        self.autosaveThread.wait()
+
+    def closeSqlFiles(self):
+        for sqlScript in self.sqlScripts:
+            if isinstance(sqlScript, SQLFileView):
+                sqlScript.closeFile()
 
     def loadSqlFile(self, fileName, sqlEditor):
         file = QFile(fileName)
@@ -290,9 +1537,7 @@ class DatabaseView(QObject):
             fileStream.setEncoding(QStringConverter.Utf8)
             fileStream.setAutoDetectUnicode(True)       # Check for Unicode BOM character (Byte Order Mark)
 
-            while not fileStream.atEnd():
-                line = fileStream.readLine()
-                sqlEditor.append(line)
+            sqlEditor.setPlainText(fileStream.readAll())      # one document rebuild instead of one per line
 
             if file.error() != QFile.NoError:
                 print('Error loading script file {}: '.format(fileName) + file.errorString())
@@ -318,18 +1563,29 @@ class DatabaseView(QObject):
                 else:
                     tabTitle = QFileInfo(sqlScript).baseName()
 
+                if QFileInfo(sqlScript).size() >= self.largeScriptSize * 1024 * 1024:
+                    try:
+                        self.sqlScripts.append(SQLFileView(sqlScript, self.sqlTab))
+                        continue
+                    except (OSError, ValueError) as ex:
+                        print('Error mapping script file {}: '.format(sqlScript) + str(ex))
+
                 sqlEditor = SQLEditorWidget(self.sqlTab)
+                sqlEditor.setSqlDialect(self.sqlDialect)
                 self.sqlScripts.append(sqlEditor)
 
-                self.loadSqlFile(sqlScript, sqlEditor)
+                if QFileInfo(sqlScript).exists():              # tabs closed before their first autosave have no file yet
+                    self.loadSqlFile(sqlScript, sqlEditor)
+
+                self.recoverSqlFile(sqlScript, sqlEditor)
         else:
             self.sqlScripts = [ SQLEditorWidget(self.sqlTab) ]
+            self.sqlScripts[0].setSqlDialect(self.sqlDialect)
             self.sqlScripts[0].document().setModified(True)
             self.sqlScriptFiles = [ self.appDataPath + '/' + self.configBasename + '-SQLEditor1.sql' ]
+            self.recoverSqlFile(self.sqlScriptFiles[0], self.sqlScripts[0])
 
         for [ index, script ] in enumerate(self.sqlScripts):
-            script.setWordWrapMode(QTextOption.NoWrap)
-            script.setAcceptRichText(False)
             self.sqlTab.insertTab(index, script, self.mainWindow.tr('SQL', 'tab-title'))
 
         currentScript = self.settings.value('DatabaseView/currentSql', defaultValue = 0, type = int)
@@ -342,10 +1598,24 @@ class DatabaseView(QObject):
         self.sqlScripts[currentScript].setFocus()
 
         for script in self.sqlScripts:
-            script.executeStatement.connect(lambda editorWidget, queryStr: self.runQuery(queryStr, False, self.conn, self.sqlOutput, self.queryResult))
-            script.executeScript.connect(lambda editorWidget, queryStr: self.runQuery(queryStr, True, self.conn, self.sqlOutput, self.queryResult))
+            if isinstance(script, SQLEditorWidget):
+                script.completionSource = self.completions
+                script.document().contentsChange.connect(lambda position, charsRemoved, charsAdded, sqlEditor = script:
+                        self.journalChange(sqlEditor, position, charsRemoved, charsAdded))
+
+                if script.document().isModified():
+                    self.autosaveTimer.start()
+
+            script.executeStatement.connect(lambda editorWidget, queryStr: self.runQuery(editorWidget, queryStr, False))
+            script.executeScript.connect(lambda editorWidget, queryStr: self.runQuery(editorWidget, queryStr, True))
 
     def loadSettings(self, dataSourceName, extraConnectionString):
+        self.metadataCache = None
+        self.queryLog = None
+        self.resultMemoryLimit = ResultStore.MEMORY_BUDGET // (1024 * 1024)
+        self.importCommitRows = ImportWorker.COMMIT_INTERVAL
+        self.largeScriptSize = SQLFileView.SIZE_THRESHOLD // (1024 * 1024)
+
         if 'APPDATA' in os.environ:
             self.appDataPath = os.environ['APPDATA'].replace('\\', '/') + '/' + QApplication.instance().applicationName()
         else:
@@ -367,6 +1637,17 @@ class DatabaseView(QObject):
 
             self.settings = QSettings(self.appDataPath + '/' + self.configBasename + '.ini', QSettings.IniFormat)
 
+            try:
+                QDir().mkpath(self.appDataPath)
+                self.metadataCache = MetadataCache(self.appDataPath + '/' + self.configBasename + '-Metadata.sqlite3')
+            except sqlite3.Error as ex:
+                print('Error opening metadata cache: ' + str(ex))
+
+            try:
+                self.queryLog = QueryLog(self.appDataPath + '/' + self.configBasename + '-QueryLog.sqlite3')
+            except sqlite3.Error as ex:
+                print('Error opening query log: ' + str(ex))
+
             mainWindowGeometry = self.settings.value('DatabaseView/geometry', QByteArray())
 
             if mainWindowGeometry:
@@ -382,32 +1663,96 @@ class DatabaseView(QObject):
 
                 self.mainWindow.resize(wndSize)
 
+            self.queryTimeout.setValue(int(self.settings.value('DatabaseView/queryTimeout', defaultValue = 0, type = int)))
+            self.stopOnErrorAction.setChecked(self.settings.value('DatabaseView/stopScriptOnError', defaultValue = True, type = bool))
+            self.resultMemoryLimit = max(16, self.settings.value('DatabaseView/resultMemoryLimit', defaultValue = self.resultMemoryLimit, type = int))   # MB
+            self.importCommitRows = max(0, self.settings.value('DatabaseView/importCommitRows', defaultValue = self.importCommitRows, type = int))
+            self.largeScriptSize = max(1, self.settings.value('DatabaseView/largeScriptSize', defaultValue = self.largeScriptSize, type = int))   # MB
+            self.bulkFetchAction.setChecked(BulkFetch.available() and self.settings.value('DatabaseView/bulkFetch', defaultValue = False, type = bool))
+            self.cacheResultsAction.setChecked(self.settings.value('DatabaseView/resultCache', defaultValue = False, type = bool))
+            self.resultCache.ttl = max(0, self.settings.value('DatabaseView/resultCacheTtl', defaultValue = self.resultCache.ttl, type = int))   # seconds
+            self.resultCache.memoryBudget = max(1, self.settings.value('DatabaseView/resultCacheLimit',
+                    defaultValue = self.resultCache.memoryBudget // (1024 * 1024), type = int)) * 1024 * 1024                             # MB
+
             mainWindowState = self.settings.value('DatabaseView/windowState', QByteArray())
 
             if mainWindowState:
                 self.mainWindow.restoreState(mainWindowState)
 
-    def saveSqlFile(self, fileName, sqlEditor):
-        file = QFile(fileName)
+    def closeMetadataCache(self):
+        if self.metadataCache:
+            self.metadataCache.close()
+            self.metadataCache = None
 
-        if file.open(QFile.WriteOnly | QFile.Text):
-            fileStream = QTextStream(file)
-            fileStream.generateByteOrderMark()
-            fileStream.setEncoding(QStringConverter.Utf8)
-            fileStream << sqlEditor.toPlainText()
-            fileStream = None
+    def journalFileName(self, fileName):
+        return self.appDataPath + '/' + self.configBasename + '-Journal-' + hex(Calculator(Crc64.CRC64).checksum(fileName.encode()))[2:].zfill(16) + '.jsonl'
 
-            if file.error()!= QFile.NoError:
-                print('Error saving script file {}: '.format(fileName) + file.errorString())
+    def journalChange(self, sqlEditor, position, charsRemoved, charsAdded):
+        document = sqlEditor.document()
+        cursor = QTextCursor(document)
+        cursor.setPosition(position)
+        cursor.setPosition(min(position + charsAdded, document.characterCount() - 1), QTextCursor.KeepAnchor)
 
-            file.close()
-        else:
-            print('Error saving script file ' + fileName)
+        sqlEditor.revision += 1
+        sqlEditor.journalRecords.append([ position, charsRemoved, cursor.selectedText().replace('\u2029', '\n') ])
+        sqlEditor.journalSize += len(sqlEditor.journalRecords[-1][2]) + 32          # text added and about the rest of the record
 
-    def saveSqlScripts(self):
+        if not self.journalTimer.isActive():
+            self.journalTimer.start()
+
+        self.autosaveTimer.start()
+
+    @Slot()
+    def flushJournal(self):
         for [ index, sqlEditor ] in enumerate(self.sqlScripts):
-            if sqlEditor.document().isModified():
-                self.saveSqlFile(self.sqlScriptFiles[index], sqlEditor)
+            if isinstance(sqlEditor, SQLEditorWidget) and sqlEditor.journalRecords:
+                self.journalRequested.emit(self.sqlScriptFiles[index], self.journalFileName(self.sqlScriptFiles[index]), sqlEditor.journalRecords)
+                sqlEditor.journalRecords = [ ]
+
+    @Slot()
+    def autosaveScripts(self):
+        # The journal is flushed first, the autosave thread then saves the scripts after the edits they contain. Copying
+        # the text of a large script on the GUI thread is left until its journal grew large, the journal keeps its edits
+        self.flushJournal()
+
+        for [ index, sqlEditor ] in enumerate(self.sqlScripts):
+            if isinstance(sqlEditor, SQLEditorWidget) and sqlEditor.document().isModified() and sqlEditor.revision != sqlEditor.savedRevision \
+                    and (sqlEditor.document().characterCount() < DatabaseView.AUTOSAVE_TEXT_SIZE or sqlEditor.journalSize >= DatabaseView.AUTOSAVE_JOURNAL_SIZE):
+                sqlEditor.savedRevision = sqlEditor.revision
+                sqlEditor.journalSize = 0
+                self.saveRequested.emit(self.sqlScriptFiles[index], self.journalFileName(self.sqlScriptFiles[index]), sqlEditor.toPlainText(), sqlEditor.revision)
+
+    @Slot(str, int)
+    def markScriptSaved(self, fileName, revision):
+        if fileName in self.sqlScriptFiles:
+            sqlEditor = self.sqlScripts[self.sqlScriptFiles.index(fileName)]
+
+            if sqlEditor.revision == revision:
+                sqlEditor.document().setModified(False)
+
+    def recoverSqlFile(self, fileName, sqlEditor):
+        # Replays the edits journaled after the last save, when the application did not get to save them
+        records = readJournal(fileName, self.journalFileName(fileName))
+
+        if records:
+            document = sqlEditor.document()
+            cursor = QTextCursor(document)
+            cursor.beginEditBlock()
+
+            for position, charsRemoved, text in records:
+                end = document.characterCount() - 1
+                cursor.setPosition(min(position, end))
+                cursor.setPosition(min(position + charsRemoved, end), QTextCursor.KeepAnchor)
+                cursor.insertText(text)
+
+            cursor.endEditBlock()
+            document.setModified(True)
+            sqlEditor.journalSize = sum(len(text) + 32 for position, charsRemoved, text in records)     # still in the journal
+            self.sqlOutput.append(self.mainWindow.tr('Recovered {} unsaved edits of {}').format(len(records), fileName))
+
+    def saveSqlScripts(self):
+        # Edits since the last autosave are in the journal, closing does not wait for the tabs to be written
+        self.flushJournal()
 
         self.settings.setValue('DatabaseView/currentSql', self.sqlTab.currentIndex())
         self.settings.setValue('DatabaseView/sqlScriptFiles', self.sqlScriptFiles)
@@ -416,6 +1761,15 @@ class DatabaseView(QObject):
         if self.settings:
             self.settings.setValue('DatabaseView/geometry', self.mainWindow.saveGeometry())
             self.settings.setValue('DatabaseView/windowState', self.mainWindow.saveState())
+            self.settings.setValue('DatabaseView/queryTimeout', self.queryTimeout.value())
+            self.settings.setValue('DatabaseView/stopScriptOnError', self.stopOnErrorAction.isChecked())
+            self.settings.setValue('DatabaseView/bulkFetch', self.bulkFetchAction.isChecked())
+            self.settings.setValue('DatabaseView/resultCache', self.cacheResultsAction.isChecked())
+            self.settings.setValue('DatabaseView/resultCacheTtl', self.resultCache.ttl)
+            self.settings.setValue('DatabaseView/resultCacheLimit', self.resultCache.memoryBudget // (1024 * 1024))
+            self.settings.setValue('DatabaseView/resultMemoryLimit', self.resultMemoryLimit)
+            self.settings.setValue('DatabaseView/importCommitRows', self.importCommitRows)
+            self.settings.setValue('DatabaseView/largeScriptSize', self.largeScriptSize)
             self.saveSqlScripts()
             self.settings.sync()
 
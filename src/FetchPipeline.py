@@ -0,0 +1,154 @@
+import time
+
+def sampleSize(rows):
+    # Bytes of a batch of pyodbc rows, estimated from its first row
+    if not rows:
+        return 0
+
+    return len(rows) * sum(len(value) if isinstance(value, (str, bytes, bytearray)) else 8 for value in rows[0])
+
+class BatchSizer:
+    # Rows for the next fetchmany() call. A call costs a round trip to the data source plus a time per row, both
+    # estimated by a least squares fit over the recent calls. The batch grows until the round trip is a small share
+    # of the call, so high latency links get large batches and a LAN small ones, and it is capped by the memory the
+    # rows take (wide rows get fewer) and by the time one call keeps the worker from seeing a cancel
+    MIN_ROWS = 16
+    MAX_ROWS = 100000
+    MAX_BYTES = 4 * 1024 * 1024
+    MAX_SECONDS = 0.5
+    ROUND_TRIP_SHARE = 0.1
+    BATCH_OVERHEAD = 0.001                  # seconds each batch costs on top of the round trip, converting and sending it
+    MAX_GROWTH = 4                          # factor the batch may grow or shrink by from one call to the next
+    DECAY = 0.75                            # weight of each older call in the fit
+
+    def __init__(self, rows = 256):
+        self.rows = rows
+        self.rowBytes = None
+        self.roundTrip = None               # seconds
+        self.rowTime = None                 # seconds per row
+        self.sums = [ 0.0, 0.0, 0.0, 0.0, 0.0 ]         # weight, rows, seconds, rows², rows × seconds
+
+    def fit(self):
+        weight, rows, seconds, rowsSquared, rowsSeconds = self.sums
+        meanRows = rows / weight
+        variance = rowsSquared / weight - meanRows * meanRows
+
+        if variance > (0.1 * meanRows) ** 2:                # batch sizes far enough apart to tell the two costs apart
+            rowTime = (rowsSeconds / weight - meanRows * seconds / weight) / variance
+
+            if rowTime > 0:
+                self.rowTime = rowTime
+                self.roundTrip = max(0.0, seconds / weight - rowTime * meanRows)
+
+    def update(self, rowCount, byteCount, seconds):
+        # seconds is None for the first call, which may still include executing the query
+        if not rowCount:
+            return
+
+        rowBytes = byteCount / rowCount
+        self.rowBytes = rowBytes if self.rowBytes is None else (self.rowBytes + rowBytes) / 2
+
+        if seconds is not None:
+            self.sums = [ total * BatchSizer.DECAY + value for total, value in zip(self.sums, [ 1, rowCount, seconds, rowCount * rowCount, rowCount * seconds ]) ]
+            self.fit()
+
+        if self.rowTime is None:
+            rows = self.rows * 2            # no estimate yet, the next size gives the fit a second point
+        else:
+            share = BatchSizer.ROUND_TRIP_SHARE
+            rows = min((self.roundTrip + BatchSizer.BATCH_OVERHEAD) * (1 - share) / (share * self.rowTime), BatchSizer.MAX_SECONDS / self.rowTime)
+
+        rows = min(rows, BatchSizer.MAX_BYTES / max(1.0, self.rowBytes), self.rows * BatchSizer.MAX_GROWTH, BatchSizer.MAX_ROWS)
+        self.rows = int(max(BatchSizer.MIN_ROWS, self.rows / BatchSizer.MAX_GROWTH, rows))
+
+class FetchMetrics:
+    # One batch through the pipeline, published with its rows
+    def __init__(self, batchNumber, batchSize, rowCount, byteCount, fetchTime, queued, fetchedRows, expectedRows):
+        self.batchNumber = batchNumber
+        self.batchSize = batchSize          # rows asked for
+        self.rowCount = rowCount            # rows returned
+        self.byteCount = byteCount
+        self.fetchTime = fetchTime          # seconds in the fetch call
+        self.queued = queued                # batches sent and not consumed yet, including this one
+        self.fetchedRows = fetchedRows      # rows of the result set fetched so far, including this batch
+        self.expectedRows = expectedRows    # rows of the result set, None if the driver does not tell
+
+    def fraction(self):
+        # Part of the result set fetched, None if unknown
+        if not self.expectedRows or self.fetchedRows > self.expectedRows:
+            return None
+
+        return self.fetchedRows / self.expectedRows
+
+    def rowsPerSecond(self):
+        return self.rowCount / self.fetchTime if self.fetchTime > 0 else 0.0
+
+class FetchPipeline:
+    # Stage between a cursor and the consumers of its rows. Rows are fetched in batches sized by a BatchSizer, or in
+    # the blocks of a BulkStatement, and converted by newChunk() when given one. Consumers on another thread ask for
+    # rows with request() and acknowledge each batch with consumed(), and no more than MAX_QUEUED batches are sent
+    # ahead of them, so a GUI thread that falls behind holds back the fetch instead of piling up rows in its queue
+    MAX_QUEUED = 4
+
+    def __init__(self, cursor, newChunk = None, bulk = False, batchSize = 256):
+        self.cursor = cursor
+        self.newChunk = newChunk            # function( rows ) returning a ResultChunk
+        self.bulk = bulk
+        self.sizer = BatchSizer(batchSize)
+        self.expectedRows = cursor.rowcount if cursor.rowcount > 0 else None      # SQLRowCount() after execute, most drivers return -1
+        self.rowCount = 0
+        self.batchCount = 0
+        self.demand = 0                     # rows requested and not fetched yet
+        self.queued = 0
+        self.fetchedAll = False
+
+    def request(self, rowCount):
+        self.demand += rowCount
+
+    def consumed(self):
+        self.queued = max(0, self.queued - 1)
+
+    def wanted(self):
+        return not self.fetchedAll and self.demand > 0 and self.queued < FetchPipeline.MAX_QUEUED
+
+    def fetchBatch(self):
+        # Returns the rows (a ResultChunk with newChunk) and the FetchMetrics of the next batch
+        fetchStart = time.perf_counter()
+
+        if self.bulk:
+            # One block of rows per call, the bound arrays are copied column by column into the chunk
+            batchSize = self.cursor.rowArraySize
+            rows = self.cursor.newChunk(self.cursor.fetch())
+            self.fetchedAll = self.cursor.fetchedAll
+        else:
+            batchSize = self.sizer.rows
+            rows = self.cursor.fetchmany(batchSize)
+            self.fetchedAll = len(rows) < batchSize
+
+        fetchTime = time.perf_counter() - fetchStart
+
+        # Rows are converted to the columnar layout here, on the fetching thread
+        if self.newChunk and not self.bulk:
+            rows = self.newChunk(rows)
+
+        if self.newChunk or self.bulk:
+            rowCount, byteCount = rows.rowCount, rows.memorySize()
+        else:
+            rowCount, byteCount = len(rows), sampleSize(rows)
+
+        self.sizer.update(rowCount, byteCount, fetchTime if self.batchCount else None)
+        self.rowCount += rowCount
+        self.batchCount += 1
+        self.demand = max(0, self.demand - rowCount)          # a batch larger than requested does not count against the next request
+        self.queued += 1
+
+        return rows, FetchMetrics(self.batchCount, batchSize, rowCount, byteCount, fetchTime, self.queued, self.rowCount, self.expectedRows)
+
+    def batches(self):
+        # All the rows of a consumer on the fetching thread, batch by batch
+        while not self.fetchedAll:
+            rows, metrics = self.fetchBatch()
+            self.queued = 0
+
+            if metrics.rowCount:
+                yield rows, metrics
@@ -0,0 +1,128 @@
+import sqlite3, threading, time, hashlib
+
+class MetadataCache:
+    # Local copy of the data source catalog, kept in an SQLite file next to the connection .ini file
+    SCHEMA_VERSION = 1
+
+    def __init__(self, fileName):
+        self.lock = threading.Lock()        # shared by the GUI thread (reads) and the metadata worker (writes)
+        self.db = sqlite3.connect(fileName, check_same_thread = False)
+
+        with self.lock, self.db:
+            version = self.db.execute('PRAGMA user_version').fetchone()[0]
+
+            if version != MetadataCache.SCHEMA_VERSION:
+                self.db.executescript('''
+                    DROP TABLE IF EXISTS cache_info;
+                    DROP TABLE IF EXISTS schemas;
+                    DROP TABLE IF EXISTS tables;
+                    DROP TABLE IF EXISTS procedures;
+                    DROP TABLE IF EXISTS columns;''')
+
+            self.db.executescript('''
+                CREATE TABLE IF NOT EXISTS cache_info(key TEXT PRIMARY KEY, fetched REAL, checksum TEXT);
+                CREATE TABLE IF NOT EXISTS schemas(catalog TEXT, schema TEXT);
+                CREATE TABLE IF NOT EXISTS tables(catalog TEXT, schema TEXT, name TEXT, type TEXT, remarks TEXT);
+                CREATE TABLE IF NOT EXISTS procedures(catalog TEXT, schema TEXT, name TEXT, input_params INTEGER, output_params INTEGER,
+                        result_sets INTEGER, remarks TEXT, type INTEGER);
+                CREATE TABLE IF NOT EXISTS columns(catalog TEXT, schema TEXT, table_name TEXT, name TEXT, data_type INTEGER, type_name TEXT,
+                        column_size INTEGER, nullable INTEGER, ordinal INTEGER);
+                CREATE INDEX IF NOT EXISTS tables_schema ON tables(catalog, schema);
+                CREATE INDEX IF NOT EXISTS procedures_schema ON procedures(catalog, schema);
+                CREATE INDEX IF NOT EXISTS columns_table ON columns(catalog, schema, table_name);''')
+            self.db.execute('PRAGMA user_version = {}'.format(MetadataCache.SCHEMA_VERSION))
+
+    @staticmethod
+    def cacheKey(*names):
+        return '\x1f'.join('' if name is None else name for name in names)
+
+    @staticmethod
+    def checksum(*rowLists):
+        digest = hashlib.sha1()
+
+        for rows in rowLists:
+            for row in rows:
+                digest.update(repr(tuple(row)).encode('utf-8', 'surrogatepass'))
+
+            digest.update(b'\x1e')
+
+        return digest.hexdigest()
+
+    def fetchedTime(self, key):
+        with self.lock:
+            row = self.db.execute('SELECT fetched FROM cache_info WHERE key = ?', (key, )).fetchone()
+
+        return row[0] if row else None
+
+    def update(self, key, rowLists, writeRows):
+        # Replaces the cached rows only when the checksum changed, returns True if the rows were rewritten
+        checksum = MetadataCache.checksum(*rowLists)
+
+        with self.lock, self.db:
+            row = self.db.execute('SELECT checksum FROM cache_info WHERE key = ?', (key, )).fetchone()
+            self.db.execute('INSERT OR REPLACE INTO cache_info(key, fetched, checksum) VALUES (?, ?, ?)', (key, time.time(), checksum))
+
+            if row and row[0] == checksum:
+                return False
+
+            writeRows()
+
+        return True
+
+    def schemas(self):
+        if self.fetchedTime('schemas') is None:
+            return None
+
+        with self.lock:
+            return [ [ catalog, schema ] for catalog, schema in self.db.execute('SELECT catalog, schema FROM schemas ORDER BY rowid') ]
+
+    def storeSchemas(self, schemas):
+        def writeRows():
+            self.db.execute('DELETE FROM schemas')
+            self.db.executemany('INSERT INTO schemas(catalog, schema) VALUES (?, ?)', schemas)
+
+        return self.update('schemas', [ schemas ], writeRows)
+
+    def objects(self, catalog, schema):
+        if self.fetchedTime(MetadataCache.cacheKey('objects', catalog, schema)) is None:
+            return None
+
+        with self.lock:
+            # IS compares NULL catalog and schema names as equal
+            tables = self.db.execute('SELECT catalog, schema, name, type, remarks FROM tables WHERE catalog IS ? AND schema IS ? ORDER BY rowid', (catalog, schema)).fetchall()
+            procedures = self.db.execute('SELECT catalog, schema, name, input_params, output_params, result_sets, remarks, type FROM procedures WHERE catalog IS ? AND schema IS ? ORDER BY rowid',
+                    (catalog, schema)).fetchall()
+
+        return tables, procedures
+
+    def storeObjects(self, catalog, schema, tables, procedures):
+        def writeRows():
+            self.db.execute('DELETE FROM tables WHERE catalog IS ? AND schema IS ?', (catalog, schema))
+            self.db.execute('DELETE FROM procedures WHERE catalog IS ? AND schema IS ?', (catalog, schema))
+            self.db.executemany('INSERT INTO tables(catalog, schema, name, type, remarks) VALUES (?, ?, ?, ?, ?)',
+                    [ (catalog, schema) + tuple(row[2:5]) for row in tables ])
+            self.db.executemany('INSERT INTO procedures(catalog, schema, name, input_params, output_params, result_sets, remarks, type) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    [ (catalog, schema) + tuple(row[2:8]) for row in procedures ])
+
+        return self.update(MetadataCache.cacheKey('objects', catalog, schema), [ tables, procedures ], writeRows)
+
+    def columns(self, catalog, schema, table):
+        if self.fetchedTime(MetadataCache.cacheKey('columns', catalog, schema, table)) is None:
+            return None
+
+        with self.lock:
+            return self.db.execute('SELECT name, data_type, type_name, column_size, nullable FROM columns WHERE catalog IS ? AND schema IS ? AND table_name = ? ORDER BY ordinal',
+                    (catalog, schema, table)).fetchall()
+
+    def storeColumns(self, catalog, schema, table, columns):
+        # columns as [ name, data_type, type_name, column_size, nullable ]
+        def writeRows():
+            self.db.execute('DELETE FROM columns WHERE catalog IS ? AND schema IS ? AND table_name = ?', (catalog, schema, table))
+            self.db.executemany('INSERT INTO columns(catalog, schema, table_name, name, data_type, type_name, column_size, nullable, ordinal) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [ (catalog, schema, table) + tuple(column[0:5]) + (ordinal, ) for ordinal, column in enumerate(columns) ])
+
+        return self.update(MetadataCache.cacheKey('columns', catalog, schema, table), [ columns ], writeRows)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
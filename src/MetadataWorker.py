@@ -0,0 +1,147 @@
+import threading
+import pyodbc
+
+from PySide6.QtCore import (
+        QObject,
+        QTimer,
+        Signal,
+        Slot)
+
+from src.CompletionIndex import CompletionIndex
+
+class MetadataWorker(QObject):
+    schemasLoaded = Signal(object, bool)    # [ catalog, schema ] pairs (empty if the data source has no schemas), changed since cached
+    objectsLoaded = Signal(object, object, object, object, bool)    # catalog, schema, table rows, procedure rows, changed since cached
+    columnsLoaded = Signal(object, object, str, object, bool)       # catalog, schema, table, [ name, data_type, type_name, column_size, nullable ], changed
+    metadataFailed = Signal(str)
+    completionIndexBuilt = Signal(object)   # CompletionIndex of the names listed so far
+
+    COMPLETION_INDEX_DELAY = 200            # milliseconds object listings are collected before they are merged into the index
+
+    def __init__(self, connection, dbmsName, metadataCache = None):
+        super().__init__()
+
+        self.conn = connection
+        self.dbmsName = dbmsName
+        self.metadataCache = metadataCache
+        self.completionSchemas = [ ]
+        self.completionObjects = { }        # (catalog, schema): completion entries of the objects listed
+        self.completionIndex = None         # last index sent, new listings are merged into it
+        self.pendingObjects = { }           # (catalog, schema): entries in completionIndex of the listings not merged yet
+        self.cursor = None                  # cursor of the running catalog function, for cancel()
+        self.cursorLock = threading.Lock()
+
+        self.completionTimer = QTimer(self) # moves to the worker thread with the worker
+        self.completionTimer.setSingleShot(True)
+        self.completionTimer.setInterval(MetadataWorker.COMPLETION_INDEX_DELAY)
+        self.completionTimer.timeout.connect(self.mergeCompletionObjects)
+
+    def newCursor(self):
+        cursor = self.conn.cursor()
+
+        with self.cursorLock:
+            self.cursor = cursor
+
+        return cursor
+
+    def cancel(self):
+        # Runs on the GUI thread, for the thread to stop without waiting for a slow catalog query
+        with self.cursorLock:
+            cursor = self.cursor
+
+        if cursor:
+            try:
+                cursor.cancel()
+            except pyodbc.Error as ex:
+                print('Error cancelling catalog query: ' + str(ex))
+
+    @Slot()
+    def loadSchemas(self):
+        schemas = [ ]
+
+        try:
+            # SQL_ALL_SCHEMAS: schema name '%' with empty catalog and table names lists the schemas only
+            for row in self.newCursor().tables(table = '', catalog = '', schema = '%'):
+                if row[1] and not [ row[0], row[1] ] in schemas:
+                    schemas.append([ row[0], row[1] ])
+        except pyodbc.Error as ex:
+            print('Schema enumeration not available: ' + str(ex))
+
+        changed = self.metadataCache.storeSchemas(schemas) if self.metadataCache else True
+        self.schemasLoaded.emit(schemas, changed)
+
+        # Schemas not expanded yet are completed from the cached objects
+        self.completionSchemas = schemas
+        self.completionObjects = { key: entries for key, entries in self.completionObjects.items() if list(key) in schemas or not schemas }
+
+        for catalog, schema in schemas or [ [ None, None ] ]:
+            cachedObjects = self.metadataCache.objects(catalog, schema) if self.metadataCache and not (catalog, schema) in self.completionObjects else None
+
+            if cachedObjects:
+                self.completionObjects[(catalog, schema)] = CompletionIndex.objectEntries(*cachedObjects)
+
+        self.buildCompletionIndex()
+
+    @Slot(object, object)
+    def loadObjects(self, catalog, schema):
+        # With no schema the whole data source is listed, as for drivers without schema support
+        try:
+            tables = [ ]
+
+            for row in self.newCursor().tables(catalog = catalog, schema = schema):
+                if schema is None or row[1] == schema:              # schema names are patterns, '_' matches any character
+                    tables.append(tuple(row[0:5]))
+
+            procedures = [ ]
+
+            if self.dbmsName != 'DBASE':
+                for row in self.newCursor().procedures(catalog = catalog, schema = schema):
+                    if schema is None or row[1] == schema:
+                        procedures.append(tuple(row[0:8]))
+        except pyodbc.Error as ex:
+            self.metadataFailed.emit(str(ex))
+            self.objectsLoaded.emit(catalog, schema, [ ], [ ], False)
+            return
+
+        changed = self.metadataCache.storeObjects(catalog, schema, tables, procedures) if self.metadataCache else True
+        self.objectsLoaded.emit(catalog, schema, tables, procedures, changed)
+
+        if changed or not (catalog, schema) in self.completionObjects:
+            # Expanding all schemas queues a listing per schema, they are merged into the index together
+            if not (catalog, schema) in self.pendingObjects:
+                self.pendingObjects[(catalog, schema)] = self.completionObjects.get((catalog, schema), [ ])
+
+            self.completionObjects[(catalog, schema)] = CompletionIndex.objectEntries(tables, procedures)
+            self.completionTimer.start()
+
+    @Slot(object, object, str)
+    def loadColumns(self, catalog, schema, table):
+        try:
+            columns = [ [ row[3], row[4], row[5], row[6], row[10] ] for row in self.newCursor().columns(table = table, catalog = catalog, schema = schema)
+                    if row[2] == table and (schema is None or row[1] == schema) ]
+        except pyodbc.Error as ex:
+            self.metadataFailed.emit(str(ex))
+            return
+
+        changed = self.metadataCache.storeColumns(catalog, schema, table, columns) if self.metadataCache else True
+        self.columnsLoaded.emit(catalog, schema, table, columns, changed)
+
+    def buildCompletionIndex(self):
+        # Sorting 100k+ names takes a while, so the index is built here and replaces the GUI thread one when done
+        self.completionTimer.stop()
+        self.pendingObjects = { }
+        self.completionIndex = CompletionIndex(self.completionSchemas, self.completionObjects.values())
+        self.completionIndexBuilt.emit(self.completionIndex)
+
+    @Slot()
+    def mergeCompletionObjects(self):
+        # Only the new names are sorted, the index built so far is merged with them in one pass
+        if self.completionIndex is None:
+            self.buildCompletionIndex()
+            return
+
+        oldEntries = [ entry for entries in self.pendingObjects.values() for entry in entries ]
+        newEntries = [ entry for key in self.pendingObjects for entry in self.completionObjects[key] ]
+        self.pendingObjects = { }
+        self.completionIndex = self.completionIndex.replacedObjects(oldEntries, newEntries)
+        self.completionIndexBuilt.emit(self.completionIndex)
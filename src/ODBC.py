@@ -3,7 +3,6 @@ from ctypes import (
         cdll,
         CDLL,
         POINTER,
-        windll,
         sizeof,
         c_ubyte,
         c_wchar,
@@ -20,7 +19,10 @@ from ctypes import (
         c_size_t,
         c_ssize_t,
         c_void_p,
-        c_wchar_p)
+        c_wchar_p,
+        Structure,
+        memmove,
+        string_at)
 
 class ODBC:
     SQL_FETCH_NEXT = 1
@@ -40,11 +42,12 @@ class ODBC:
     SQL_NULL_HDESC = None
 
     SQLCHAR = c_ubyte
+    SQLWCHAR = c_ushort                     # UTF-16 code unit, for both the Windows and the unixODBC Driver Manager
     SQLSMALLINT = c_short
-    SQLINTEGER = c_long
+    SQLINTEGER = c_int                      # 32 bits, also where long is 64 bits
 
     SQLUSMALLINT = c_ushort
-    SQLUINTEGER = c_ulong
+    SQLUINTEGER = c_uint
 
     SQLDOUBLE = c_double
     SQLFLOAT = c_double
@@ -67,10 +70,38 @@ class ODBC:
     SQLHSTMT = SQLHANDLE
     SQLHDESC = SQLHANDLE
 
+    class SQL_DATE_STRUCT(Structure):
+        _fields_ = [ ('year', c_short), ('month', c_ushort), ('day', c_ushort) ]
+
+    class SQL_TIME_STRUCT(Structure):
+        _fields_ = [ ('hour', c_ushort), ('minute', c_ushort), ('second', c_ushort) ]
+
+    class SQL_TIMESTAMP_STRUCT(Structure):
+        _fields_ = [ ('year', c_short), ('month', c_ushort), ('day', c_ushort), ('hour', c_ushort), ('minute', c_ushort), ('second', c_ushort),
+                ('fraction', c_uint) ]                  # nanoseconds
+
     odbcInst = None
     SQLAllocHandle = None
     SQLFreeHandle = None
     SQLDataSources = None
+    SQLDrivers = None
+    SQLCancel = None
+    SQLDriverConnect = None
+    SQLDisconnect = None
+    SQLSetConnectAttr = None
+    SQLExecDirect = None
+    SQLPrepare = None
+    SQLExecute = None
+    SQLNumResultCols = None
+    SQLDescribeCol = None
+    SQLRowCount = None
+    SQLSetStmtAttr = None
+    SQLBindCol = None
+    SQLFetchScroll = None
+    SQLGetData = None
+    SQLMoreResults = None
+    SQLFreeStmt = None
+    SQLGetDiagRec = None
 
     SQL_INVALID_HANDLE = -2
     SQL_ERROR = -1
@@ -98,10 +129,71 @@ class ODBC:
     SQL_CP_RELAXED_MATCH = 1
     SQL_CP_MATCH_DEFAULT = SQL_CP_STRICT_MATCH
 
+    SQL_ATTR_QUERY_TIMEOUT = 0
+
+    SQL_NTS = -3
+    SQL_NULL_DATA = -1
+    SQL_NO_TOTAL = -4
+    SQL_DRIVER_NOPROMPT = 0
+    SQL_MAX_MESSAGE_LENGTH = 512
+
+    SQL_ATTR_AUTOCOMMIT = 102
+    SQL_AUTOCOMMIT_OFF = 0
+    SQL_AUTOCOMMIT_ON = 1
+
+    SQL_ATTR_ROW_BIND_TYPE = 5
+    SQL_BIND_BY_COLUMN = 0
+    SQL_ATTR_ROW_STATUS_PTR = 25
+    SQL_ATTR_ROWS_FETCHED_PTR = 26
+    SQL_ATTR_ROW_ARRAY_SIZE = 27
+
+    SQL_CLOSE = 0
+    SQL_UNBIND = 2
+
+    # SQL data types
+    SQL_UNKNOWN_TYPE = 0
+    SQL_CHAR = 1
+    SQL_NUMERIC = 2
+    SQL_DECIMAL = 3
+    SQL_INTEGER = 4
+    SQL_SMALLINT = 5
+    SQL_FLOAT = 6
+    SQL_REAL = 7
+    SQL_DOUBLE = 8
+    SQL_VARCHAR = 12
+    SQL_TYPE_DATE = 91
+    SQL_TYPE_TIME = 92
+    SQL_TYPE_TIMESTAMP = 93
+    SQL_LONGVARCHAR = -1
+    SQL_BINARY = -2
+    SQL_VARBINARY = -3
+    SQL_LONGVARBINARY = -4
+    SQL_BIGINT = -5
+    SQL_TINYINT = -6
+    SQL_BIT = -7
+    SQL_WCHAR = -8
+    SQL_WVARCHAR = -9
+    SQL_WLONGVARCHAR = -10
+    SQL_GUID = -11
+
+    # C data types for SQLBindCol()
+    SQL_C_CHAR = SQL_CHAR
+    SQL_C_WCHAR = SQL_WCHAR
+    SQL_C_DOUBLE = SQL_DOUBLE
+    SQL_C_BIT = SQL_BIT
+    SQL_C_SBIGINT = SQL_BIGINT - 20         # SQL_SIGNED_OFFSET
+    SQL_C_BINARY = SQL_BINARY
+    SQL_C_TYPE_DATE = SQL_TYPE_DATE
+    SQL_C_TYPE_TIME = SQL_TYPE_TIME
+    SQL_C_TYPE_TIMESTAMP = SQL_TYPE_TIMESTAMP
+
     @classmethod
     def Init(cls):
+        # Loads the library on first use rather than at import, callers run Init() before the first API call
         if cls.odbcInst is None:
             if platform.system() == 'Windows':
+                from ctypes import windll           # only defined on Windows
+
                 cls.odbcInst = windll.odbc32
             else:
                 cls.odbcInst = CDLL('libodbc.so.2')
@@ -128,17 +220,198 @@ class ODBC:
             #   (
             #       SQLHENV          environmentHandle,
             #       SQLUSMALLINT     direction,
-            #       SQLCHAR         *dataSourceNameBuffer,
+            #       SQLWCHAR        *dataSourceNameBuffer,
             #       SQLSMALLINT      dataSourceNameBufferSize,
             #       SQLSMALLINT     *dataSourceNameLength,
-            #       SQLCHAR         *descriptionBuffer,
+            #       SQLWCHAR        *descriptionBuffer,
             #       SQLSMALLINT      descriptionBufferSize,
             #       SQLSMALLINT     *descriptionLength
             #   )
 
             cls.SQLDataSources = cls.odbcInst.SQLDataSourcesW
-            cls.SQLDataSources.argtypes = [ cls.SQLHENV, cls.SQLUSMALLINT, c_wchar_p, cls.SQLSMALLINT, POINTER(cls.SQLSMALLINT),
-                                           c_wchar_p, cls.SQLSMALLINT, POINTER(cls.SQLSMALLINT) ]
+            cls.SQLDataSources.argtypes = [ cls.SQLHENV, cls.SQLUSMALLINT, POINTER(cls.SQLWCHAR), cls.SQLSMALLINT, POINTER(cls.SQLSMALLINT),
+                                           POINTER(cls.SQLWCHAR), cls.SQLSMALLINT, POINTER(cls.SQLSMALLINT) ]
             cls.SQLDataSources.restype = cls.SQLRETURN
 
-ODBC.Init()
+            # SQLRETURN SQL_API SQLDriversW
+            #   (
+            #       SQLHENV          environmentHandle,
+            #       SQLUSMALLINT     direction,
+            #       SQLWCHAR        *driverDescription,
+            #       SQLSMALLINT      bufferLength1,
+            #       SQLSMALLINT     *descriptionLengthPtr,
+            #       SQLWCHAR        *driverAttributes,
+            #       SQLSMALLINT      bufferLength2,
+            #       SQLSMALLINT     *attributesLengthPtr
+            #   )
+
+            cls.SQLDrivers = cls.odbcInst.SQLDriversW
+            cls.SQLDrivers.argtypes = [ cls.SQLHENV, cls.SQLUSMALLINT, POINTER(cls.SQLWCHAR), cls.SQLSMALLINT, POINTER(cls.SQLSMALLINT),
+                                       POINTER(cls.SQLWCHAR), cls.SQLSMALLINT, POINTER(cls.SQLSMALLINT) ]
+            cls.SQLDrivers.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLCancel(SQLHSTMT statementHandle);
+
+            cls.SQLCancel = cls.odbcInst.SQLCancel
+            cls.SQLCancel.argtypes = [ cls.SQLHSTMT ]
+            cls.SQLCancel.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLDriverConnectW
+            #   (
+            #       SQLHDBC          connectionHandle,
+            #       SQLHWND          windowHandle,
+            #       SQLWCHAR        *inConnectionString,
+            #       SQLSMALLINT      stringLength1,
+            #       SQLWCHAR        *outConnectionString,
+            #       SQLSMALLINT      bufferLength,
+            #       SQLSMALLINT     *stringLength2Ptr,
+            #       SQLUSMALLINT     driverCompletion
+            #   )
+
+            cls.SQLDriverConnect = cls.odbcInst.SQLDriverConnectW
+            cls.SQLDriverConnect.argtypes = [ cls.SQLHDBC, cls.SQLPOINTER, POINTER(cls.SQLWCHAR), cls.SQLSMALLINT, POINTER(cls.SQLWCHAR), cls.SQLSMALLINT,
+                                             POINTER(cls.SQLSMALLINT), cls.SQLUSMALLINT ]
+            cls.SQLDriverConnect.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLDisconnect(SQLHDBC connectionHandle);
+
+            cls.SQLDisconnect = cls.odbcInst.SQLDisconnect
+            cls.SQLDisconnect.argtypes = [ cls.SQLHDBC ]
+            cls.SQLDisconnect.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLSetConnectAttrW(SQLHDBC connectionHandle, SQLINTEGER attribute, SQLPOINTER valuePtr, SQLINTEGER stringLength);
+
+            cls.SQLSetConnectAttr = cls.odbcInst.SQLSetConnectAttrW
+            cls.SQLSetConnectAttr.argtypes = [ cls.SQLHDBC, cls.SQLINTEGER, cls.SQLPOINTER, cls.SQLINTEGER ]
+            cls.SQLSetConnectAttr.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLExecDirectW(SQLHSTMT statementHandle, SQLWCHAR *statementText, SQLINTEGER textLength);
+
+            cls.SQLExecDirect = cls.odbcInst.SQLExecDirectW
+            cls.SQLExecDirect.argtypes = [ cls.SQLHSTMT, POINTER(cls.SQLWCHAR), cls.SQLINTEGER ]
+            cls.SQLExecDirect.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLPrepareW(SQLHSTMT statementHandle, SQLWCHAR *statementText, SQLINTEGER textLength);
+
+            cls.SQLPrepare = cls.odbcInst.SQLPrepareW
+            cls.SQLPrepare.argtypes = [ cls.SQLHSTMT, POINTER(cls.SQLWCHAR), cls.SQLINTEGER ]
+            cls.SQLPrepare.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLExecute(SQLHSTMT statementHandle);
+
+            cls.SQLExecute = cls.odbcInst.SQLExecute
+            cls.SQLExecute.argtypes = [ cls.SQLHSTMT ]
+            cls.SQLExecute.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLNumResultCols(SQLHSTMT statementHandle, SQLSMALLINT *columnCountPtr);
+
+            cls.SQLNumResultCols = cls.odbcInst.SQLNumResultCols
+            cls.SQLNumResultCols.argtypes = [ cls.SQLHSTMT, POINTER(cls.SQLSMALLINT) ]
+            cls.SQLNumResultCols.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLDescribeColW
+            #   (
+            #       SQLHSTMT         statementHandle,
+            #       SQLUSMALLINT     columnNumber,
+            #       SQLWCHAR        *columnName,
+            #       SQLSMALLINT      bufferLength,
+            #       SQLSMALLINT     *nameLengthPtr,
+            #       SQLSMALLINT     *dataTypePtr,
+            #       SQLULEN         *columnSizePtr,
+            #       SQLSMALLINT     *decimalDigitsPtr,
+            #       SQLSMALLINT     *nullablePtr
+            #   )
+
+            cls.SQLDescribeCol = cls.odbcInst.SQLDescribeColW
+            cls.SQLDescribeCol.argtypes = [ cls.SQLHSTMT, cls.SQLUSMALLINT, POINTER(cls.SQLWCHAR), cls.SQLSMALLINT, POINTER(cls.SQLSMALLINT), POINTER(cls.SQLSMALLINT),
+                                           POINTER(cls.SQLULEN), POINTER(cls.SQLSMALLINT), POINTER(cls.SQLSMALLINT) ]
+            cls.SQLDescribeCol.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLRowCount(SQLHSTMT statementHandle, SQLLEN *rowCountPtr);
+
+            cls.SQLRowCount = cls.odbcInst.SQLRowCount
+            cls.SQLRowCount.argtypes = [ cls.SQLHSTMT, POINTER(cls.SQLLEN) ]
+            cls.SQLRowCount.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLSetStmtAttrW(SQLHSTMT statementHandle, SQLINTEGER attribute, SQLPOINTER valuePtr, SQLINTEGER stringLength);
+
+            cls.SQLSetStmtAttr = cls.odbcInst.SQLSetStmtAttrW
+            cls.SQLSetStmtAttr.argtypes = [ cls.SQLHSTMT, cls.SQLINTEGER, cls.SQLPOINTER, cls.SQLINTEGER ]
+            cls.SQLSetStmtAttr.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLBindCol
+            #   (
+            #       SQLHSTMT         statementHandle,
+            #       SQLUSMALLINT     columnNumber,
+            #       SQLSMALLINT      targetType,
+            #       SQLPOINTER       targetValuePtr,
+            #       SQLLEN           bufferLength,
+            #       SQLLEN          *strLen_or_IndPtr
+            #   )
+
+            cls.SQLBindCol = cls.odbcInst.SQLBindCol
+            cls.SQLBindCol.argtypes = [ cls.SQLHSTMT, cls.SQLUSMALLINT, cls.SQLSMALLINT, cls.SQLPOINTER, cls.SQLLEN, POINTER(cls.SQLLEN) ]
+            cls.SQLBindCol.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLFetchScroll(SQLHSTMT statementHandle, SQLSMALLINT fetchOrientation, SQLLEN fetchOffset);
+
+            cls.SQLFetchScroll = cls.odbcInst.SQLFetchScroll
+            cls.SQLFetchScroll.argtypes = [ cls.SQLHSTMT, cls.SQLSMALLINT, cls.SQLLEN ]
+            cls.SQLFetchScroll.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLGetData
+            #   (
+            #       SQLHSTMT         statementHandle,
+            #       SQLUSMALLINT     columnNumber,
+            #       SQLSMALLINT      targetType,
+            #       SQLPOINTER       targetValuePtr,
+            #       SQLLEN           bufferLength,
+            #       SQLLEN          *strLen_or_IndPtr
+            #   )
+
+            cls.SQLGetData = cls.odbcInst.SQLGetData
+            cls.SQLGetData.argtypes = [ cls.SQLHSTMT, cls.SQLUSMALLINT, cls.SQLSMALLINT, cls.SQLPOINTER, cls.SQLLEN, POINTER(cls.SQLLEN) ]
+            cls.SQLGetData.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLMoreResults(SQLHSTMT statementHandle);
+
+            cls.SQLMoreResults = cls.odbcInst.SQLMoreResults
+            cls.SQLMoreResults.argtypes = [ cls.SQLHSTMT ]
+            cls.SQLMoreResults.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLFreeStmt(SQLHSTMT statementHandle, SQLUSMALLINT option);
+
+            cls.SQLFreeStmt = cls.odbcInst.SQLFreeStmt
+            cls.SQLFreeStmt.argtypes = [ cls.SQLHSTMT, cls.SQLUSMALLINT ]
+            cls.SQLFreeStmt.restype = cls.SQLRETURN
+
+            # SQLRETURN SQL_API SQLGetDiagRecW
+            #   (
+            #       SQLSMALLINT      handleType,
+            #       SQLHANDLE        handle,
+            #       SQLSMALLINT      recNumber,
+            #       SQLWCHAR        *sqlState,
+            #       SQLINTEGER      *nativeErrorPtr,
+            #       SQLWCHAR        *messageText,
+            #       SQLSMALLINT      bufferLength,
+            #       SQLSMALLINT     *textLengthPtr
+            #   )
+
+            cls.SQLGetDiagRec = cls.odbcInst.SQLGetDiagRecW
+            cls.SQLGetDiagRec.argtypes = [ cls.SQLSMALLINT, cls.SQLHANDLE, cls.SQLSMALLINT, POINTER(cls.SQLWCHAR), POINTER(cls.SQLINTEGER), POINTER(cls.SQLWCHAR),
+                                          cls.SQLSMALLINT, POINTER(cls.SQLSMALLINT) ]
+            cls.SQLGetDiagRec.restype = cls.SQLRETURN
+
+    @classmethod
+    def wideString(cls, text):
+        # NUL terminated SQLWCHAR buffer, with the text as UTF-16 whatever the size of wchar_t
+        data = text.encode('utf-16-le', 'surrogatepass')
+        buffer = (cls.SQLWCHAR * (len(data) // 2 + 1))()
+        memmove(buffer, data, len(data))
+
+        return buffer
+
+    @classmethod
+    def fromWideString(cls, buffer, length):
+        return string_at(buffer, length * sizeof(cls.SQLWCHAR)).decode('utf-16-le', 'surrogatepass')
+
@@ -2,7 +2,6 @@ import platform
 from ctypes import (
         cdll,
         CDLL,
-        windll,
         c_bool,
         c_char,
         c_wchar,
@@ -42,8 +41,11 @@ class ODBCInst:
 
     @classmethod
     def Init(cls):
+        # Loads the library on first use rather than at import, callers run Init() before the first API call
         if cls.odbcInst is None:
             if platform.system() == 'Windows':
+                from ctypes import windll           # only defined on Windows
+
                 cls.odbcInst = windll.odbccp32
             else:
                 cls.odbcInst = CDLL('libodbcinst.so.2')
@@ -60,4 +62,3 @@ class ODBCInst:
             cls.SQLManageDataSources.argtypes = [ c_void_p ]
             cls.SQLManageDataSources.restype = c_int
 
-ODBCInst.Init()
@@ -0,0 +1,75 @@
+import sqlite3, time
+
+class QueryStatistics:
+    # Timings of one query, filled in by the query worker and completed with the render time on the GUI thread
+    def __init__(self, queryText):
+        self.queryText = queryText
+        self.started = time.time()
+        self.startTime = time.perf_counter()
+        self.executeTime = 0.0              # seconds in SQLExecute(), mostly server time
+        self.firstRowTime = None            # seconds from execute to the first block of rows
+        self.fetchTime = 0.0                # seconds in fetch calls, network and driver time
+        self.renderTime = 0.0               # seconds updating the result model and view
+        self.rowCount = 0                   # rows fetched, or affected by a statement without a result
+        self.byteCount = 0                  # size of the fetched rows in the result store
+        self.batchCount = 0                 # fetch calls
+        self.errorMessage = ''
+        self.cached = False
+
+    def summary(self):
+        if self.cached:
+            return 'From cache, render {:.3f} s, {:,} rows, {:,} bytes'.format(self.renderTime, self.rowCount, self.byteCount)
+
+        return 'Execute {:.3f} s, first row {}, fetch {:.3f} s in {:,} batches, render {:.3f} s, {:,} rows, {:,} bytes'.format(self.executeTime,
+                '-' if self.firstRowTime is None else '{:.3f} s'.format(self.firstRowTime), self.fetchTime, self.batchCount, self.renderTime, self.rowCount, self.byteCount)
+
+class QueryLog:
+    # Query history with timings, in an SQLite file next to the connection .ini file. Used on the GUI thread only
+    SCHEMA_VERSION = 1
+    COLUMNS = [ 'started', 'query_text', 'status', 'execute_time', 'first_row_time', 'fetch_time', 'render_time', 'row_count', 'byte_count', 'error_message' ]
+
+    def __init__(self, fileName):
+        self.db = sqlite3.connect(fileName)
+
+        with self.db:
+            version = self.db.execute('PRAGMA user_version').fetchone()[0]
+
+            if version != QueryLog.SCHEMA_VERSION:
+                self.db.execute('DROP TABLE IF EXISTS query_log')
+
+            self.db.execute('PRAGMA journal_mode = WAL')
+            self.db.execute('PRAGMA synchronous = NORMAL')
+            self.db.executescript('''
+                CREATE TABLE IF NOT EXISTS query_log(id INTEGER PRIMARY KEY, started REAL, query_text TEXT, status TEXT, execute_time REAL,
+                        first_row_time REAL, fetch_time REAL, render_time REAL, row_count INTEGER, byte_count INTEGER, error_message TEXT);
+                CREATE INDEX IF NOT EXISTS query_log_started ON query_log(started);
+                CREATE INDEX IF NOT EXISTS query_log_query ON query_log(query_text, started);''')
+            self.db.execute('PRAGMA user_version = {}'.format(QueryLog.SCHEMA_VERSION))
+
+    @staticmethod
+    def values(statistics):
+        status = 'error' if statistics.errorMessage else 'cached' if statistics.cached else 'ok'
+
+        return [ statistics.started, statistics.queryText, status, statistics.executeTime, statistics.firstRowTime, statistics.fetchTime,
+                statistics.renderTime, statistics.rowCount, statistics.byteCount, statistics.errorMessage ]
+
+    def add(self, statistics):
+        # Returns the id of the new entry, for update() when more rows are fetched
+        with self.db:
+            return self.db.execute('INSERT INTO query_log({}) VALUES ({})'.format(', '.join(QueryLog.COLUMNS), ', '.join('?' for col in QueryLog.COLUMNS)),
+                    QueryLog.values(statistics)).lastrowid
+
+    def update(self, entryId, statistics):
+        with self.db:
+            self.db.execute('UPDATE query_log SET {} WHERE id = ?'.format(', '.join(col + ' = ?' for col in QueryLog.COLUMNS)),
+                    QueryLog.values(statistics) + [ entryId ])
+
+    def search(self, text, limit = 1000):
+        # Most recent entries first, with the query text containing text
+        pattern = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+        return self.db.execute("SELECT {} FROM query_log WHERE query_text LIKE ? ESCAPE '\\' ORDER BY started DESC LIMIT ?".format(', '.join(QueryLog.COLUMNS)),
+                (pattern, limit)).fetchall()
+
+    def close(self):
+        self.db.close()
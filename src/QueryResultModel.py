@@ -0,0 +1,77 @@
+from PySide6.QtCore import (
+        Qt,
+        Signal,
+        QModelIndex,
+        QAbstractTableModel)
+
+class QueryResultModel(QAbstractTableModel):
+    FETCH_BATCH_SIZE = 256                  # rows requested each time the view scrolls to the end
+
+    fetchRequested = Signal(int, int, int)  # query id, result set, row count
+    chunkAppended = Signal(int, int)        # query id, result set, acknowledges each chunk to the worker, which sends no more than a few ahead
+
+    def __init__(self, queryId, resultStore, parent = None, resultSet = 0):
+        super().__init__(parent)
+
+        self.queryId = queryId
+        self.resultSet = resultSet          # index in the results of a batch or procedure
+        self.resultStore = resultStore
+        self.fetchedAll = False
+        self.fetchPending = True            # the worker sends the first batch right after execute
+        self.deferred = False               # no rows are fetched before fetchDeferred(), views fetch more even when hidden
+
+    def rowCount(self, parent = QModelIndex()):
+        if parent.isValid():
+            return 0
+
+        return self.resultStore.rowCount
+
+    def columnCount(self, parent = QModelIndex()):
+        if parent.isValid():
+            return 0
+
+        return len(self.resultStore.columnNames)
+
+    def headerData(self, section, orientation, role = Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+
+        if orientation == Qt.Horizontal:
+            return self.resultStore.columnNames[section]
+
+        return str(section + 1)
+
+    def data(self, index, role = Qt.DisplayRole):
+        # Display text is only built here, when the view asks for a cell it is about to paint
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+
+        return self.resultStore.formatValue(index.row(), index.column())
+
+    def canFetchMore(self, parent = QModelIndex()):
+        return not parent.isValid() and not self.fetchedAll and not self.fetchPending and not self.deferred
+
+    def fetchMore(self, parent = QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+
+        self.fetchPending = True
+        self.fetchRequested.emit(self.queryId, self.resultSet, QueryResultModel.FETCH_BATCH_SIZE)
+
+    def fetchDeferred(self):
+        if self.deferred:
+            self.deferred = False
+            self.fetchMore()
+
+    def appendChunk(self, resultChunk, fetchedAll):
+        self.fetchPending = False
+        self.fetchedAll = fetchedAll
+
+        if resultChunk.rowCount:
+            firstRow = self.resultStore.rowCount
+
+            self.beginInsertRows(QModelIndex(), firstRow, firstRow + resultChunk.rowCount - 1)
+            self.resultStore.appendChunk(resultChunk)
+            self.endInsertRows()
+
+        self.chunkAppended.emit(self.queryId, self.resultSet)
@@ -0,0 +1,401 @@
+import threading, time, copy
+import pyodbc
+
+from PySide6.QtCore import (
+        QObject,
+        Signal,
+        Slot)
+
+from src.BulkFetch import BulkFetch, BulkFetchError, BulkFetchUnsupported
+from src.ConnectionPool import ConnectionPoolError
+from src.FetchPipeline import FetchPipeline
+from src.QueryLog import QueryStatistics
+from src.ResultStore import ResultStore
+from src.StatementCache import StatementCache
+
+class QueryWorker(QObject):
+    FETCH_BATCH_SIZE = 256
+    SESSION_IDLE_TIMEOUT = 300              # seconds without a query before the session goes back to the pool
+
+    executeRequested = Signal(int, str, object)         # query id, query text, parameter values, emitted on the GUI thread
+    scriptRequested = Signal(int, object, bool)         # query id, SQLStatement list, stop on error
+    skipRequested = Signal(int, int)                    # query id, result set, emitted on the GUI thread
+    closeRequested = Signal(int)                        # query id, emitted on the GUI thread after cancel()
+    idleCheckRequested = Signal()                       # emitted on the GUI thread from time to time
+
+    resultReady = Signal(int, int, object)  # query id, result set, ResultStore for the new result
+    rowsReady = Signal(int, int, object, bool)          # query id, result set, ResultChunk with the next rows, all rows fetched
+    batchFetched = Signal(int, object)      # query id, FetchMetrics of the rows of the next rowsReady
+    messagesReady = Signal(int, object)     # query id, [ msgType, msgLine ] pairs
+    rowCountReady = Signal(int, int, int)   # query id, result set, row count of a statement without a result in a batch or procedure
+    resultSetSkipped = Signal(int, int)     # query id, result set left before all of its rows were fetched
+    resultsFinished = Signal(int)           # query id, the last result set has been fetched or skipped
+    queryFinished = Signal(int, int)        # query id, row count for statements without a result
+    queryFailed = Signal(int, str)          # query id, error message
+    statementCacheUsed = Signal(int, bool, int, int)    # query id, cache hit, total hits, total misses
+    statisticsReady = Signal(int, object)   # query id, QueryStatistics copy, emitted before the result, rows, finish or failure signal
+
+    statementStarted = Signal(int, int)     # query id, statement index in the script
+    statementFinished = Signal(int, int, int, str, str, int, float)    # query id, statement index, line number, statement summary,
+                                                                        #   error message (empty on success), row count, elapsed seconds
+    scriptFinished = Signal(int, int, int, int, float)                  # query id, statement count, statements run, errors, elapsed seconds
+
+    def __init__(self, connectionPool):
+        super().__init__()
+
+        self.connectionPool = connectionPool
+        self.session = None                 # pooled connection, checked out on the worker thread with the first query
+        self.lastUseTime = time.monotonic() # of the session, it is returned to the pool after SESSION_IDLE_TIMEOUT
+        self.useBulkFetch = False           # set from the GUI thread, run queries through the ctypes bulk fetch engine
+        self.bulkFetch = None
+        self.bulkCursor = False             # self.cursor is a BulkStatement
+        self.spillDirectory = None          # results larger than memoryBudget spill to a temporary file there
+        self.memoryBudget = ResultStore.MEMORY_BUDGET
+        self.statementCache = StatementCache()  # prepared statements for parameterized queries on the session
+        self.cursor = None
+        self.pipeline = None                # FetchPipeline of the current result
+        self.resultStore = None
+        self.resultSet = 0                  # index of the result set the cursor is on, in the results of a batch or procedure
+        self.statistics = None
+        self.queryId = 0
+        self.cancelled = False
+        self.cursorLock = threading.Lock()  # cancel() is called from the GUI thread while the worker thread executes
+
+        self.executeRequested.connect(self.execute)
+        self.scriptRequested.connect(self.executeScript)
+        self.skipRequested.connect(self.skipResultSet)
+        self.closeRequested.connect(self.closeResults)
+        self.idleCheckRequested.connect(self.releaseIdleSession)
+
+    def connection(self):
+        if self.session is None:
+            self.session = self.connectionPool.checkout()
+
+        return self.session.connection
+
+    def checkConnectionError(self, ex):
+        # SQLSTATE class 08 is a connection exception, the next query gets a new connection from the pool
+        if isinstance(ex, pyodbc.Error) and ex.args and str(ex.args[0]).startswith('08') and self.session:
+            self.statementCache.clear()
+            self.session.discard()
+            self.session = None
+
+    @Slot()
+    def releaseIdleSession(self):
+        # Tabs left alone give their connection back, so the pool does not fill up with one session per tab. A session
+        # with results open or a transaction begun (autocommit off) is kept; its temporary tables and SET options are
+        # lost, as with the connection lost on a network error
+        session = self.session
+
+        if session and self.cursor is None and time.monotonic() - self.lastUseTime > QueryWorker.SESSION_IDLE_TIMEOUT:
+            try:
+                if not session.connection.autocommit:
+                    return
+            except pyodbc.Error:
+                pass
+
+            self.statementCache.clear()
+            self.session = None
+            session.release()
+
+    def releaseSession(self):
+        # Called after the worker thread has finished
+        self.closeCursor()
+        self.statementCache.clear()
+
+        if self.session:
+            self.session.release()
+            self.session = None
+
+        if self.bulkFetch:
+            self.bulkFetch.close()
+            self.bulkFetch = None
+
+    def executeBulk(self, queryId, queryStr):
+        # Returns False, before the statement runs, if it has no result set or its columns can not be bound, for the query
+        # to run through pyodbc on the session connection instead
+        if self.bulkFetch is None:
+            self.bulkFetch = BulkFetch(self.connectionPool.connectionString, self.connectionPool.kwArgs)
+
+        try:
+            statement = self.bulkFetch.execute(queryStr)
+        except BulkFetchUnsupported as ex:
+            print('Bulk fetch not used: ' + str(ex))
+            return False
+
+        self.statistics.executeTime = time.perf_counter() - self.statistics.startTime
+
+        with self.cursorLock:
+            self.cursor = statement
+            self.bulkCursor = True
+
+        if self.openResultSet(queryId):
+            self.fetch(queryId, self.resultSet, statement.rowArraySize)
+
+        return True
+
+    def closeCursor(self):
+        with self.cursorLock:
+            cursor = self.cursor
+            self.cursor = None
+            self.bulkCursor = False
+            self.pipeline = None
+            self.lastUseTime = time.monotonic()
+
+        if cursor and self.statementCache.contains(cursor):
+            self.statementCache.release(cursor)
+        elif cursor:
+            cursor.close()
+
+    @Slot(int, str, object)
+    def execute(self, queryId, queryStr, parameters):
+        self.closeCursor()              # release any pending rows on the connection before the next statement
+
+        self.queryId = queryId
+        self.cancelled = False
+        self.statistics = QueryStatistics(queryStr)
+        self.resultStore = None
+        self.resultSet = 0
+
+        try:
+            if self.useBulkFetch and not parameters and BulkFetch.available() and self.executeBulk(queryId, queryStr):
+                return
+
+            if parameters:
+                queryStr, cursor, cacheHit = self.statementCache.statement(self.connection(), queryStr)
+                self.statementCacheUsed.emit(queryId, cacheHit, self.statementCache.hits, self.statementCache.misses)
+            else:
+                cursor = self.connection().cursor()
+
+            with self.cursorLock:
+                self.cursor = cursor
+
+            self.statistics.startTime = time.perf_counter()
+
+            if parameters:
+                cursor.execute(queryStr, *parameters)
+            else:
+                cursor.execute(queryStr)
+
+            self.statistics.executeTime = time.perf_counter() - self.statistics.startTime
+
+            if self.openResultSet(queryId):
+                self.fetch(queryId, self.resultSet, QueryWorker.FETCH_BATCH_SIZE)
+        except (pyodbc.Error, ConnectionPoolError, BulkFetchError) as ex:
+            self.closeCursor()
+            self.checkConnectionError(ex)
+            self.failStatistics(queryId, ex)
+            self.queryFailed.emit(queryId, str(ex))
+
+    def failStatistics(self, queryId, ex):
+        self.statistics.errorMessage = str(ex)
+
+        if not self.statistics.executeTime:
+            self.statistics.executeTime = time.perf_counter() - self.statistics.startTime
+
+        self.statisticsReady.emit(queryId, copy.copy(self.statistics))
+
+    def openResultSet(self, queryId):
+        # Moves the cursor on to the first result set with columns, from the result it is on. The row counts of the statements
+        # without a result on the way are sent to the Output tab, a single statement without a result finishes the query.
+        # Returns True with the ResultStore and FetchPipeline of the result set ready for fetching
+        cursor = self.cursor
+
+        while True:
+            if cursor.messages:
+                self.messagesReady.emit(queryId, [ [ msgType, msgLine ] for [ msgType, msgLine ] in cursor.messages ])
+
+            if cursor.description:
+                break
+
+            rowCount = cursor.rowcount
+            moreResults = cursor.nextset()
+
+            if moreResults or self.resultSet:
+                self.rowCountReady.emit(queryId, self.resultSet, rowCount)
+
+            if not moreResults:
+                if self.resultStore is None:
+                    self.statistics.rowCount = rowCount
+                    self.statisticsReady.emit(queryId, copy.copy(self.statistics))
+                    self.queryFinished.emit(queryId, rowCount)
+                else:
+                    self.resultsFinished.emit(queryId)
+
+                self.closeCursor()
+                return False
+
+            self.resultSet += 1
+
+        # Rows of the result sets after the first are only fetched when the result model asks for them
+        self.resultStore = ResultStore(cursor.description, self.spillDirectory, self.memoryBudget)
+
+        if self.bulkCursor:
+            self.pipeline = FetchPipeline(cursor, bulk = True)
+        else:
+            self.pipeline = FetchPipeline(cursor, self.resultStore.newChunk, batchSize = QueryWorker.FETCH_BATCH_SIZE)
+
+        self.resultReady.emit(queryId, self.resultSet, self.resultStore)
+
+        return True
+
+    def nextResultSet(self, queryId):
+        # Called when the rows of the current result set have all been fetched, or to skip the rest of them
+        try:
+            if self.cursor.nextset():
+                self.resultSet += 1
+                self.openResultSet(queryId)
+            else:
+                self.closeCursor()
+                self.resultsFinished.emit(queryId)
+        except (pyodbc.Error, BulkFetchError) as ex:
+            self.closeCursor()
+            self.checkConnectionError(ex)
+            self.failStatistics(queryId, ex)
+            self.queryFailed.emit(queryId, str(ex))
+
+    @Slot(int, int, int)
+    def fetch(self, queryId, resultSet, count):
+        if queryId != self.queryId or resultSet != self.resultSet or not self.pipeline:
+            return
+
+        self.pipeline.request(count)
+        self.fetchRows(queryId)
+
+    @Slot(int, int)
+    def consumeRows(self, queryId, resultSet):
+        if queryId == self.queryId and resultSet == self.resultSet and self.pipeline:
+            self.pipeline.consumed()
+            self.fetchRows(queryId)
+
+    @Slot(int, int)
+    def skipResultSet(self, queryId, resultSet):
+        # The rows not fetched yet are left to the driver, which discards them when moving to the next result
+        if queryId == self.queryId and resultSet == self.resultSet and self.pipeline:
+            self.pipeline = None
+            self.resultSetSkipped.emit(queryId, resultSet)
+            self.nextResultSet(queryId)
+
+    def fetchRows(self, queryId):
+        # Batches are fetched while rows are requested and the GUI thread keeps up with the ones sent
+        pipeline = self.pipeline
+
+        while pipeline is self.pipeline and pipeline.wanted():
+            if self.cancelled:
+                self.closeResults(queryId)
+                return
+
+            try:
+                resultChunk, metrics = pipeline.fetchBatch()
+            except (pyodbc.Error, BulkFetchError) as ex:
+                self.closeCursor()
+                self.checkConnectionError(ex)
+                self.failStatistics(queryId, ex)
+                self.queryFailed.emit(queryId, str(ex))
+                return
+
+            fetchedAll = pipeline.fetchedAll
+            statistics = self.statistics
+            statistics.fetchTime += metrics.fetchTime
+            statistics.rowCount += metrics.rowCount
+            statistics.byteCount += metrics.byteCount
+            statistics.batchCount += 1
+
+            if statistics.firstRowTime is None:
+                statistics.firstRowTime = time.perf_counter() - statistics.startTime
+
+            self.batchFetched.emit(queryId, metrics)
+            self.statisticsReady.emit(queryId, copy.copy(statistics))
+            self.rowsReady.emit(queryId, self.resultSet, resultChunk, fetchedAll)
+
+            if fetchedAll:
+                self.nextResultSet(queryId)
+
+    @Slot(int)
+    def closeResults(self, queryId):
+        # Cancelled between two fetches, while the rows sent so far are shown or scrolled, SQLCancel() has no effect then
+        if queryId == self.queryId and self.cancelled and self.cursor:
+            self.closeCursor()
+            self.failStatistics(queryId, 'Query cancelled')
+            self.queryFailed.emit(queryId, 'Query cancelled')
+
+    def executeStatement(self, statement):
+        # Runs one script statement to completion, returns the number of rows fetched or affected
+        cursor = self.connection().cursor()
+
+        with self.cursorLock:
+            self.cursor = cursor
+
+        try:
+            cursor.execute(statement.text)
+
+            if cursor.messages:
+                self.messagesReady.emit(self.queryId, [ [ msgType, msgLine ] for [ msgType, msgLine ] in cursor.messages ])
+
+            if cursor.description:
+                rowCount = 0
+
+                for rows, metrics in FetchPipeline(cursor, batchSize = QueryWorker.FETCH_BATCH_SIZE).batches():
+                    rowCount += metrics.rowCount
+
+                    if self.cancelled:
+                        break
+
+                return rowCount
+
+            return cursor.rowcount
+        finally:
+            self.closeCursor()
+
+    @Slot(int, object, bool)
+    def executeScript(self, queryId, statements, stopOnError):
+        self.closeCursor()
+
+        self.queryId = queryId
+        self.cancelled = False
+
+        scriptStart = time.perf_counter()
+        statementCount = 0
+        errorCount = 0
+
+        for index, statement in enumerate(statements):
+            if self.cancelled:
+                break
+
+            self.statementStarted.emit(queryId, index)
+            statementCount += 1
+
+            for repeat in range(statement.repeatCount):
+                start = time.perf_counter()
+
+                try:
+                    rowCount = self.executeStatement(statement)
+                    errorMessage = ''
+                except (pyodbc.Error, ConnectionPoolError) as ex:
+                    rowCount = -1
+                    errorMessage = str(ex)
+                    errorCount += 1
+                    self.checkConnectionError(ex)
+
+                self.statementFinished.emit(queryId, index, statement.lineNumber, statement.summary(), errorMessage, rowCount, time.perf_counter() - start)
+
+                if errorMessage or self.cancelled:
+                    break
+
+            if errorMessage and stopOnError:
+                break
+
+        self.scriptFinished.emit(queryId, len(statements), statementCount, errorCount, time.perf_counter() - scriptStart)
+
+    def cancel(self):
+        # Runs on the GUI thread, pyodbc Cursor.cancel() calls SQLCancel() on the statement handle
+        self.cancelled = True
+
+        with self.cursorLock:
+            cursor = self.cursor
+
+        if cursor:
+            try:
+                cursor.cancel()
+            except (pyodbc.Error, BulkFetchError) as ex:
+                print('Error cancelling query: ' + str(ex))
@@ -0,0 +1,77 @@
+import collections, time, weakref
+
+class ResultCache:
+    # Complete results of read-only queries, one cache per connection pool (data source and credentials),
+    # shared by the windows of the pool. Used on the GUI thread only
+    MEMORY_BUDGET = 64 * 1024 * 1024        # bytes of cached ResultStores, in memory and spilled
+    TTL = 300                               # seconds a result is served from the cache
+
+    caches = { }
+    sharedStores = weakref.WeakSet()        # stores that were cached, they may still be shown in other windows after eviction
+
+    @classmethod
+    def forPool(cls, connectionPool):
+        if not connectionPool in cls.caches:
+            cls.caches[connectionPool] = ResultCache()
+
+        return cls.caches[connectionPool]
+
+    @classmethod
+    def isShared(cls, resultStore):
+        # Shared stores are not closed with the result model, their spill file is closed when the last reference goes
+        return resultStore in cls.sharedStores
+
+    def __init__(self, memoryBudget = MEMORY_BUDGET, ttl = TTL):
+        self.memoryBudget = memoryBudget
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()            # key: [ ResultStore, time stored, size ], least recently used first
+        self.size = 0
+        self.generation = 0                 # incremented by invalidate(), results of queries started before are not stored
+
+    def lookup(self, key):
+        # Returns the ResultStore and its age in seconds, or None
+        entry = self.entries.get(key)
+
+        if entry is None:
+            return None
+
+        age = time.monotonic() - entry[1]
+
+        if age > self.ttl:
+            self.remove(key)
+            return None
+
+        self.entries.move_to_end(key)
+
+        return entry[0], age
+
+    def store(self, key, resultStore, generation):
+        if generation != self.generation or self.ttl <= 0:
+            return False
+
+        size = resultStore.memorySize() + resultStore.spilledSize()
+
+        if size > self.memoryBudget:
+            return False
+
+        if key in self.entries:
+            self.remove(key)
+
+        while self.entries and self.size + size > self.memoryBudget:
+            self.remove(next(iter(self.entries)))
+
+        self.entries[key] = [ resultStore, time.monotonic(), size ]
+        self.size += size
+        ResultCache.sharedStores.add(resultStore)
+
+        return True
+
+    def remove(self, key):
+        resultStore, storeTime, size = self.entries.pop(key)
+        self.size -= size
+
+    def invalidate(self):
+        # A statement that may change data or schema ran on the data source
+        self.entries.clear()
+        self.size = 0
+        self.generation += 1
@@ -0,0 +1,209 @@
+import csv, json, time, datetime, decimal
+import pyodbc
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from PySide6.QtCore import (
+        QObject,
+        Signal,
+        Slot)
+
+from src.ConnectionPool import ConnectionPoolError
+from src.FetchPipeline import FetchPipeline
+
+class CsvWriter:
+    def __init__(self, fileName, delimiter = ','):
+        self.file = open(fileName, 'w', newline = '', encoding = 'utf-8-sig')      # BOM for spreadsheet applications
+        self.writer = csv.writer(self.file, delimiter = delimiter)
+
+    def writeHeader(self, description):
+        self.writer.writerow([ col[0] for col in description ])
+
+    def writeRows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+def jsonValue(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+
+    return str(value)                       # Decimal kept exact, dates in ISO format
+
+class JsonLinesWriter:
+    def __init__(self, fileName):
+        self.file = open(fileName, 'w', encoding = 'utf-8')
+
+    def writeHeader(self, description):
+        self.columnNames = [ col[0] for col in description ]
+
+    def writeRows(self, rows):
+        columnNames = self.columnNames
+
+        self.file.writelines(json.dumps(dict(zip(columnNames, row)), default = jsonValue, ensure_ascii = False) + '\n' for row in rows)
+
+    def close(self):
+        self.file.close()
+
+def arrowType(col):
+    # Arrow type from a pyodbc description entry, so that columns stay typed even when the first rows are NULL
+    typeCode, precision, scale = col[1], col[4], col[5]
+
+    if typeCode is bool:
+        return pyarrow.bool_()
+
+    if typeCode is int:
+        return pyarrow.int64()
+
+    if typeCode is float:
+        return pyarrow.float64()
+
+    if typeCode is decimal.Decimal and precision and 0 < precision <= 38:
+        return pyarrow.decimal128(precision, scale or 0)
+
+    if typeCode is datetime.datetime:
+        return pyarrow.timestamp('us')
+
+    if typeCode is datetime.date:
+        return pyarrow.date32()
+
+    if typeCode is datetime.time:
+        return pyarrow.time64('us')
+
+    if typeCode is bytes or typeCode is bytearray:
+        return pyarrow.binary()
+
+    return pyarrow.string()
+
+class ArrowWriter:
+    # Parquet or Arrow IPC file, one row group / record batch per fetched batch of rows
+    def __init__(self, fileName, parquet = True):
+        self.fileName = fileName
+        self.parquet = parquet
+        self.writer = None
+
+    def writeHeader(self, description):
+        self.schema = pyarrow.schema([ (col[0], arrowType(col)) for col in description ])
+        self.textColumns = [ index for index, col in enumerate(description) if pyarrow.types.is_string(self.schema.field(index).type) ]
+
+        if self.parquet:
+            self.writer = pyarrow.parquet.ParquetWriter(self.fileName, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_file(self.fileName, self.schema)
+
+    def writeRows(self, rows):
+        columns = [ list(values) for values in zip(*rows) ]
+
+        for index in self.textColumns:
+            columns[index] = [ value if value is None or isinstance(value, str) else str(value) for value in columns[index] ]
+
+        self.writer.write_table(pyarrow.Table.from_arrays([ pyarrow.array(values, type = field.type) for values, field in zip(columns, self.schema) ],
+                schema = self.schema))
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+EXPORT_FORMATS = [ ]                        # [ name, file name filter, writer factory ]
+
+EXPORT_FORMATS.append([ 'CSV', '*.csv', lambda fileName: CsvWriter(fileName) ])
+EXPORT_FORMATS.append([ 'Tab separated', '*.tsv *.tab *.txt', lambda fileName: CsvWriter(fileName, '\t') ])
+EXPORT_FORMATS.append([ 'JSON Lines', '*.jsonl *.ndjson', lambda fileName: JsonLinesWriter(fileName) ])
+
+if pyarrow is not None:
+    EXPORT_FORMATS.append([ 'Parquet', '*.parquet', lambda fileName: ArrowWriter(fileName, True) ])
+    EXPORT_FORMATS.append([ 'Arrow IPC', '*.arrow *.feather', lambda fileName: ArrowWriter(fileName, False) ])
+
+class ExportWorker(QObject):
+    # Runs the query again on its own pooled connection and streams the rows to a file, a batch at a time
+    BATCH_SIZE = 10000                      # rows per writeRows() call, whatever the fetch batch size
+    PROGRESS_INTERVAL = 0.25                # seconds between progress signals
+
+    exportRequested = Signal()
+    exportProgress = Signal(int, float)     # rows written, elapsed seconds
+    exportFinished = Signal(int, float, bool)           # rows written, elapsed seconds, cancelled
+    exportFailed = Signal(str)
+
+    def __init__(self, connectionPool, queryStr, writer, parameters = None):
+        super().__init__()
+
+        self.connectionPool = connectionPool
+        self.queryStr = queryStr
+        self.parameters = parameters or [ ]
+        self.writer = writer
+        self.cursor = None
+        self.cancelled = False
+
+        self.exportRequested.connect(self.export)
+
+    @Slot()
+    def export(self):
+        start = time.perf_counter()
+        lastProgress = start
+        rowCount = 0
+
+        try:
+            with self.connectionPool.checkout() as connection:
+                self.cursor = connection.cursor()
+                self.cursor.execute(self.queryStr, *self.parameters)
+
+                if not self.cursor.description:
+                    raise pyodbc.ProgrammingError('The query returned no result set')
+
+                self.writer.writeHeader(self.cursor.description)
+                pendingRows = [ ]
+
+                for rows, metrics in FetchPipeline(self.cursor).batches():
+                    if self.cancelled:
+                        break
+
+                    pendingRows.extend(rows)
+
+                    if len(pendingRows) >= ExportWorker.BATCH_SIZE:
+                        self.writer.writeRows(pendingRows)
+                        rowCount += len(pendingRows)
+                        pendingRows = [ ]
+
+                    now = time.perf_counter()
+
+                    if now - lastProgress >= ExportWorker.PROGRESS_INTERVAL:
+                        lastProgress = now
+                        self.exportProgress.emit(rowCount, now - start)
+
+                if pendingRows and not self.cancelled:
+                    self.writer.writeRows(pendingRows)
+                    rowCount += len(pendingRows)
+
+                self.cursor.close()
+                self.cursor = None
+        except (pyodbc.Error, ConnectionPoolError, OSError, ValueError, TypeError) as ex:
+            # pyarrow conversion errors derive from ValueError and TypeError
+            self.cursor = None
+            self.writer.close()
+
+            if self.cancelled:
+                self.exportFinished.emit(rowCount, time.perf_counter() - start, True)     # SQLCancel() fails the running fetch
+            else:
+                self.exportFailed.emit(str(ex))
+
+            return
+
+        self.writer.close()
+        self.exportFinished.emit(rowCount, time.perf_counter() - start, self.cancelled)
+
+    def cancel(self):
+        # Runs on the GUI thread
+        self.cancelled = True
+        cursor = self.cursor
+
+        if cursor:
+            try:
+                cursor.cancel()
+            except pyodbc.Error as ex:
+                print('Error cancelling export: ' + str(ex))
@@ -0,0 +1,496 @@
+import array, datetime, struct, mmap, tempfile, collections
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+COLUMN_NUMERIC = 0
+COLUMN_TEXT = 1
+COLUMN_BINARY = 2
+
+# Spilled column: kind, array type code, row count, NULL bitmap size, values or offsets size, text data size
+COLUMN_HEADER = struct.Struct('<BBQQQQ')
+
+class ResultColumn:
+    def __init__(self):
+        self.nulls = bytearray()            # one bit per row, set for NULL values
+        self.count = 0
+
+    def isNull(self, row):
+        return self.nulls[row >> 3] & (1 << (row & 7))
+
+    def growNulls(self, count):
+        byteCount = (self.count + count + 7) >> 3
+
+        if len(self.nulls) < byteCount:
+            self.nulls.extend(bytes(byteCount - len(self.nulls)))
+
+    def setNull(self, row):
+        self.nulls[row >> 3] |= 1 << (row & 7)
+
+    def extendNulls(self, other):
+        self.growNulls(other.count)
+
+        if not self.count & 7:
+            self.nulls[self.count >> 3 : (self.count + other.count + 7) >> 3] = other.nulls[ : (other.count + 7) >> 3]
+        else:
+            for byteIndex, bits in enumerate(other.nulls[ : (other.count + 7) >> 3]):
+                if bits:
+                    for bit in range(8):
+                        if bits & (1 << bit):
+                            self.setNull(self.count + (byteIndex << 3) + bit)
+
+    def sliceNulls(self, start, count):
+        # NULL bitmap of rows start to start + count, shifted to begin at bit 0
+        if not start & 7:
+            nulls = self.nulls[start >> 3 : (start + count + 7) >> 3]
+
+            if count & 7 and len(nulls) > count >> 3:
+                nulls[count >> 3] &= (1 << (count & 7)) - 1        # rows after the slice
+
+            return nulls
+
+        bits = int.from_bytes(self.nulls[start >> 3 : ((start + count + 7) >> 3) + 1], 'little') >> (start & 7)
+
+        return bytearray((bits & ((1 << count) - 1)).to_bytes((count + 7) >> 3, 'little'))
+
+    def format(self, row):
+        if self.isNull(row):
+            return 'NULL'
+
+        return str(self.value(row))
+
+    def toText(self):
+        textColumn = TextColumn()
+        textColumn.append([ None if self.isNull(row) else str(self.value(row)) for row in range(self.count) ])
+
+        return textColumn
+
+class NumericColumn(ResultColumn):
+    # Fixed width values in a typed array, optionally stored with an offset from an epoch (dates and times)
+    def __init__(self, typeCode, encode = None, decode = None, numpyType = None):
+        super().__init__()
+
+        self.values = array.array(typeCode)
+        self.encode = encode
+        self.decode = decode
+        self.numpyType = numpyType
+
+    def newColumn(self):
+        return NumericColumn(self.values.typecode, self.encode, self.decode, self.numpyType)
+
+    def append(self, values):
+        self.growNulls(len(values))
+
+        encode = self.encode
+        encodedValues = array.array(self.values.typecode)
+
+        for index, value in enumerate(values):
+            if value is None:
+                self.setNull(self.count + index)
+                encodedValues.append(0)
+            else:
+                encodedValues.append(encode(value) if encode else value)
+
+        self.values.extend(encodedValues)
+        self.count += len(values)
+
+    def extend(self, other):
+        self.extendNulls(other)
+        self.values.extend(other.values)
+        self.count += other.count
+
+    def slice(self, start, count):
+        column = self.newColumn()
+        column.values = self.values[start : start + count]
+        column.nulls = self.sliceNulls(start, count)
+        column.count = count
+
+        return column
+
+    def appendBuffer(self, data, nulls, count):
+        # Values already encoded for the column type code and a NULL bitmap, as filled in by a bulk fetch
+        other = self.newColumn()
+        other.values.frombytes(data)
+        other.nulls = bytearray(nulls)
+        other.count = count
+
+        self.extend(other)
+
+    def value(self, row):
+        if self.isNull(row):
+            return None
+
+        if self.decode:
+            return self.decode(self.values[row])
+
+        return self.values[row]
+
+    def array(self):
+        if numpy is not None:
+            return numpy.frombuffer(self.values, dtype = self.numpyType or self.values.typecode)
+
+        return self.values
+
+    def memorySize(self):
+        return self.values.itemsize * len(self.values) + len(self.nulls)
+
+    def serialize(self):
+        values = memoryview(self.values).cast('B')
+
+        return [ COLUMN_HEADER.pack(COLUMN_NUMERIC, ord(self.values.typecode), self.count, len(self.nulls), len(values), 0), self.nulls, values ]
+
+class TextColumn(ResultColumn):
+    # Variable length values encoded back to back in a single buffer, with the end offset of each value
+    def __init__(self, isBinary = False):
+        super().__init__()
+
+        self.isBinary = isBinary
+        self.offsets = array.array('Q')
+        self.data = bytearray()
+
+    def newColumn(self):
+        return TextColumn(self.isBinary)
+
+    def append(self, values):
+        self.growNulls(len(values))
+
+        offsets = array.array('Q')
+        chunks = [ ]
+        offset = len(self.data)
+
+        for index, value in enumerate(values):
+            if value is None:
+                self.setNull(self.count + index)
+            else:
+                if self.isBinary:
+                    chunk = bytes(value)
+                else:
+                    chunk = (value if isinstance(value, str) else str(value)).encode('utf-8', 'surrogatepass')
+
+                chunks.append(chunk)
+                offset += len(chunk)
+
+            offsets.append(offset)
+
+        self.data.extend(b''.join(chunks))
+        self.offsets.extend(offsets)
+        self.count += len(values)
+
+    def extend(self, other):
+        self.extendNulls(other)
+
+        base = len(self.data)
+
+        self.data.extend(other.data)
+        self.offsets.extend(offset + base for offset in other.offsets)
+        self.count += other.count
+
+    def slice(self, start, count):
+        base = self.offsets[start - 1] if start else 0
+
+        column = self.newColumn()
+        column.data = self.data[base : self.offsets[start + count - 1] if count else base]
+        column.offsets = array.array('Q', (offset - base for offset in self.offsets[start : start + count]))
+        column.nulls = self.sliceNulls(start, count)
+        column.count = count
+
+        return column
+
+    def value(self, row):
+        if self.isNull(row):
+            return None
+
+        start = self.offsets[row - 1] if row else 0
+        value = self.data[start : self.offsets[row]]
+
+        if self.isBinary:
+            return bytes(value)
+
+        return value.decode('utf-8', 'surrogatepass')
+
+    def array(self):
+        return [ self.value(row) for row in range(self.count) ]
+
+    def memorySize(self):
+        return self.offsets.itemsize * len(self.offsets) + len(self.data) + len(self.nulls)
+
+    def serialize(self):
+        offsets = memoryview(self.offsets).cast('B')
+
+        return [ COLUMN_HEADER.pack(COLUMN_BINARY if self.isBinary else COLUMN_TEXT, 0, self.count, len(self.nulls), len(offsets), len(self.data)),
+                self.nulls, offsets, self.data ]
+
+def deserializeColumn(buffer, offset, template):
+    # Returns the column read from a spill file mapping and the offset after it
+    kind, typeCode, count, nullsSize, valuesSize, dataSize = COLUMN_HEADER.unpack_from(buffer, offset)
+    offset += COLUMN_HEADER.size
+
+    if kind == COLUMN_NUMERIC:
+        typeCode = chr(typeCode)
+
+        if isinstance(template, NumericColumn) and template.values.typecode == typeCode:
+            column = template.newColumn()                   # keeps the epoch encoding of dates and times
+        else:
+            column = NumericColumn(typeCode)
+    else:
+        column = TextColumn(kind == COLUMN_BINARY)
+
+    column.nulls = bytearray(buffer[offset : offset + nullsSize])
+    offset += nullsSize
+
+    if kind == COLUMN_NUMERIC:
+        column.values.frombytes(buffer[offset : offset + valuesSize])
+    else:
+        column.offsets.frombytes(buffer[offset : offset + valuesSize])
+        column.data = bytearray(buffer[offset + valuesSize : offset + valuesSize + dataSize])
+
+    column.count = count
+
+    return column, offset + valuesSize + dataSize
+
+EPOCH_DATETIME = datetime.datetime(1970, 1, 1)
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+ONE_MICROSECOND = datetime.timedelta(microseconds = 1)
+
+def newColumnForType(typeCode):
+    if typeCode is bool:
+        return NumericColumn('b', int, bool, 'bool')
+
+    if typeCode is int:
+        return NumericColumn('q')
+
+    if typeCode is float:
+        return NumericColumn('d')
+
+    if typeCode is datetime.datetime:
+        return NumericColumn('q',
+                lambda value: (value - EPOCH_DATETIME) // ONE_MICROSECOND,
+                lambda value: EPOCH_DATETIME + datetime.timedelta(microseconds = value),
+                'datetime64[us]')
+
+    if typeCode is datetime.date:
+        return NumericColumn('q',
+                lambda value: value.toordinal() - EPOCH_ORDINAL,
+                lambda value: datetime.date.fromordinal(value + EPOCH_ORDINAL),
+                'datetime64[D]')
+
+    if typeCode is datetime.time:
+        return NumericColumn('q',
+                lambda value: ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + value.microsecond,
+                lambda value: datetime.time(value // 3600000000, value // 60000000 % 60, value // 1000000 % 60, value % 1000000),
+                'timedelta64[us]')
+
+    if typeCode is bytes or typeCode is bytearray:
+        return TextColumn(True)
+
+    # str, decimal.Decimal (kept exact as text), uuid.UUID and anything unknown
+    return TextColumn()
+
+class ResultChunk:
+    def __init__(self, columns):
+        self.columns = columns
+        self.rowCount = 0
+
+    @classmethod
+    def fromRows(cls, columnTemplates, rows):
+        chunk = cls([ column.newColumn() for column in columnTemplates ])
+        chunk.appendRows(rows)
+
+        return chunk
+
+    def appendRows(self, rows):
+        for col, column in enumerate(self.columns):
+            values = [ row[col] for row in rows ]
+
+            try:
+                column.append(values)
+            except (TypeError, ValueError, OverflowError):
+                # Values that do not fit the declared type (big integers, time zones, ...) are kept as text
+                column = column.toText()
+                column.append(values)
+                self.columns[col] = column
+
+        self.rowCount += len(rows)
+
+    def slice(self, start, count):
+        # Rows start to start + count, copied column by column
+        chunk = ResultChunk([ column.slice(start, count) for column in self.columns ])
+        chunk.rowCount = count
+
+        return chunk
+
+    def row(self, index):
+        return tuple(column.value(index) for column in self.columns)
+
+    def extend(self, other):
+        for col, column in enumerate(self.columns):
+            otherColumn = other.columns[col]
+
+            if type(column) is not type(otherColumn) or (isinstance(column, NumericColumn) and column.values.typecode != otherColumn.values.typecode):
+                if not isinstance(column, TextColumn) or column.isBinary:
+                    column = column.toText()
+                    self.columns[col] = column
+
+                if not isinstance(otherColumn, TextColumn) or otherColumn.isBinary:
+                    otherColumn = otherColumn.toText()
+
+            column.extend(otherColumn)
+
+        self.rowCount += other.rowCount
+
+    def memorySize(self):
+        return sum(column.memorySize() for column in self.columns)
+
+class ResultSpillFile:
+    # Full chunks moved out of memory, appended to a temporary file and read back through a memory mapping
+    CHUNK_HEADER = struct.Struct('<QI')     # row count, column count
+
+    def __init__(self, directory):
+        self.file = tempfile.TemporaryFile(prefix = 'ODBC-Result-', suffix = '.tmp', dir = directory)
+        self.size = 0
+        self.mapping = None
+        self.chunkOffsets = { }             # chunk index: offset in the file
+
+    def write(self, chunkIndex, chunk):
+        if self.mapping:
+            self.mapping.close()            # the file is not extended while it is mapped
+            self.mapping = None
+
+        self.file.seek(self.size)
+        self.chunkOffsets[chunkIndex] = self.size
+        self.size += self.file.write(ResultSpillFile.CHUNK_HEADER.pack(chunk.rowCount, len(chunk.columns)))
+
+        for column in chunk.columns:
+            for data in column.serialize():
+                self.size += self.file.write(data)
+
+        self.file.flush()
+
+    def read(self, chunkIndex, columnTemplates):
+        if self.mapping is None:
+            self.mapping = mmap.mmap(self.file.fileno(), self.size, access = mmap.ACCESS_READ)
+
+        offset = self.chunkOffsets[chunkIndex]
+        rowCount, columnCount = ResultSpillFile.CHUNK_HEADER.unpack_from(self.mapping, offset)
+        offset += ResultSpillFile.CHUNK_HEADER.size
+        columns = [ ]
+
+        for col in range(columnCount):
+            column, offset = deserializeColumn(self.mapping, offset, columnTemplates[col])
+            columns.append(column)
+
+        chunk = ResultChunk(columns)
+        chunk.rowCount = rowCount
+
+        return chunk
+
+    def close(self):
+        if self.mapping:
+            self.mapping.close()
+            self.mapping = None
+
+        self.file.close()               # temporary file, deleted on close
+
+class ResultStore:
+    CHUNK_ROWS = 65536                      # rows per chunk, so that a row number maps directly to its chunk
+    MEMORY_BUDGET = 256 * 1024 * 1024       # bytes of fetched rows kept in memory before full chunks are spilled to disk
+    CACHED_CHUNKS = 4                       # spilled chunks kept decoded, for scrolling back and forth
+
+    def __init__(self, description, spillDirectory = None, memoryBudget = MEMORY_BUDGET):
+        self.columnNames = [ col[0] for col in description ]
+        self.columnTemplates = [ newColumnForType(col[1]) for col in description ]
+        self.chunks = [ ]                   # ResultChunk, or None once spilled
+        self.rowCount = 0
+
+        self.spillDirectory = spillDirectory
+        self.memoryBudget = memoryBudget
+        self.spillFile = None
+        self.residentSize = 0               # memory used by the full chunks still in self.chunks
+        self.chunkCache = collections.OrderedDict()
+
+    def newChunk(self, rows):
+        # May be called on the worker thread, to convert fetched rows before they reach the GUI
+        return ResultChunk.fromRows(self.columnTemplates, rows)
+
+    def appendChunk(self, chunk):
+        offset = 0
+
+        while offset < chunk.rowCount:
+            if not self.chunks or self.chunks[-1].rowCount >= ResultStore.CHUNK_ROWS:
+                if self.chunks:
+                    self.residentSize += self.chunks[-1].memorySize()
+
+                self.chunks.append(ResultChunk([ column.newColumn() for column in self.columnTemplates ]))
+
+            lastChunk = self.chunks[-1]
+            count = min(ResultStore.CHUNK_ROWS - lastChunk.rowCount, chunk.rowCount - offset)
+
+            if offset == 0 and count == chunk.rowCount:
+                lastChunk.extend(chunk)
+            else:
+                lastChunk.extend(chunk.slice(offset, count))
+
+            offset += count
+
+        self.rowCount += chunk.rowCount
+
+        if self.spillDirectory and self.residentSize + self.chunks[-1].memorySize() > self.memoryBudget:
+            self.spill()
+
+    def spill(self):
+        # Oldest full chunks first, the last chunk is still being filled
+        if self.spillFile is None:
+            self.spillFile = ResultSpillFile(self.spillDirectory)
+
+        for chunkIndex, chunk in enumerate(self.chunks[ : -1]):
+            if self.residentSize + self.chunks[-1].memorySize() <= self.memoryBudget:
+                break
+
+            if chunk is not None:
+                self.spillFile.write(chunkIndex, chunk)
+                self.chunks[chunkIndex] = None
+                self.residentSize -= chunk.memorySize()
+
+    def chunk(self, chunkIndex):
+        chunk = self.chunks[chunkIndex]
+
+        if chunk is not None:
+            return chunk
+
+        chunk = self.chunkCache.get(chunkIndex)
+
+        if chunk is None:
+            chunk = self.spillFile.read(chunkIndex, self.columnTemplates)
+            self.chunkCache[chunkIndex] = chunk
+
+            if len(self.chunkCache) > ResultStore.CACHED_CHUNKS:
+                self.chunkCache.popitem(last = False)
+        else:
+            self.chunkCache.move_to_end(chunkIndex)
+
+        return chunk
+
+    def value(self, row, col):
+        return self.chunk(row // ResultStore.CHUNK_ROWS).columns[col].value(row % ResultStore.CHUNK_ROWS)
+
+    def formatValue(self, row, col):
+        return self.chunk(row // ResultStore.CHUNK_ROWS).columns[col].format(row % ResultStore.CHUNK_ROWS)
+
+    def columnArrays(self, col):
+        # Typed arrays (NumPy arrays when available) for each chunk of the column, without copying in-memory chunks
+        return [ self.chunk(chunkIndex).columns[col].array() for chunkIndex in range(len(self.chunks)) ]
+
+    def memorySize(self):
+        return sum(chunk.memorySize() for chunk in self.chunks if chunk is not None) + sum(chunk.memorySize() for chunk in self.chunkCache.values())
+
+    def spilledSize(self):
+        return self.spillFile.size if self.spillFile else 0
+
+    def close(self):
+        self.chunkCache.clear()
+
+        if self.spillFile:
+            self.spillFile.close()
+            self.spillFile = None
@@ -0,0 +1,207 @@
+import mmap, bisect
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QPainter, QFontDatabase, QKeySequence
+from PySide6.QtWidgets import QApplication, QAbstractScrollArea
+
+class SQLFileView(QAbstractScrollArea):
+    # Read-only view of a script file too large for the editor. The file is memory-mapped and split into chunks of
+    # about CHUNK_SIZE bytes ending at a line break, and only the chunks of the lines on screen are decoded
+    SIZE_THRESHOLD = 16 * 1024 * 1024       # files from this size on open in the view instead of the editor
+    CHUNK_SIZE = 256 * 1024
+    CACHED_CHUNKS = 8                       # decoded chunks kept
+    TAB_SIZE = 4
+
+    executeStatement = None                 # same signals as SQLEditorWidget
+    executeScript = None
+
+    def __init__(self, fileName, parent = None):
+        super().__init__(parent)
+        self.filename = fileName
+        self.queryThread = None
+        self.queryWorker = None
+
+        self.file = open(fileName, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        self.start = 3 if self.map[ : 3] == b'\xef\xbb\xbf' else 0      # UTF-8 Byte Order Mark
+        self.chunkOffsets = [ ]             # byte offset of each chunk
+        self.chunkLines = [ ]               # number of the first line of each chunk
+        self.chunks = OrderedDict()         # chunk index: decoded lines, least recently used first
+        self.lineCount = 0
+        self.maxColumns = 0                 # longest line decoded so far, for the horizontal scroll range
+        self.selection = None               # [ anchor line, current line ]
+
+        self.indexChunks()
+
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.viewport().setCursor(Qt.IBeamCursor)
+        self.setToolTip(self.tr('{} is opened read-only, Ctrl+Alt+Enter runs the whole script').format(fileName))
+        self.updateScrollBars()
+
+    def indexChunks(self):
+        # Counts the line breaks of each chunk, without decoding the file
+        offset = self.start
+        size = len(self.map)
+
+        while offset < size:
+            end = self.map.find(b'\n', offset + SQLFileView.CHUNK_SIZE - 1)
+            end = size if end < 0 else end + 1
+
+            self.chunkOffsets.append(offset)
+            self.chunkLines.append(self.lineCount)
+            self.lineCount += self.map[offset : end].count(b'\n') + (0 if self.map[end - 1] == ord('\n') else 1)
+            offset = end
+
+        self.chunkOffsets.append(size)
+
+    def chunk(self, index):
+        if index in self.chunks:
+            self.chunks.move_to_end(index)
+        else:
+            text = self.map[self.chunkOffsets[index] : self.chunkOffsets[index + 1]].decode('utf-8', 'replace')
+            lines = text.split('\n')
+
+            if text.endswith('\n'):
+                lines.pop()
+
+            self.chunks[index] = [ line.rstrip('\r') for line in lines ]
+            self.maxColumns = max(self.maxColumns, max((len(line) for line in lines), default = 0))
+
+            if len(self.chunks) > SQLFileView.CACHED_CHUNKS:
+                self.chunks.popitem(last = False)
+
+            self.updateScrollBars()
+
+        return self.chunks[index]
+
+    def line(self, lineNumber):
+        index = bisect.bisect_right(self.chunkLines, lineNumber) - 1
+
+        return self.chunk(index)[lineNumber - self.chunkLines[index]]
+
+    def toPlainText(self):
+        return self.map[self.start : ].decode('utf-8', 'replace').replace('\r\n', '\n')
+
+    def selectedText(self):
+        if not self.selection:
+            return ''
+
+        first, last = sorted(self.selection)
+
+        return '\n'.join(self.line(lineNumber) for lineNumber in range(first, last + 1))
+
+    def closeFile(self):
+        self.chunks.clear()
+        self.map.close()
+        self.file.close()
+
+    def visibleLines(self):
+        return max(1, self.viewport().height() // self.fontMetrics().lineSpacing())
+
+    def updateScrollBars(self):
+        charWidth = self.fontMetrics().horizontalAdvance(' ')
+
+        self.verticalScrollBar().setRange(0, max(0, self.lineCount - self.visibleLines()))
+        self.verticalScrollBar().setPageStep(self.visibleLines())
+        self.horizontalScrollBar().setRange(0, max(0, (self.maxColumns + 1) * charWidth - self.viewport().width()))
+        self.horizontalScrollBar().setPageStep(self.viewport().width())
+        self.horizontalScrollBar().setSingleStep(charWidth)
+
+    def lineAt(self, y):
+        return min(self.lineCount - 1, self.verticalScrollBar().value() + max(0, int(y)) // self.fontMetrics().lineSpacing())
+
+    def resizeEvent(self, ev):
+        super().resizeEvent(ev)
+        self.updateScrollBars()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def paintEvent(self, ev):
+        painter = QPainter(self.viewport())
+        painter.fillRect(ev.rect(), self.palette().base())
+
+        metrics = self.fontMetrics()
+        lineHeight = metrics.lineSpacing()
+        charWidth = metrics.horizontalAdvance(' ')
+        firstColumn = self.horizontalScrollBar().value() // charWidth          # only the visible part of long lines is drawn
+        columns = self.viewport().width() // charWidth + 2
+        x = firstColumn * charWidth - self.horizontalScrollBar().value() + 2
+        selected = sorted(self.selection) if self.selection else [ -1, -1 ]
+        firstLine = self.verticalScrollBar().value()
+
+        for row in range(self.visibleLines() + 1):
+            lineNumber = firstLine + row
+
+            if lineNumber >= self.lineCount:
+                break
+
+            top = row * lineHeight
+
+            if selected[0] <= lineNumber <= selected[1]:
+                painter.fillRect(0, top, self.viewport().width(), lineHeight, self.palette().highlight())
+                painter.setPen(self.palette().highlightedText().color())
+            else:
+                painter.setPen(self.palette().text().color())
+
+            text = self.line(lineNumber)
+
+            if '\t' in text:
+                text = text.expandtabs(SQLFileView.TAB_SIZE)
+
+            painter.drawText(x, top + metrics.ascent(), text[firstColumn : firstColumn + columns])
+
+    def mousePressEvent(self, ev):
+        if ev.button() == Qt.LeftButton and self.lineCount:
+            lineNumber = self.lineAt(ev.position().y())
+
+            if self.selection and ev.modifiers() & Qt.ShiftModifier:
+                self.selection[1] = lineNumber
+            else:
+                self.selection = [ lineNumber, lineNumber ]
+
+            self.viewport().update()
+
+        super().mousePressEvent(ev)
+
+    def mouseMoveEvent(self, ev):
+        if ev.buttons() & Qt.LeftButton and self.selection:
+            self.selection[1] = self.lineAt(ev.position().y())
+            self.verticalScrollBar().setValue(min(self.selection[1], self.verticalScrollBar().value()))
+            self.viewport().update()
+
+        super().mouseMoveEvent(ev)
+
+    def keyPressEvent(self, ev):
+        if ev.key() == Qt.Key_Enter or ev.key() == Qt.Key_Return:
+            if ev.modifiers() == Qt.ControlModifier:
+                self.executeStatement.emit(self, self.selectedText())
+                ev.accept()
+                return
+
+            if ev.modifiers() == Qt.ControlModifier | Qt.AltModifier:
+                self.executeScript.emit(self, self.toPlainText())
+                ev.accept()
+                return
+
+        if ev.matches(QKeySequence.Copy):
+            QApplication.clipboard().setText(self.selectedText())
+            ev.accept()
+            return
+
+        if ev.matches(QKeySequence.SelectAll) and self.lineCount:
+            self.selection = [ 0, self.lineCount - 1 ]
+            self.viewport().update()
+            ev.accept()
+            return
+
+        if ev.matches(QKeySequence.MoveToStartOfDocument):
+            self.verticalScrollBar().setValue(0)
+        elif ev.matches(QKeySequence.MoveToEndOfDocument):
+            self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+        super().keyPressEvent(ev)
+
+SQLFileView.executeStatement = Signal(SQLFileView, str)
+SQLFileView.executeScript = Signal(SQLFileView, str)
@@ -0,0 +1,165 @@
+import time
+
+from PySide6.QtCore import QObject, QTimer, Slot
+from PySide6.QtGui import QColor, QFont, QTextCharFormat, QTextCursor, QTextLayout
+
+from src.SQLScript import SQLLexer
+
+SQL_KEYWORDS = set('''
+    absolute action add all alter and any as asc authorization avg begin between both by call cascade case cast check close
+    coalesce collate column commit constraint continue convert count create cross current current_date current_time
+    current_timestamp current_user cursor deallocate declare default delete desc describe distinct drop else end escape
+    except exec execute exists extract false fetch first for foreign from full function grant group having identity in
+    index inner insert intersect into is join key last left like limit max merge min natural next not null nullif of on
+    only open option or order outer over partition position primary procedure references return returns revoke right
+    rollback row rows savepoint schema select session_user set some sum system_user table then to trigger true truncate
+    union unique update user using values view when where while with work
+    bigint binary bit blob boolean char character clob date datetime decimal double float int integer interval nchar
+    numeric nvarchar real smallint time timestamp varbinary varchar
+    '''.split())
+
+DBMS_KEYWORDS = [
+    [ [ 'sql server', 'sybase', 'adaptive server' ], '''
+        apply backup bulk checkpoint clustered compute contains containstable dbcc deny disk distributed dump errlvl exit
+        file fillfactor freetext go goto holdlock identity_insert identitycol if kill lineno load money nocheck nocount
+        nolock nonclustered off offsets openquery openrowset output percent pivot plan print proc raiserror readtext
+        reconfigure replication restore revert rowcount rowguidcol rule save setuser shutdown smalldatetime smallmoney
+        statistics textsize throw tinyint top tran transaction try catch unpivot updatetext use waitfor writetext
+        uniqueidentifier datetime2 datetimeoffset ntext image sql_variant xml''' ],
+    [ [ 'oracle' ], '''
+        body bulk collect connect constant dual elsif exception exit forall if immediate is loop minus mod nocopy number
+        nvarchar2 out package pls_integer pragma prior raise raw record ref replace rowid rownum sequence start synonym
+        sysdate systimestamp type varchar2 clob nclob long editionable noneditionable''' ],
+    [ [ 'mysql', 'mariadb' ], '''
+        auto_increment charset delimiter div do duplicate elseif engine enum explain force high_priority if ignore
+        iterate kill leave longtext loop mediumint mediumtext modify regexp rename repeat replace rlike show signal
+        sql_calc_found_rows straight_join tinyint tinytext unsigned use xor zerofill''' ],
+    [ [ 'postgres', 'greenplum', 'redshift', 'cockroach' ], '''
+        analyze array bigserial bytea conflict copy do elsif explain ilike inherits jsonb json language lateral listen
+        loop notify nothing perform plpgsql raise recursive refresh returning serial similar text uuid vacuum verbose
+        window materialized''' ],
+    [ [ 'sqlite' ], '''
+        abort analyze attach autoincrement conflict detach explain fail glob ignore indexed instead plan pragma query
+        raise recursive regexp reindex rename replace text vacuum virtual without''' ],
+    [ [ 'db2' ], '''
+        fenced generated graphic mode nickname optimize organize range rrn vargraphic xmlelement''' ]
+]
+
+def dialectKeywords(dialect):
+    # ANSI keywords and data types, and those of the DBMS detected on connection
+    name = dialect.name.lower()
+    keywords = set(SQL_KEYWORDS)
+
+    for dbmsNames, dbmsKeywords in DBMS_KEYWORDS:
+        if any(dbmsName in name for dbmsName in dbmsNames):
+            keywords.update(dbmsKeywords.split())
+
+    return keywords
+
+def textFormat(color, bold = False, italic = False):
+    charFormat = QTextCharFormat()
+    charFormat.setForeground(QColor(color))
+
+    if bold:
+        charFormat.setFontWeight(QFont.Bold)
+
+    if italic:
+        charFormat.setFontItalic(True)
+
+    return charFormat
+
+class SQLHighlighter(QObject):
+    # Syntax highlighting of an editor document with SQLLexer. The lexer state at the end of each block is kept as the
+    # block user state, so an edit re-highlights from its first block until a block ends in its previous state again.
+    # Each edit gets TIME_SLICE seconds, the blocks left are highlighted in idle time slices of the same length, so
+    # typing does not slow down with the size of the script
+    TIME_SLICE = 0.004
+
+    def __init__(self, document, dialect):
+        super().__init__(document)
+        self.document = document
+        self.pending = [ ]                  # [ first cursor, last cursor ] of the block ranges left to highlight
+        self.keywordFormat = textFormat('darkblue', bold = True)
+        self.formats = {
+            SQLLexer.TOKEN_NUMBER: textFormat('darkmagenta'),
+            SQLLexer.TOKEN_STRING: textFormat('darkred'),
+            SQLLexer.TOKEN_IDENTIFIER: textFormat('darkcyan'),
+            SQLLexer.TOKEN_COMMENT: textFormat('gray', italic = True),
+            SQLLexer.TOKEN_PARAMETER: textFormat('darkgoldenrod', bold = True),
+            SQLLexer.TOKEN_SEPARATOR: textFormat('darkblue', bold = True)
+        }
+
+        self.idleTimer = QTimer(self)
+        self.idleTimer.setInterval(0)       # runs when no other events are waiting
+        self.idleTimer.timeout.connect(self.highlightPending)
+
+        self.setDialect(dialect)
+        self.document.contentsChange.connect(self.highlightChange)
+
+    def setDialect(self, dialect):
+        self.lexer = SQLLexer(dialect)
+        self.keywords = dialectKeywords(dialect)
+        self.addPending(self.document.firstBlock(), self.document.blockCount() - 1)
+
+    def addPending(self, block, lastLine):
+        lastBlock = self.document.findBlockByNumber(max(lastLine, block.blockNumber()))
+        self.pending.append([ QTextCursor(block), QTextCursor(lastBlock) ])      # cursors follow the later edits
+        self.idleTimer.start()
+
+    def highlightBlock(self, block, state):
+        text = block.text()
+        tokens, state = self.lexer.lexLine(text, state)
+        ranges = [ ]
+
+        for tokenType, start, end in tokens:
+            if tokenType == SQLLexer.TOKEN_WORD:
+                charFormat = self.keywordFormat if text[start : end].lower() in self.keywords else None
+            else:
+                charFormat = self.formats.get(tokenType)
+
+            if charFormat:
+                formatRange = QTextLayout.FormatRange()
+                formatRange.start = start
+                formatRange.length = end - start
+                formatRange.format = charFormat
+                ranges.append(formatRange)
+
+        block.layout().setFormats(ranges)
+        block.setUserState(state)
+        self.document.markContentsDirty(block.position(), block.length())
+
+        return state
+
+    def highlight(self, block, lastLine):
+        # Highlights from block at least to lastLine, then until a block state does not change
+        deadline = time.perf_counter() + SQLHighlighter.TIME_SLICE
+
+        while block.isValid():
+            if time.perf_counter() > deadline:
+                self.addPending(block, lastLine)
+                return
+
+            previousState = block.previous().userState() if block.blockNumber() else SQLLexer.STATE_NORMAL
+            oldState = block.userState()
+
+            if self.highlightBlock(block, max(previousState, SQLLexer.STATE_NORMAL)) == oldState and block.blockNumber() >= lastLine:
+                return
+
+            block = block.next()
+
+    @Slot(int, int, int)
+    def highlightChange(self, position, charsRemoved, charsAdded):
+        lastBlock = self.document.findBlock(min(position + charsAdded, self.document.characterCount() - 1))
+
+        self.highlight(self.document.findBlock(position), lastBlock.blockNumber())
+
+    @Slot()
+    def highlightPending(self):
+        if not self.pending:
+            self.idleTimer.stop()
+            return
+
+        self.pending.sort(key = lambda cursors: cursors[0].position())
+        firstCursor, lastCursor = self.pending.pop(0)
+
+        self.highlight(firstCursor.block(), lastCursor.blockNumber())
@@ -0,0 +1,558 @@
+import re, bisect, decimal
+
+class SQLDialect:
+    def __init__(self, dbmsName = None):
+        name = (dbmsName or '').lower()
+
+        self.name = dbmsName or ''
+        isSqlServer = 'sql server' in name or 'sybase' in name or 'adaptive server' in name
+        isMySql = 'mysql' in name or 'mariadb' in name
+        isPostgres = 'postgres' in name or 'greenplum' in name or 'redshift' in name or 'cockroach' in name
+
+        self.batchSeparator = isSqlServer           # 'GO' lines separate batches, semicolons stay inside a batch
+        self.slashSeparator = 'oracle' in name      # '/' lines end PL/SQL blocks
+        self.delimiterCommand = isMySql             # 'DELIMITER //' lines change the statement terminator
+        self.dollarQuotes = isPostgres
+        self.nestedComments = isPostgres
+        self.hashComments = isMySql
+        self.backslashEscapes = isMySql
+        self.backtickQuotes = isMySql or 'sqlite' in name
+        self.bracketQuotes = isSqlServer or 'access' in name or 'excel' in name or 'sqlite' in name
+
+class SQLLexer:
+    # Lexer state carried from one line to the next, the upper bits hold the comment depth
+    # or the dollar quote tag index
+    STATE_NORMAL = 0
+    STATE_BLOCK_COMMENT = 1
+    STATE_SINGLE_QUOTE = 2
+    STATE_DOUBLE_QUOTE = 3
+    STATE_BRACKET = 4
+    STATE_BACKTICK = 5
+    STATE_DOLLAR_QUOTE = 6
+    STATE_MASK = 0x0F
+    STATE_SHIFT = 4
+
+    TOKEN_WORD = 0
+    TOKEN_NUMBER = 1
+    TOKEN_STRING = 2
+    TOKEN_IDENTIFIER = 3                    # quoted identifier
+    TOKEN_COMMENT = 4
+    TOKEN_OPERATOR = 5
+    TOKEN_TERMINATOR = 6
+    TOKEN_PARAMETER = 7
+    TOKEN_SEPARATOR = 8                     # 'GO' or '/' line
+
+    GO_LINE = re.compile(r'\s*go(?:\s+(\d+))?\s*(?:--.*)?$', re.IGNORECASE)
+    SLASH_LINE = re.compile(r'\s*/\s*$')
+    DOLLAR_TAG = re.compile(r'\$(?:[A-Za-z_][A-Za-z_0-9]*)?\$')
+    WORD = re.compile(r'[\w@#$]+')
+    NUMBER = re.compile(r'(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+    NAMED_PARAMETER = re.compile(r':[A-Za-z_]\w*')
+
+    CLOSING_QUOTES = { STATE_SINGLE_QUOTE: "'", STATE_DOUBLE_QUOTE: '"', STATE_BRACKET: ']', STATE_BACKTICK: '`' }
+    QUOTE_TOKENS = { STATE_SINGLE_QUOTE: TOKEN_STRING, STATE_DOUBLE_QUOTE: TOKEN_IDENTIFIER, STATE_BRACKET: TOKEN_IDENTIFIER, STATE_BACKTICK: TOKEN_IDENTIFIER }
+
+    def __init__(self, dialect):
+        self.dialect = dialect
+        self.dollarTags = [ ]               # tags of dollar quoted strings, the index is kept in the line state
+
+    def separatorLine(self, line):
+        if self.dialect.batchSeparator:
+            match = SQLLexer.GO_LINE.match(line)
+
+            if match:
+                return int(match.group(1)) if match.group(1) else 1
+
+        if self.dialect.slashSeparator and SQLLexer.SLASH_LINE.match(line):
+            return 1
+
+        return 0
+
+    def continueConstruct(self, line, start, pos, state, tokens):
+        # Scan for the end of a comment or quoted text that started at start (or on a previous line)
+        mode = state & SQLLexer.STATE_MASK
+        length = len(line)
+
+        if mode == SQLLexer.STATE_BLOCK_COMMENT:
+            depth = state >> SQLLexer.STATE_SHIFT
+
+            while pos < length:
+                if line.startswith('*/', pos):
+                    pos += 2
+                    depth -= 1
+
+                    if not depth:
+                        tokens.append((SQLLexer.TOKEN_COMMENT, start, pos))
+                        return pos, SQLLexer.STATE_NORMAL
+                else:
+                    if self.dialect.nestedComments and line.startswith('/*', pos):
+                        pos += 2
+                        depth += 1
+                    else:
+                        pos += 1
+
+            tokens.append((SQLLexer.TOKEN_COMMENT, start, length))
+            return length, SQLLexer.STATE_BLOCK_COMMENT | (depth << SQLLexer.STATE_SHIFT)
+
+        if mode == SQLLexer.STATE_DOLLAR_QUOTE:
+            tag = self.dollarTags[state >> SQLLexer.STATE_SHIFT]
+            end = line.find(tag, pos)
+
+            if end < 0:
+                tokens.append((SQLLexer.TOKEN_STRING, start, length))
+                return length, state
+
+            tokens.append((SQLLexer.TOKEN_STRING, start, end + len(tag)))
+            return end + len(tag), SQLLexer.STATE_NORMAL
+
+        quote = SQLLexer.CLOSING_QUOTES[mode]
+        backslashEscapes = self.dialect.backslashEscapes and mode in (SQLLexer.STATE_SINGLE_QUOTE, SQLLexer.STATE_DOUBLE_QUOTE)
+
+        while pos < length:
+            ch = line[pos]
+
+            if backslashEscapes and ch == '\\':
+                pos += 2
+            elif ch == quote:
+                if pos + 1 < length and line[pos + 1] == quote:
+                    pos += 2                # doubled quote inside quoted text
+                else:
+                    tokens.append((SQLLexer.QUOTE_TOKENS[mode], start, pos + 1))
+                    return pos + 1, SQLLexer.STATE_NORMAL
+            else:
+                pos += 1
+
+        tokens.append((SQLLexer.QUOTE_TOKENS[mode], start, length))
+        return length, state
+
+    def lexLine(self, line, state = STATE_NORMAL):
+        # Returns the list of (tokenType, start, end) for the line, and the state at the end of the line
+        tokens = [ ]
+        length = len(line)
+        pos = 0
+
+        if state == SQLLexer.STATE_NORMAL and self.separatorLine(line):
+            return [ (SQLLexer.TOKEN_SEPARATOR, 0, length) ], state
+
+        if state != SQLLexer.STATE_NORMAL:
+            pos, state = self.continueConstruct(line, 0, 0, state, tokens)
+
+        dialect = self.dialect
+
+        while pos < length:
+            ch = line[pos]
+
+            if ch.isspace():
+                pos += 1
+            elif line.startswith('--', pos) or (ch == '#' and dialect.hashComments):
+                tokens.append((SQLLexer.TOKEN_COMMENT, pos, length))
+                pos = length
+            elif line.startswith('/*', pos):
+                pos, state = self.continueConstruct(line, pos, pos + 2, SQLLexer.STATE_BLOCK_COMMENT | (1 << SQLLexer.STATE_SHIFT), tokens)
+            elif ch == "'":
+                pos, state = self.continueConstruct(line, pos, pos + 1, SQLLexer.STATE_SINGLE_QUOTE, tokens)
+            elif ch == '"':
+                pos, state = self.continueConstruct(line, pos, pos + 1, SQLLexer.STATE_DOUBLE_QUOTE, tokens)
+            elif ch == '[' and dialect.bracketQuotes:
+                pos, state = self.continueConstruct(line, pos, pos + 1, SQLLexer.STATE_BRACKET, tokens)
+            elif ch == '`' and dialect.backtickQuotes:
+                pos, state = self.continueConstruct(line, pos, pos + 1, SQLLexer.STATE_BACKTICK, tokens)
+            elif ch == '$' and dialect.dollarQuotes and SQLLexer.DOLLAR_TAG.match(line, pos):
+                tag = SQLLexer.DOLLAR_TAG.match(line, pos).group(0)
+
+                if not tag in self.dollarTags:
+                    self.dollarTags.append(tag)
+
+                pos, state = self.continueConstruct(line, pos, pos + len(tag), SQLLexer.STATE_DOLLAR_QUOTE | (self.dollarTags.index(tag) << SQLLexer.STATE_SHIFT), tokens)
+            elif ch == ';':
+                tokens.append((SQLLexer.TOKEN_TERMINATOR, pos, pos + 1))
+                pos += 1
+            elif ch == '?':
+                tokens.append((SQLLexer.TOKEN_PARAMETER, pos, pos + 1))
+                pos += 1
+            elif ch == ':' and not line.startswith('::', pos) and (pos == 0 or line[pos - 1] != ':') and SQLLexer.NAMED_PARAMETER.match(line, pos):
+                end = SQLLexer.NAMED_PARAMETER.match(line, pos).end()
+                tokens.append((SQLLexer.TOKEN_PARAMETER, pos, end))
+                pos = end
+            elif ch.isdigit() or (ch == '.' and pos + 1 < length and line[pos + 1].isdigit()):
+                end = SQLLexer.NUMBER.match(line, pos).end()
+                tokens.append((SQLLexer.TOKEN_NUMBER, pos, end))
+                pos = end
+            elif ch.isalpha() or ch in '_@#':
+                end = SQLLexer.WORD.match(line, pos).end()
+                tokens.append((SQLLexer.TOKEN_WORD, pos, end))
+                pos = end
+            else:
+                end = pos + 2 if line.startswith('::', pos) else pos + 1
+                tokens.append((SQLLexer.TOKEN_OPERATOR, pos, end))
+                pos = end
+
+        return tokens, state
+
+class SQLStatement:
+    def __init__(self, text, offset, lineNumber, repeatCount = 1):
+        self.text = text
+        self.offset = offset                # position in the script text
+        self.lineNumber = lineNumber        # 1 based
+        self.repeatCount = repeatCount      # 'GO 5' runs the batch 5 times
+
+    def summary(self, maxLength = 60):
+        firstLine = self.text.split('\n', 1)[0].strip()
+
+        if len(firstLine) > maxLength or '\n' in self.text:
+            return firstLine[:maxLength] + ' ...'
+
+        return firstLine
+
+PLSQL_BLOCK_START = re.compile(r'(?:begin|declare|create\s+(?:or\s+replace\s+)?(?:(?:non)?editionable\s+)?(?:procedure|function|package|trigger|type|library|java))\b', re.IGNORECASE)
+
+class StatementIndex:
+    # Statement boundaries of a script, kept per line: the scanner state at the start of each line and the statements
+    # ending on it, with line numbers relative to that line. An edit re-lexes from its first line until the state at a
+    # line start matches the recorded one, lines past the lexed part are lexed when a lookup reaches them
+    RELEX_LINES = 2000                      # lines re-lexed right away after an edit
+    LOOKAHEAD_LINES = 500                   # lines lexed at a time when a lookup searches forward
+    PLSQL_PREFIX = 200                      # characters read to recognize a PL/SQL block
+
+    def __init__(self, dialect, lineText, lineCount = 1, batches = False):
+        self.dialect = dialect
+        self.batches = batches and dialect.batchSeparator      # whole 'GO' batches, semicolons do not end statements
+        self.lexer = SQLLexer(dialect)
+        self.lineText = lineText            # function returning the text of a line
+        self.lineCount = lineCount
+        self.startStates = [ (SQLLexer.STATE_NORMAL, ';', None) ] + [ None ] * lineCount       # (lexer state, delimiter, open statement)
+        self.lineStatements = [ ( ) ] * lineCount           # (startLine, startColumn, endLine, endColumn, repeatCount) ending on the line
+        self.endLines = [ ]                 # sorted numbers of the lexed lines that end statements
+        self.validLines = 0                 # lines lexed with the current text
+
+    def isPlsqlBlock(self, statement, lineNumber):
+        # statement is the open [ startLine, startColumn, endLine, endColumn, plsql ], plsql is None until checked
+        if statement[4] is None:
+            text = self.lineText(statement[0])[statement[1] : ]
+            line = statement[0]
+
+            while len(text) < StatementIndex.PLSQL_PREFIX and line < lineNumber:
+                line += 1
+                text += '\n' + self.lineText(line)
+
+            statement[4] = bool(PLSQL_BLOCK_START.match(text))
+
+        return statement[4]
+
+    def scanLine(self, lineNumber, state):
+        # Returns the statements ending on the line, and the state at the start of the next line
+        lexerState, delimiter, statement = state
+        statement = [ lineNumber - statement[0], statement[1], lineNumber - statement[2], statement[3], statement[4] ] if statement else None
+        dialect = self.dialect
+        line = self.lineText(lineNumber)
+        ended = [ ]
+
+        if lexerState == SQLLexer.STATE_NORMAL and dialect.delimiterCommand and statement is None and line.lstrip().lower().startswith('delimiter '):
+            return ended, (lexerState, line.split(None, 1)[1].strip() or ';', None)
+
+        tokens, lexerState = self.lexer.lexLine(line, lexerState)
+        skipUntil = 0                       # rest of a multi-character delimiter, like '//'
+
+        for tokenType, start, end in tokens:
+            if tokenType == SQLLexer.TOKEN_COMMENT or end <= skipUntil:
+                continue
+
+            if tokenType == SQLLexer.TOKEN_SEPARATOR:
+                if statement:
+                    ended.append((lineNumber - statement[0], statement[1], lineNumber - statement[2], statement[3], self.lexer.separatorLine(line)))
+
+                statement = None
+                continue
+
+            if delimiter == ';':
+                isTerminator = tokenType == SQLLexer.TOKEN_TERMINATOR and not self.batches
+                delimiterStart = start
+            else:
+                delimiterStart = line.find(delimiter, start) if tokenType in (SQLLexer.TOKEN_OPERATOR, SQLLexer.TOKEN_TERMINATOR, SQLLexer.TOKEN_WORD) else -1
+                isTerminator = delimiterStart == start or (tokenType == SQLLexer.TOKEN_WORD and start < delimiterStart < end)
+
+            if isTerminator and statement and dialect.slashSeparator and self.isPlsqlBlock(statement, lineNumber):
+                isTerminator = False            # PL/SQL blocks keep their semicolons and end with a '/' line
+
+            if isTerminator:
+                if delimiterStart > start:      # delimiter attached to the end of a word, like 'END$$'
+                    if statement is None:
+                        statement = [ lineNumber, start, lineNumber, delimiterStart, None ]
+                    else:
+                        statement[2 : 4] = [ lineNumber, delimiterStart ]
+
+                if statement:
+                    ended.append((lineNumber - statement[0], statement[1], lineNumber - statement[2], statement[3], 1))
+
+                statement = None
+                skipUntil = delimiterStart + len(delimiter)
+                continue
+
+            if statement is None:
+                statement = [ lineNumber, start, lineNumber, end, None ]
+            else:
+                statement[2 : 4] = [ lineNumber, end ]
+
+        if statement:
+            statement = (lineNumber + 1 - statement[0], statement[1], lineNumber + 1 - statement[2], statement[3], statement[4])
+
+        return tuple(ended), (lexerState, delimiter, statement)
+
+    def lexLine(self, lineNumber):
+        # Records the statements ending on the line, returns the state at the start of the next line
+        ended, state = self.scanLine(lineNumber, self.startStates[lineNumber])
+        self.lineStatements[lineNumber] = ended
+
+        index = bisect.bisect_left(self.endLines, lineNumber)
+        recorded = index < len(self.endLines) and self.endLines[index] == lineNumber
+
+        if ended and not recorded:
+            self.endLines.insert(index, lineNumber)
+        elif recorded and not ended:
+            del self.endLines[index]
+
+        return state
+
+    def truncate(self, lineNumber):
+        # Records from lineNumber on are stale
+        self.validLines = lineNumber
+        del self.endLines[bisect.bisect_left(self.endLines, lineNumber) : ]
+
+    def update(self, firstLine, oldLastLine, newLastLine):
+        # Lines firstLine to oldLastLine were replaced by firstLine to newLastLine
+        delta = newLastLine - oldLastLine
+        self.lineCount += delta
+        self.startStates[firstLine + 1 : oldLastLine + 1] = [ None ] * (newLastLine - firstLine)
+        self.lineStatements[firstLine : oldLastLine + 1] = [ ( ) ] * (newLastLine - firstLine + 1)
+
+        first = bisect.bisect_left(self.endLines, firstLine)
+        last = bisect.bisect_right(self.endLines, oldLastLine)
+        self.endLines[first : ] = [ lineNumber + delta for lineNumber in self.endLines[last : ] ] if delta else self.endLines[last : ]
+
+        if self.validLines <= firstLine:
+            return
+
+        shiftedValidLines = self.validLines + delta         # startStates up to here are from the last lexing
+        lineNumber = firstLine
+
+        while lineNumber < max(shiftedValidLines, newLastLine + 1) and lineNumber < firstLine + StatementIndex.RELEX_LINES:
+            state = self.lexLine(lineNumber)
+            lineNumber += 1
+
+            if newLastLine < lineNumber <= shiftedValidLines and self.startStates[lineNumber] == state and not self.spansEdit(state, lineNumber, newLastLine):
+                self.validLines = shiftedValidLines
+                return                      # the lines after keep their records
+
+            self.startStates[lineNumber] = state
+
+        self.truncate(min(lineNumber, self.lineCount))
+
+    def spansEdit(self, state, lineNumber, newLastLine):
+        # A PL/SQL block is recognized from the start of its statement, the records of the lines after an edit may
+        # change with it while the states at their starts do not
+        statement = state[2]
+
+        return self.dialect.slashSeparator and statement is not None and lineNumber - statement[0] <= newLastLine
+
+    def ensure(self, lastLine):
+        # Lexes the lines up to lastLine
+        while self.validLines <= min(lastLine, self.lineCount - 1):
+            self.startStates[self.validLines + 1] = self.lexLine(self.validLines)
+            self.validLines += 1
+
+    def ownedStatements(self, lineNumber):
+        return [ (lineNumber - startBack, startColumn, lineNumber - endBack, endColumn, repeatCount)
+                for startBack, startColumn, endBack, endColumn, repeatCount in self.lineStatements[lineNumber] ]
+
+    def endLineFrom(self, lineNumber):
+        # First line from lineNumber on that ends statements, None after the last one
+        while True:
+            index = bisect.bisect_left(self.endLines, lineNumber)
+
+            if index < len(self.endLines):
+                return self.endLines[index]
+
+            if self.validLines >= self.lineCount:
+                return None
+
+            self.ensure(self.validLines + StatementIndex.LOOKAHEAD_LINES)
+
+    def trailingStatement(self):
+        # Statement without terminator at the end of the script
+        self.ensure(self.lineCount - 1)
+        statement = self.startStates[self.lineCount][2]
+
+        if statement:
+            return [ (self.lineCount - statement[0], statement[1], self.lineCount - statement[2], statement[3], 1) ]
+
+        return [ ]
+
+    def statementsAround(self, lineNumber):
+        # Statements of the first line from lineNumber on that ends statements, and the statement continuing after it
+        endLine = self.endLineFrom(lineNumber)
+
+        if endLine is None:
+            return self.trailingStatement()
+
+        followingLine = self.endLineFrom(endLine + 1)
+
+        return self.ownedStatements(endLine) + (self.ownedStatements(followingLine)[ : 1] if followingLine is not None else self.trailingStatement())
+
+    def lastStatementBefore(self, position, inclusive):
+        statements = self.statementsAround(position[0])
+        index = bisect.bisect_left(self.endLines, position[0])
+
+        while True:
+            before = [ statement for statement in statements if statement[0 : 2] < position or (inclusive and statement[0 : 2] == position) ]
+
+            if before:
+                return before[-1]
+
+            if not index:
+                return None
+
+            index -= 1
+            statements = self.ownedStatements(self.endLines[index])
+
+    def statementAt(self, lineNumber, column):
+        # Statement under the position, or the one before it, as (startLine, startColumn, endLine, endColumn, repeatCount)
+        statement = self.lastStatementBefore((lineNumber, column), True)
+
+        if statement is None:
+            statement = self.nextStatement(lineNumber, column)
+
+        return statement
+
+    def nextStatement(self, lineNumber, column):
+        endLine = self.endLineFrom(lineNumber)
+
+        while endLine is not None:
+            for statement in self.ownedStatements(endLine):
+                if statement[0 : 2] > (lineNumber, column):
+                    return statement
+
+            endLine = self.endLineFrom(endLine + 1)
+
+        after = [ statement for statement in self.trailingStatement() if statement[0 : 2] > (lineNumber, column) ]
+
+        return after[0] if after else None
+
+    def previousStatement(self, lineNumber, column):
+        return self.lastStatementBefore((lineNumber, column), False)
+
+    def statementText(self, statement):
+        startLine, startColumn, endLine, endColumn, repeatCount = statement
+
+        if startLine == endLine:
+            return self.lineText(startLine)[startColumn : endColumn]
+
+        return '\n'.join([ self.lineText(startLine)[startColumn : ] ] + [ self.lineText(line) for line in range(startLine + 1, endLine) ]
+                + [ self.lineText(endLine)[ : endColumn] ])
+
+    def statements(self, linePosition):
+        # All statements as SQLStatement, linePosition returns the script position of a line start
+        self.ensure(self.lineCount - 1)
+        statements = [ ]
+
+        for lineNumber in self.endLines:
+            statements.extend(self.ownedStatements(lineNumber))
+
+        return [ SQLStatement(self.statementText(statement), linePosition(statement[0]) + statement[1], statement[0] + 1, statement[4])
+                for statement in statements + self.trailingStatement() ]
+
+def splitStatements(scriptText, dialect):
+    lines = scriptText.split('\n')
+    lineOffsets = [ 0 ]
+
+    for line in lines:
+        lineOffsets.append(lineOffsets[-1] + len(line) + 1)
+
+    return StatementIndex(dialect, lines.__getitem__, len(lines), True).statements(lineOffsets.__getitem__)
+
+def bindParameters(statementText, dialect):
+    # Replaces ':name' placeholders with '?' for pyodbc, returns the statement text and the parameter names in
+    # placeholder order, '?1', '?2', ... for positional placeholders. PL/SQL blocks keep ':new' and ':old' unchanged, and
+    # so do array subscripts and slices like 'arr[1:n]'
+    if PLSQL_BLOCK_START.match(statementText.lstrip()):
+        return statementText, [ ]
+
+    lexer = SQLLexer(dialect)
+    state = SQLLexer.STATE_NORMAL
+    parts = [ ]
+    names = [ ]
+    bracketDepth = 0                        # '[' not quoting identifiers in the dialect
+
+    for line in statementText.split('\n'):
+        tokens, state = lexer.lexLine(line, state)
+        pos = 0
+
+        for tokenType, start, end in tokens:
+            if tokenType == SQLLexer.TOKEN_OPERATOR and line[start] in '[]':
+                bracketDepth = bracketDepth + 1 if line[start] == '[' else max(0, bracketDepth - 1)
+            elif tokenType == SQLLexer.TOKEN_PARAMETER and not (bracketDepth and line[start] == ':'):
+                names.append(line[start + 1 : end] if end - start > 1 else '?' + str(len(names) + 1))
+                parts.append(line[pos : start] + '?')
+                pos = end
+
+        parts.append(line[pos : ] + '\n')
+
+    if not names:
+        return statementText, names
+
+    return ''.join(parts)[ : -1], names
+
+READ_ONLY_START = [ 'select', 'with', 'values' ]
+WRITE_WORDS = [ 'into', 'insert', 'update', 'delete', 'merge', 'for', 'lock' ]     # SELECT INTO, data modifying WITH, FOR UPDATE
+
+def normalizeQuery(statementText, dialect):
+    # Returns the statement tokens joined by single spaces without comments, and whether the statement only reads
+    lexer = SQLLexer(dialect)
+    state = SQLLexer.STATE_NORMAL
+    words = [ ]
+    parts = [ ]
+
+    for line in statementText.split('\n'):
+        continued = state != SQLLexer.STATE_NORMAL
+        tokens, state = lexer.lexLine(line, state)
+
+        for tokenType, start, end in tokens:
+            if tokenType == SQLLexer.TOKEN_COMMENT:
+                continue
+
+            if tokenType == SQLLexer.TOKEN_WORD:
+                words.append(line[start : end].lower())
+
+            if continued and start == 0 and parts:
+                parts[-1] += '\n' + line[start : end]      # string or quoted identifier spanning lines
+            else:
+                parts.append(line[start : end])
+
+            continued = False
+
+    while parts and parts[-1] == ';':
+        parts.pop()
+
+    readOnly = bool(words) and words[0] in READ_ONLY_START and not ';' in parts and not any(word in WRITE_WORDS for word in words)
+
+    return ' '.join(parts), readOnly
+
+INTEGER_VALUE = re.compile(r'[-+]?\d+$')
+DECIMAL_VALUE = re.compile(r'[-+]?(?:\d+\.\d*|\.\d+)$')
+
+def parameterValue(text):
+    # Value typed in the parameter panel: NULL, an integer, a decimal number, or a string, 'quoted' to keep digits as text
+    value = text.strip()
+
+    if value.upper() == 'NULL':
+        return None
+
+    if INTEGER_VALUE.match(value):
+        return int(value)
+
+    if DECIMAL_VALUE.match(value):
+        return decimal.Decimal(value)
+
+    if len(value) >= 2 and value[0] == "'" and value[-1] == "'":
+        return value[1 : -1].replace("''", "'")
+
+    return text
@@ -0,0 +1,122 @@
+import os, json
+
+from PySide6.QtCore import (
+        QObject,
+        Signal,
+        Slot,
+        QFile,
+        QSaveFile,
+        QStringConverter,
+        QTextStream)
+
+def fileSignature(fileName):
+    # [ size, modification time ] of a script file, None if there is no file yet
+    try:
+        info = os.stat(fileName)
+    except OSError:
+        return None
+
+    return [ info.st_size, info.st_mtime_ns ]
+
+def readJournal(fileName, journalFileName):
+    # [ position, chars removed, text added ] edits of a script since it was last saved. A journal written for
+    # another version of the file (saved since, or changed outside the application) does not apply
+    try:
+        with open(journalFileName, encoding = 'utf-8') as journal:
+            lines = journal.read().split('\n')
+
+        if json.loads(lines[0]) != fileSignature(fileName):
+            return [ ]
+    except (OSError, ValueError):
+        return [ ]
+
+    records = [ ]
+
+    for line in lines[1 : ]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break                           # last record cut short, or the empty line after the last one
+
+    return records
+
+class ScriptAutosave(QObject):
+    # Writes the SQL editor tabs on the autosave thread. Between two saves of a script its edits are appended to a
+    # journal file. The first line of a journal is the signature of the script file the edits apply to, so a journal
+    # left over from a save that did not finish is never replayed over the saved file
+    scriptSaved = Signal(str, int)          # script file name, editor revision saved
+    autosaveFailed = Signal(str)
+
+    def __init__(self):
+        super().__init__()
+
+        self.journals = { }                 # journal file name: file open for appending
+
+    def openJournal(self, fileName, journalFileName):
+        # Keeps appending to the journal recovered on loading the script if it still applies, starts a new one otherwise
+        signature = fileSignature(fileName)
+
+        try:
+            with open(journalFileName, 'r+b') as journal:
+                lines = journal.read()
+
+                if json.loads(lines[ : lines.find(b'\n')].decode('utf-8')) == signature:
+                    journal.truncate(lines.rfind(b'\n') + 1)           # partial last record
+                    return open(journalFileName, 'a', encoding = 'utf-8', newline = '\n')
+        except (OSError, ValueError):
+            pass
+
+        journal = open(journalFileName, 'w', encoding = 'utf-8', newline = '\n')
+        journal.write(json.dumps(signature) + '\n')
+
+        return journal
+
+    def closeJournal(self, journalFileName):
+        journal = self.journals.pop(journalFileName, None)
+
+        if journal:
+            journal.close()
+
+    @Slot(str, str, object)
+    def appendJournal(self, fileName, journalFileName, records):
+        try:
+            if not journalFileName in self.journals:
+                self.journals[journalFileName] = self.openJournal(fileName, journalFileName)
+
+            journal = self.journals[journalFileName]
+            journal.write(''.join(json.dumps(record) + '\n' for record in records))
+            journal.flush()
+        except OSError as ex:
+            self.closeJournal(journalFileName)
+            self.autosaveFailed.emit('Error writing journal file {}: '.format(journalFileName) + str(ex))
+
+    @Slot(str, str, str, int)
+    def saveScript(self, fileName, journalFileName, text, revision):
+        # The edits journaled so far are all in text, the journal restarts from the saved file
+        file = QSaveFile(fileName)
+
+        if file.open(QFile.WriteOnly | QFile.Text):
+            fileStream = QTextStream(file)
+            fileStream.generateByteOrderMark()
+            fileStream.setEncoding(QStringConverter.Utf8)
+            fileStream << text
+            fileStream.flush()
+            fileStream = None
+
+            if file.commit():
+                self.closeJournal(journalFileName)
+
+                try:
+                    os.remove(journalFileName)
+                except OSError:
+                    pass
+
+                self.scriptSaved.emit(fileName, revision)
+                return
+
+        self.autosaveFailed.emit('Error saving script file {}: '.format(fileName) + file.errorString())
+
+    @Slot()
+    def closeJournals(self):
+        for journalFileName in list(self.journals):
+            self.closeJournal(journalFileName)
@@ -0,0 +1,70 @@
+import collections
+import pyodbc
+
+class StatementCache:
+    # Cursors of one connection keyed by SQL text, least recently used first. pyodbc prepares a statement
+    # again only when a cursor executes a different SQL string object than the last one, so running the
+    # cached string on its cached cursor skips SQLPrepare() and reuses the driver's parameter descriptions
+    CAPACITY = 32
+
+    def __init__(self, capacity = CAPACITY):
+        self.capacity = capacity
+        self.statements = collections.OrderedDict()     # SQL text: [ SQL text, cursor ]
+        self.cursors = set()
+        self.hits = 0
+        self.misses = 0
+
+    def statement(self, connection, sqlText):
+        # Returns the cached SQL string object, its cursor, and True on a cache hit
+        entry = self.statements.get(sqlText)
+
+        if entry is not None:
+            self.statements.move_to_end(sqlText)
+            self.hits += 1
+            return entry[0], entry[1], True
+
+        self.misses += 1
+        cursor = connection.cursor()
+        self.statements[sqlText] = [ sqlText, cursor ]
+        self.cursors.add(cursor)
+
+        if len(self.statements) > self.capacity:
+            oldText, [ cachedText, oldCursor ] = self.statements.popitem(last = False)
+            self.closeCursor(oldCursor)
+
+        return sqlText, cursor, False
+
+    def contains(self, cursor):
+        return cursor in self.cursors
+
+    def release(self, cursor):
+        # Discards pending rows but keeps the prepared statement, pyodbc nextset() closes the
+        # cursor with SQLFreeStmt(SQL_CLOSE) after the last result set
+        try:
+            while cursor.nextset():
+                pass
+        except pyodbc.Error as ex:
+            print('Error releasing cached statement: ' + str(ex))
+            self.remove(cursor)
+
+    def remove(self, cursor):
+        for sqlText, [ cachedText, cachedCursor ] in list(self.statements.items()):
+            if cachedCursor is cursor:
+                del self.statements[sqlText]
+
+        self.closeCursor(cursor)
+
+    def closeCursor(self, cursor):
+        self.cursors.discard(cursor)
+
+        try:
+            cursor.close()
+        except pyodbc.Error as ex:
+            print('Error closing cached statement: ' + str(ex))
+
+    def clear(self):
+        # The cursors belong to the connection, the cache is cleared before the connection goes back to the pool
+        for sqlText, cursor in list(self.statements.values()):
+            self.closeCursor(cursor)
+
+        self.statements.clear()
@@ -0,0 +1,34 @@
+import random
+import unittest
+
+from src.CompletionIndex import CompletionIndex
+
+class CompletionIndexTest(unittest.TestCase):
+    def assertSameIndex(self, index, expected):
+        self.assertEqual(index.keys, expected.keys)
+        self.assertEqual(sorted(zip(index.keys, index.entries)), sorted(zip(expected.keys, expected.entries)))
+
+        for [ keys, entries ], [ expectedKeys, expectedEntries ] in zip(index.qualifiedArrays, expected.qualifiedArrays):
+            self.assertEqual(keys, expectedKeys)
+            self.assertEqual(sorted(zip(keys, entries)), sorted(zip(expectedKeys, expectedEntries)))
+
+    def testReplacedObjects(self):
+        # Schemas expanded one by one, and listed again with changes, give the index a full build gives
+        rng = random.Random(1)
+        schemas = [ [ 'db', 's' + str(n) ] for n in range(5) ]
+        objects = { }
+        index = CompletionIndex(schemas)
+
+        for catalog, schema in schemas + schemas[ : 2]:
+            tables = [ (catalog, schema, 't' + str(rng.randrange(50)), 'TABLE', None) for n in range(30) ]
+            procedures = [ (catalog, schema, 'p' + str(rng.randrange(20)) + ';1') for n in range(5) ]
+            entries = CompletionIndex.objectEntries(tables, procedures)
+            index = index.replacedObjects(objects.get((catalog, schema), [ ]), entries)
+            objects[(catalog, schema)] = entries
+            self.assertSameIndex(index, CompletionIndex(schemas, objects.values()))
+
+        self.assertTrue(index.lookup('t', [ 's1' ]))
+        self.assertEqual(index.tables([ 'db', 's0', objects[('db', 's0')][0][3] ])[0][2], 's0')
+
+if __name__ == '__main__':
+    unittest.main()
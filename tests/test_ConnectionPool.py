@@ -0,0 +1,99 @@
+import unittest
+from unittest import mock
+
+try:
+    import pyodbc
+    from src.ConnectionPool import ConnectionPool, ConnectionPoolError
+except ImportError:                         # pyodbc without an ODBC Driver Manager library
+    pyodbc = None
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, statement):
+        if self.connection.broken:
+            raise pyodbc.OperationalError('08S01', 'Communication link failure')
+
+        return self
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.autocommit = True
+        self.timeout = 0
+        self.broken = False
+        self.rolledBack = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rolledBack = True
+
+    def close(self):
+        self.closed = True
+
+@unittest.skipIf(pyodbc is None, 'pyodbc not available')
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool('DSN=test', { }, maxSize = 2)
+        patcher = mock.patch.object(self.pool, 'connect', side_effect = lambda: FakeConnection())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testExhaustion(self):
+        first = self.pool.checkout()
+        second = self.pool.checkout()
+
+        with self.assertRaises(ConnectionPoolError):
+            self.pool.checkout(timeout = 0)
+
+        connection = first.connection
+        first.release()
+
+        self.assertIs(self.pool.checkout(timeout = 0).connection, connection)
+        self.assertEqual(self.pool.openCount, 2)
+        second.release()
+
+    def testCheckinRestoresAutocommit(self):
+        session = self.pool.checkout()
+        connection = session.connection
+        connection.autocommit = False
+        connection.timeout = 30
+        session.release()
+
+        self.assertTrue(connection.rolledBack)
+        self.assertTrue(connection.autocommit)
+        self.assertEqual(connection.timeout, 0)
+        self.assertIs(self.pool.checkout().connection, connection)
+
+    def testBrokenConnectionsEvicted(self):
+        session = self.pool.checkout()
+        broken = session.connection
+        session.release()
+        broken.broken = True
+        self.pool.idle[-1][1] -= ConnectionPool.HEALTH_CHECK_AGE + 1     # checked before the next checkout
+
+        connection = self.pool.checkout().connection
+
+        self.assertIsNot(connection, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(self.pool.openCount, 1)
+
+    def testDiscardedAndClosedConnections(self):
+        session = self.pool.checkout()
+        session.discard()
+        self.assertEqual(self.pool.openCount, 0)
+
+        session = self.pool.checkout()
+        session.connection.close()
+        session.release()
+        self.assertEqual(self.pool.openCount, 0)
+        self.assertEqual(self.pool.idle, [ ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+from src.ResultCache import ResultCache
+from src.SQLScript import SQLDialect, normalizeQuery
+
+class FakeResultStore:
+    def __init__(self, size):
+        self.size = size
+
+    def memorySize(self):
+        return self.size
+
+    def spilledSize(self):
+        return 0
+
+class ResultCacheTest(unittest.TestCase):
+    def testTtlExpiry(self):
+        cache = ResultCache(ttl = 10)
+
+        with mock.patch('time.monotonic', return_value = 100.0):
+            self.assertTrue(cache.store('a', FakeResultStore(10), cache.generation))
+
+        with mock.patch('time.monotonic', return_value = 105.0):
+            self.assertEqual(cache.lookup('a')[1], 5.0)
+
+        with mock.patch('time.monotonic', return_value = 111.0):
+            self.assertIsNone(cache.lookup('a'))
+
+        self.assertEqual(cache.size, 0)
+
+    def testInvalidation(self):
+        # Statements that may write invalidate the cache, results of queries started before are not stored
+        cache = ResultCache()
+        dialect = SQLDialect()
+        cache.store('a', FakeResultStore(10), cache.generation)
+        generation = cache.generation
+
+        for statement in [ 'update t set x = 1', 'delete from t', 'select * into t2 from t', 'with d as (delete from t returning *) select * from d',
+                'select * from t for update', 'create table t2 (x int)', 'select 1; delete from t' ]:
+            self.assertFalse(normalizeQuery(statement, dialect)[1], statement)
+
+        self.assertTrue(normalizeQuery('select * from t -- delete', dialect)[1])
+
+        cache.invalidate()
+
+        self.assertIsNone(cache.lookup('a'))
+        self.assertFalse(cache.store('b', FakeResultStore(10), generation))
+        self.assertTrue(cache.store('b', FakeResultStore(10), cache.generation))
+
+    def testMemoryBudget(self):
+        cache = ResultCache(memoryBudget = 100)
+        cache.store('a', FakeResultStore(40), cache.generation)
+        cache.store('b', FakeResultStore(40), cache.generation)
+        cache.lookup('a')                   # b is now the least recently used
+        cache.store('c', FakeResultStore(40), cache.generation)
+
+        self.assertIsNotNone(cache.lookup('a'))
+        self.assertIsNone(cache.lookup('b'))
+        self.assertIsNotNone(cache.lookup('c'))
+        self.assertEqual(cache.size, 80)
+        self.assertFalse(cache.store('d', FakeResultStore(101), cache.generation))
+
+if __name__ == '__main__':
+    unittest.main()
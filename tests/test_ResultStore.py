@@ -0,0 +1,70 @@
+import datetime, random, tempfile, unittest
+from unittest import mock
+
+from src.ResultStore import ResultChunk, ResultStore, newColumnForType
+
+DESCRIPTION = [ ('id', int), ('name', str), ('data', bytes), ('day', datetime.date), ('amount', float), ('flag', bool) ]
+
+def randomRows(rng, count):
+    return [ tuple(None if rng.random() < 0.3 else value for value in (rng.randrange(-10**9, 10**9), 'é' * rng.randrange(4), b'\x00' * rng.randrange(3),
+            datetime.date(2020, 1, 1) + datetime.timedelta(days = rng.randrange(1000)), rng.random(), rng.random() < 0.5)) for row in range(count) ]
+
+def storeRows(store):
+    return [ tuple(store.value(row, col) for col in range(len(DESCRIPTION))) for row in range(store.rowCount) ]
+
+class ResultChunkTest(unittest.TestCase):
+    def testSlice(self):
+        # Byte aligned and unaligned starts and lengths, the NULL bits of the rows around the slice are left out
+        rng = random.Random(1)
+        rows = randomRows(rng, 100)
+        chunk = ResultChunk.fromRows([ newColumnForType(col[1]) for col in DESCRIPTION ], rows)
+
+        for start, count in [ (0, 100), (0, 13), (8, 16), (16, 5), (3, 8), (5, 21), (99, 1), (40, 0) ]:
+            part = chunk.slice(start, count)
+
+            self.assertEqual(part.rowCount, count)
+            self.assertEqual([ part.row(row) for row in range(count) ], rows[start : start + count])
+
+            for column in part.columns:
+                self.assertEqual(len(column.nulls), (count + 7) >> 3)
+                self.assertFalse(count & 7 and column.nulls[-1] >> (count & 7))
+
+class ResultStoreTest(unittest.TestCase):
+    def assertStoresRows(self, store, rng, rows):
+        offset = 0
+
+        while offset < len(rows):
+            count = rng.randrange(1, 3 * ResultStore.CHUNK_ROWS)
+            store.appendChunk(store.newChunk(rows[offset : offset + count]))
+            offset += count
+
+        self.assertEqual(store.rowCount, len(rows))
+        self.assertTrue(all(chunk is None or chunk.rowCount == ResultStore.CHUNK_ROWS for chunk in store.chunks[ : -1]))
+        self.assertEqual(storeRows(store), rows)
+
+    def testBatchesAcrossChunks(self):
+        rng = random.Random(2)
+
+        for chunkRows in [ 8, 13, 64, 777 ]:
+            with self.subTest(chunkRows = chunkRows), mock.patch.object(ResultStore, 'CHUNK_ROWS', chunkRows):
+                store = ResultStore(DESCRIPTION)
+                self.assertStoresRows(store, rng, randomRows(rng, 3000))
+                store.close()
+
+    def testFullSizeChunks(self):
+        rng = random.Random(4)
+        store = ResultStore(DESCRIPTION)
+        self.assertStoresRows(store, rng, randomRows(rng, ResultStore.CHUNK_ROWS * 2 + 1001))
+        store.close()
+
+    def testSpilledChunks(self):
+        rng = random.Random(3)
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(ResultStore, 'CHUNK_ROWS', 100):
+            store = ResultStore(DESCRIPTION, directory, memoryBudget = 4096)
+            self.assertStoresRows(store, rng, randomRows(rng, 2000))
+            self.assertGreater(store.spilledSize(), 0)
+            store.close()
+
+if __name__ == '__main__':
+    unittest.main()
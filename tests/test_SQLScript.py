@@ -0,0 +1,56 @@
+import random, unittest
+
+from src.SQLScript import SQLDialect, StatementIndex, bindParameters
+
+LINES = [ 'begin', 'declare', 'select 2 from dual', 'select 1 from t;', 'end;', '/', 'update t set x = 1;', "insert into t values ('a;b');",
+        'create or replace procedure p is', 'null;', '', '-- comment;', '/* block', 'comment */ select 3 from dual;', 'GO', 'delimiter //' ]
+
+def statements(index, lines):
+    index.ensure(len(lines) - 1)
+    return [ (statement.lineNumber, statement.text, statement.repeatCount) for statement in index.statements(lambda lineNumber: 0) ]
+
+class StatementIndexTest(unittest.TestCase):
+    def assertMatchesRebuild(self, index, lines, dialect):
+        rebuilt = StatementIndex(dialect, lines.__getitem__, len(lines), index.batches)
+        self.assertEqual(statements(index, lines), statements(rebuilt, lines))
+
+    def testPlsqlBlockStartEdited(self):
+        dialect = SQLDialect('Oracle')
+        lines = [ 'begin', 'select 2 from dual', 'end;' ]
+        index = StatementIndex(dialect, lines.__getitem__, len(lines))
+        index.ensure(len(lines) - 1)
+
+        lines[0] = 'select 2 from dual'
+        index.update(0, 0, 0)
+
+        self.assertMatchesRebuild(index, lines, dialect)
+
+    def testIncrementalUpdates(self):
+        # Random line edits, insertions and deletions give the same statements as an index built from scratch
+        rng = random.Random(1)
+
+        for dbmsName in [ 'Oracle', 'Microsoft SQL Server', 'MySQL', 'PostgreSQL', '' ]:
+            for batches in [ False, True ]:
+                dialect = SQLDialect(dbmsName)
+                lines = [ rng.choice(LINES) for i in range(30) ]
+                index = StatementIndex(dialect, lines.__getitem__, len(lines), batches)
+
+                for edit in range(300):
+                    index.ensure(rng.randrange(len(lines)))
+                    firstLine = rng.randrange(len(lines))
+                    oldLastLine = min(len(lines) - 1, firstLine + rng.randrange(3))
+                    added = [ rng.choice(LINES) for i in range(rng.randrange(4)) ] or [ '' ]
+                    lines[firstLine : oldLastLine + 1] = added
+                    index.update(firstLine, oldLastLine, firstLine + len(added) - 1)
+
+                    self.assertMatchesRebuild(index, lines, dialect)
+
+class BindParametersTest(unittest.TestCase):
+    def testArraySlicesAndCasts(self):
+        dialect = SQLDialect('PostgreSQL')
+
+        self.assertEqual(bindParameters('select arr[1:n], arr[:m], x::int from t where a = :a and b = ?', dialect),
+                ('select arr[1:n], arr[:m], x::int from t where a = ? and b = ?', [ 'a', '?2' ]))
+
+if __name__ == '__main__':
+    unittest.main()